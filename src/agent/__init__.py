@@ -1,5 +1,12 @@
 """Agent module: contains the supervised multi-agent system."""
 
-from agent.graph import build_system  # noqa: F401
-
 __all__ = ["build_system"]
+
+
+def __getattr__(name: str):
+    # Importing the graph pulls in LangGraph and the model SDKs; defer it to first use
+    if name == "build_system":
+        from agent.graph import build_system
+
+        return build_system
+    raise AttributeError(f"module 'agent' has no attribute {name!r}")
@@ -1,5 +1,14 @@
-from langchain.agents import create_agent
-from langchain_openai import ChatOpenAI
+import asyncio
+import threading
+import time
+from typing import Callable, Optional
+
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, StateGraph, MessagesState
+from agent.analytics import indexed_tool
+from agent.direct import data_direct_answer, text_direct_answer
+from agent.encoding import compact_tool
+from agent.models import make_chat_model
 from agent.tools import (
     extract_entities,
     keyword_counts,
@@ -8,28 +17,100 @@ from agent.tools import (
 )
 
 
-def create_text_worker(model_name: str):
-    """ReAct worker: inline text analysis (simple, no IO/web)."""
-    model = ChatOpenAI(model=model_name)
-    return create_agent(
+class LazyWorker:
+    """Worker graph built on its first handoff, so startup only pays for the supervisor.
+
+    Exposes ``invoke``/``ainvoke`` like the compiled graph. ``build_seconds``
+    records how long the build took once it happened.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], object]):
+        self.name = name
+        self._factory = factory
+        self._graph = None
+        self._lock = threading.Lock()
+        self.build_seconds: Optional[float] = None
+
+    @property
+    def built(self) -> bool:
+        return self._graph is not None
+
+    def get(self):
+        if self._graph is None:
+            with self._lock:
+                if self._graph is None:
+                    started = time.perf_counter()
+                    self._graph = self._factory()
+                    self.build_seconds = time.perf_counter() - started
+        return self._graph
+
+    def invoke(self, *args, **kwargs):
+        return self.get().invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        # The first build imports the agent runtime; keep that off the event loop
+        graph = self._graph if self._graph is not None else await asyncio.to_thread(self.get)
+        return await graph.ainvoke(*args, **kwargs)
+
+
+def _with_direct_path(agent, direct_answer, *, name: str):
+    """Wrap a ReAct worker: try the deterministic pipeline first, fall back to the agent."""
+
+    def direct(state: MessagesState):
+        content = state["messages"][-1].content
+        answer = direct_answer(content) if isinstance(content, str) else None
+        if answer is None:
+            return {}
+        return {"messages": [AIMessage(content=answer, name=name)]}
+
+    def route_after_direct(state: MessagesState):
+        return END if isinstance(state["messages"][-1], AIMessage) else "agent"
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("direct", direct)
+    builder.add_node("agent", agent)
+    builder.add_edge(START, "direct")
+    builder.add_conditional_edges("direct", route_after_direct, {"agent": "agent", END: END})
+    builder.add_edge("agent", END)
+    return builder.compile(name=name)
+
+
+def create_text_worker(model_name: str, mode: str = "react"):
+    """ReAct worker: inline text analysis (simple, no IO/web).
+
+    ``mode="direct"`` answers well-formed requests without calling the model.
+    """
+    from langchain.agents import create_agent
+
+    model = make_chat_model(model_name, agent="text_agent")
+    agent = create_agent(
         model,
-        tools=[extract_entities, keyword_counts],
+        tools=[compact_tool(indexed_tool(extract_entities)), compact_tool(indexed_tool(keyword_counts))],
         system_prompt=(
             "You are a simple Text Analysis Agent. Work only on the text provided inline in the user's message.\n"
             "Use exactly these tools:\n"
             "- extract_entities(text): Title-Case entities.\n"
             "- keyword_counts(text, top_k, min_length): top-k keywords with counts (language-agnostic, filters by min_length only).\n"
-            "Keep it simple: identify the text span (after 'text:' / quoted / full message), call the tools, and synthesize a concise final answer (2–4 bullets + lists). No IO/web."
+            "Keep it simple: identify the text span (after 'text:' / quoted / full message), call the tools, and synthesize a concise final answer (2–4 bullets + lists). No IO/web.\n"
+            "If the text is a handle like <<text:1a2b3c4d5e6f>>, pass the handle itself as the tool's text argument."
         ),
     )
+    if mode == "direct":
+        return _with_direct_path(agent, text_direct_answer, name="text_agent")
+    return agent
+
+
+def create_data_worker(model_name: str, mode: str = "react"):
+    """ReAct worker: statistics + table formatting (always synthesize final answer).
 
+    ``mode="direct"`` answers well-formed number lists without calling the model.
+    """
+    from langchain.agents import create_agent
 
-def create_data_worker(model_name: str):
-    """ReAct worker: statistics + table formatting (always synthesize final answer)."""
-    model = ChatOpenAI(model=model_name)
-    return create_agent(
+    model = make_chat_model(model_name, agent="data_agent")
+    agent = create_agent(
         model,
-        tools=[calculate_stats, format_table],
+        tools=[compact_tool(indexed_tool(calculate_stats)), compact_tool(format_table)],
         system_prompt=(
             "You are a Data Agent. Your job is to compute numeric statistics and present them clearly.\n"
             "When the user asks for statistics (keywords like 'stats', 'calculate stats', or a list of numbers):\n"
@@ -38,6 +119,12 @@ def create_data_worker(model_name: str):
             "3) Call format_table(<stats_dict>) to produce a markdown table of the results.\n"
             "4) THEN write a concise final answer that includes: the table and 1-2 short insights (e.g., mean, range).\n"
             "Rules: ALWAYS include the computed values (never just acknowledge). NEVER respond with a generic sentence.\n"
-            "If the input is invalid, explain what's wrong and suggest a corrected format."
+            "If the input is invalid, explain what's wrong and suggest a corrected format.\n"
+            "If the numbers are a handle like <<numbers:1a2b3c4d5e6f>>, pass the handle itself as calculate_stats(numbers).\n"
+            "For row data, pass the rows (or a <<text:...>> handle to JSON rows) to format_table. Large tables come back "
+            "as a summary with a handle to the full table; keep the handle in your answer rather than listing every row."
         ),
     )
+    if mode == "direct":
+        return _with_direct_path(agent, data_direct_answer, name="data_agent")
+    return agent
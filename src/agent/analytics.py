@@ -0,0 +1,331 @@
+"""Per-session analytics index and content-hash memo for worker tools.
+
+Follow-ups such as "what were the entities in my last query?" should not
+send the conversation back through a worker. This module keeps what the
+tools already computed:
+
+- ``ResultMemo``: process-wide LRU of tool results keyed by a hash of the
+  tool name and its arguments (``TOOL_MEMO_SIZE`` entries). Large inputs
+  arrive as content-addressed artifact handles, so the same text or number
+  list hashes the same however it was pasted. A repeated analysis returns the
+  stored value without running the tool
+- ``SessionIndex``: per thread, the turns of the conversation with the
+  results of every indexed tool (``extract_entities``, ``keyword_counts``,
+  ``calculate_stats``). Entity and keyword counters across the session are
+  updated as results arrive; each distinct analysis is counted once
+- ``session_lookup``: supervisor tool that answers from the index (last turn,
+  one turn or the whole session) without a handoff
+
+``indexed_tool`` wraps a worker tool with both. The supervisor graph marks the
+start of each turn (``begin_turn``). The index lives in process memory,
+bounded by ``SESSION_INDEX_MAX_SESSIONS`` threads and
+``SESSION_INDEX_MAX_TURNS`` turns per thread. ``SESSION_INDEX=off`` and
+``TOOL_MEMO=off`` disable the two halves.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Optional
+
+from langchain_core.runnables.config import ensure_config
+from langchain_core.tools import BaseTool, StructuredTool
+
+from agent.encoding import compact_enabled, encode_result
+from agent.metrics import get_metrics
+
+# Tool name -> index kind
+INDEXED_TOOLS = {
+    "extract_entities": "entities",
+    "keyword_counts": "keywords",
+    "calculate_stats": "stats",
+}
+KINDS = ("entities", "keywords", "stats", "turns")
+_MISSING = object()
+
+
+def session_index_enabled() -> bool:
+    return os.getenv("SESSION_INDEX", "on").strip().lower() not in {"off", "false", "0", "no"}
+
+
+def memo_enabled() -> bool:
+    return os.getenv("TOOL_MEMO", "on").strip().lower() not in {"off", "false", "0", "no"}
+
+
+def memo_key(tool: str, args: dict) -> str:
+    payload = json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{tool}\0{payload}".encode("utf-8")).hexdigest()
+
+
+def current_thread_id() -> Optional[str]:
+    """``thread_id`` of the run the caller is part of (worker runs inherit it)."""
+    thread_id = ensure_config().get("configurable", {}).get("thread_id")
+    return str(thread_id) if thread_id is not None else None
+
+
+class ResultMemo:
+    """Thread-safe LRU of tool results keyed by ``memo_key``."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+@dataclass
+class Turn:
+    number: int
+    query: str
+    # kind -> results recorded during the turn, in order
+    results: Dict[str, List[Any]] = field(default_factory=dict)
+    keys: set = field(default_factory=set)
+
+
+class SessionIndex:
+    """Turns and running entity/keyword counters for one conversation thread."""
+
+    def __init__(self, max_turns: int = 100):
+        self.turns: deque = deque(maxlen=max_turns)
+        self.entities: Counter = Counter()
+        self.labels: Dict[str, str] = {}
+        self.keywords: Counter = Counter()
+        self._seen: set = set()
+        self._last: Dict[str, int] = {}
+        self._count = 0
+
+    def begin_turn(self, query: str) -> Turn:
+        self._count += 1
+        turn = Turn(self._count, " ".join(query.split())[:200])
+        self.turns.append(turn)
+        return turn
+
+    def record(self, kind: str, key: str, value: Any) -> None:
+        if not self.turns:
+            self.begin_turn("")
+        turn = self.turns[-1]
+        if key in turn.keys:
+            return
+        turn.keys.add(key)
+        turn.results.setdefault(kind, []).append(value)
+        self._last[kind] = turn.number
+        if key in self._seen:
+            return
+        # Session totals count each distinct analysis once, however often it is repeated
+        self._seen.add(key)
+        if kind == "entities":
+            for row in value:
+                self.entities[row["entity"]] += row.get("count", 1)
+                self.labels.setdefault(row["entity"], row.get("label", ""))
+        elif kind == "keywords":
+            for row in value:
+                self.keywords[row["term"]] += row["count"]
+
+    def _turn(self, number: int) -> Optional[Turn]:
+        first = self.turns[0].number if self.turns else 1
+        if number < first or number > self._count:
+            return None
+        return self.turns[number - first]
+
+    def lookup(self, kind: str, turn: int = -1, top: int = 10) -> Any:
+        """Stored results: ``turn=-1`` the latest turn that has them, ``0`` the session, else turn N."""
+        if kind == "turns":
+            return [
+                {"turn": t.number, "query": t.query, "results": ",".join(t.results) or "-"}
+                for t in list(self.turns)[-top:]
+            ]
+        if turn == 0:
+            if kind == "entities":
+                return [{"entity": e, "label": self.labels.get(e, ""), "count": n} for e, n in self.entities.most_common(top)]
+            if kind == "keywords":
+                return [{"term": t, "count": n} for t, n in self.keywords.most_common(top)]
+            return [{"turn": t.number, **s} for t in self.turns for s in t.results.get("stats", ()) if isinstance(s, dict)][-top:]
+        number = self._last.get(kind) if turn < 0 else turn
+        found = self._turn(number) if number else None
+        results = found.results.get(kind) if found else None
+        if not results:
+            return None
+        if kind == "stats":
+            return results[-1] if len(results) == 1 else [{"call": i + 1, **r} for i, r in enumerate(results)]
+        # Several calls in one turn (e.g. two texts): merge their rows
+        merged: Counter = Counter()
+        labels: Dict[str, str] = {}
+        name = "entity" if kind == "entities" else "term"
+        for rows in results:
+            for row in rows:
+                merged[row[name]] += row.get("count", 1)
+                labels.setdefault(row[name], row.get("label", ""))
+        if kind == "entities":
+            return [{"entity": e, "label": labels[e], "count": n} for e, n in merged.most_common(top)]
+        return [{"term": t, "count": n} for t, n in merged.most_common(top)]
+
+    @property
+    def turn_count(self) -> int:
+        return self._count
+
+
+class AnalyticsIndex:
+    """Session indexes by thread id (LRU-bounded) plus the shared result memo."""
+
+    def __init__(self, max_sessions: int = 256, max_turns: int = 100, memo_size: int = 1024):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.memo = ResultMemo(memo_size)
+        self._sessions: "OrderedDict[str, SessionIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AnalyticsIndex":
+        return cls(
+            max_sessions=int(os.getenv("SESSION_INDEX_MAX_SESSIONS", "256")),
+            max_turns=int(os.getenv("SESSION_INDEX_MAX_TURNS", "100")),
+            memo_size=int(os.getenv("TOOL_MEMO_SIZE", "1024")),
+        )
+
+    def _session(self, thread_id: str, create: bool = True) -> Optional[SessionIndex]:
+        session = self._sessions.get(thread_id)
+        if session is None and create:
+            session = self._sessions[thread_id] = SessionIndex(self.max_turns)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        elif session is not None:
+            self._sessions.move_to_end(thread_id)
+        return session
+
+    def begin_turn(self, thread_id: Optional[str], query: str) -> None:
+        if thread_id is None:
+            return
+        with self._lock:
+            self._session(thread_id).begin_turn(query)
+
+    def record(self, thread_id: Optional[str], tool: str, key: str, value: Any) -> None:
+        kind = INDEXED_TOOLS.get(tool)
+        if thread_id is None or kind is None or not _indexable(kind, value):
+            return
+        with self._lock:
+            self._session(thread_id).record(kind, key, value)
+
+    def lookup(self, thread_id: Optional[str], kind: str, turn: int = -1, top: int = 10) -> Any:
+        if thread_id is None:
+            return None
+        with self._lock:
+            session = self._session(thread_id, create=False)
+            return session.lookup(kind, turn, top) if session is not None else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = len(self._sessions)
+            turns = sum(s.turn_count for s in self._sessions.values())
+        return {"sessions": sessions, "turns": turns, "memo": self.memo.stats()}
+
+
+def _indexable(kind: str, value: Any) -> bool:
+    # Error results ({"error": ...}) are not worth remembering
+    if kind == "stats":
+        return isinstance(value, dict) and "error" not in value
+    return isinstance(value, list) and all(isinstance(row, dict) for row in value)
+
+
+_shared: Optional[AnalyticsIndex] = None
+_shared_lock = threading.Lock()
+
+
+def get_session_index() -> AnalyticsIndex:
+    """Process-wide index shared by the worker tools and ``session_lookup``."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AnalyticsIndex.from_env()
+        return _shared
+
+
+def indexed_tool(tool: BaseTool) -> BaseTool:
+    """``tool`` with memoized results recorded in the caller's session index."""
+    use_memo, use_index = memo_enabled(), session_index_enabled()
+    if not use_memo and not use_index:
+        return tool
+    index = get_session_index()
+
+    def _cached(kwargs: dict):
+        key = memo_key(tool.name, kwargs)
+        value = index.memo.get(key, _MISSING) if use_memo else _MISSING
+        if value is not _MISSING:
+            get_metrics().record_event("tool_memo_hit")
+        return key, value
+
+    def _store(key: str, value: Any, fresh: bool) -> Any:
+        if fresh and use_memo and not (isinstance(value, dict) and "error" in value):
+            index.memo.put(key, value)
+        if use_index:
+            index.record(current_thread_id(), tool.name, key, value)
+        return value
+
+    def _run(**kwargs):
+        key, value = _cached(kwargs)
+        if value is _MISSING:
+            return _store(key, tool.func(**kwargs), True)
+        return _store(key, value, False)
+
+    async def _arun(**kwargs):
+        key, value = _cached(kwargs)
+        if value is _MISSING:
+            return _store(key, await tool.coroutine(**kwargs), True)
+        return _store(key, value, False)
+
+    return StructuredTool.from_function(
+        func=_run,
+        coroutine=_arun if getattr(tool, "coroutine", None) else None,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+    )
+
+
+def make_session_lookup_tool() -> BaseTool:
+    """Supervisor tool answering follow-ups from the session index."""
+    index = get_session_index()
+
+    def session_lookup(
+        kind: Literal["entities", "keywords", "stats", "turns"],
+        turn: int = -1,
+        top: int = 10,
+    ) -> str:
+        value = index.lookup(current_thread_id(), kind, turn, top)
+        if value is None:
+            where = "the last turn" if turn < 0 else "this session" if turn == 0 else f"turn {turn}"
+            return f"No {kind} recorded for {where}; hand the task to an agent instead."
+        return encode_result(value) if compact_enabled() else json.dumps(value, ensure_ascii=False)
+
+    return StructuredTool.from_function(
+        func=session_lookup,
+        name="session_lookup",
+        description=(
+            "Look up results already computed in this conversation, instantly and without an agent: "
+            "kind=entities|keywords|stats|turns; turn=-1 the latest turn with such results, 0 the whole "
+            "session, N a given turn (see kind=turns); top limits rows."
+        ),
+    )
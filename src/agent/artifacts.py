@@ -0,0 +1,207 @@
+"""Content-addressed store for large inline payloads.
+
+A long pasted document or number list would otherwise be tokenized by the
+supervisor, copied into a handoff ``task`` and tokenized again by the worker.
+``extract_artifacts`` moves such spans out of the user message into the
+store and leaves a short handle in their place:
+
+    Calculate stats for: <<numbers:3f2a9c1b7d0e>>
+    Extract entities from '<<text:9b1e04c2aa51>>'
+
+Handles are derived from the content (sha256), so the same payload always gets
+the same handle. The tools in ``agent.tools`` resolve handles themselves, so
+the models only ever see the handle and prompt size stays flat as inputs grow.
+
+The store is in-process and bounded (``ARTIFACT_MAX_BYTES``, LRU). With
+``ARTIFACT_DIR`` set, artifacts are also written there, so other processes
+(batch workers, server replicas) can resolve them. ``ARTIFACTS=off`` disables
+extraction; ``ARTIFACT_MIN_CHARS`` and ``ARTIFACT_MIN_NUMBERS`` set what
+counts as large.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+HANDLE = re.compile(r"<<(text|numbers):([0-9a-f]{12})>>")
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_THOUSANDS = re.compile(r"\d,\d{3}\b")
+# Double quotes only: apostrophes in prose ("don't", "the team's") are not delimiters
+_QUOTED = re.compile(r"([\"“])([^\"“”]+)[\"”]")
+_AFTER_COLON = re.compile(r"\b(?:text|from|in|of|analy[sz]e)\s*:\s*(.+)$", re.I | re.S)
+
+
+class ArtifactStore:
+    """Bounded LRU of artifact contents by digest, optionally mirrored to a directory."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, directory: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._items: OrderedDict[str, str] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stored = 0
+        self.chars_saved = 0
+
+    @staticmethod
+    def digest(kind: str, content: str) -> str:
+        return hashlib.sha256(f"{kind}\x00{content}".encode("utf-8")).hexdigest()[:12]
+
+    def put(self, kind: str, content: str) -> str:
+        """Store ``content`` and return its handle."""
+        digest = self.digest(kind, content)
+        self._remember(digest, content, len(content))
+        if self.directory is not None:
+            path = self.directory / digest
+            if not path.exists():
+                tmp = path.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_text(content, encoding="utf-8")
+                tmp.replace(path)
+        return self._saved(kind, digest, len(content))
+
+    def put_stream(self, kind: str, chunks: Iterable[str]) -> str:
+        """Store the concatenation of ``chunks`` without holding it all in memory when mirrored to disk.
+
+        Gets the same handle as ``put`` of the joined text. With a directory,
+        content larger than a quarter of ``max_bytes`` lives only on disk.
+        """
+        hasher = hashlib.sha256(f"{kind}\x00".encode("utf-8"))
+        parts: Optional[List[str]] = []
+        size = 0
+        tmp = out = None
+        if self.directory is not None:
+            tmp = self.directory / f"stream.{os.getpid()}.{threading.get_ident()}.tmp"
+            out = open(tmp, "w", encoding="utf-8")
+        try:
+            for chunk in chunks:
+                hasher.update(chunk.encode("utf-8"))
+                size += len(chunk)
+                if out is not None:
+                    out.write(chunk)
+                    if parts is not None and size > self.max_bytes // 4:
+                        parts = None
+                if parts is not None:
+                    parts.append(chunk)
+        finally:
+            if out is not None:
+                out.close()
+        digest = hasher.hexdigest()[:12]
+        if tmp is not None:
+            path = self.directory / digest
+            if path.exists():
+                tmp.unlink()
+            else:
+                tmp.replace(path)
+        if parts is not None:
+            self._remember(digest, "".join(parts), size)
+        return self._saved(kind, digest, size)
+
+    def _remember(self, digest: str, content: str, size: int) -> None:
+        with self._lock:
+            if digest in self._items:
+                self._items.move_to_end(digest)
+                return
+            self._items[digest] = content
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _saved(self, kind: str, digest: str, size: int) -> str:
+        handle = f"<<{kind}:{digest}>>"
+        with self._lock:
+            self.stored += 1
+            self.chars_saved += size - len(handle)
+        return handle
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            if digest in self._items:
+                self._items.move_to_end(digest)
+                return self._items[digest]
+        if self.directory is not None:
+            path = self.directory / digest
+            if path.exists():
+                return path.read_text(encoding="utf-8")
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "artifacts": len(self._items),
+                "bytes": self._bytes,
+                "stored": self.stored,
+                "chars_saved": self.chars_saved,
+            }
+
+
+_shared: Optional[ArtifactStore] = None
+_shared_lock = threading.Lock()
+
+
+def artifacts_enabled() -> bool:
+    return os.getenv("ARTIFACTS", "on").strip().lower() not in {"off", "false", "0", "no"}
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Process-wide store used by the graph and the tools."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ArtifactStore(
+                max_bytes=int(os.getenv("ARTIFACT_MAX_BYTES", str(64 * 1024 * 1024))),
+                directory=os.getenv("ARTIFACT_DIR") or None,
+            )
+        return _shared
+
+
+def _lookup(kind: str, digest: str) -> str:
+    content = get_artifact_store().get(digest)
+    if content is None:
+        raise ValueError(f"Unknown artifact <<{kind}:{digest}>> (expired, or stored by another process)")
+    # A document may embed a number-list handle extracted before it
+    return resolve_text(content)
+
+
+def resolve_text(value: str) -> str:
+    """``value`` with every handle replaced by its content."""
+    return HANDLE.sub(lambda m: _lookup(m.group(1), m.group(2)), value)
+
+
+def extract_artifacts(text: str, min_chars: Optional[int] = None, min_numbers: Optional[int] = None) -> str:
+    """Replace large number lists and text spans in ``text`` with handles."""
+    if min_chars is None:
+        min_chars = int(os.getenv("ARTIFACT_MIN_CHARS", "1500"))
+    if min_numbers is None:
+        min_numbers = int(os.getenv("ARTIFACT_MIN_NUMBERS", "50"))
+    store = get_artifact_store()
+
+    # Runs of numbers separated by commas, semicolons or whitespace; "1,000" is ambiguous, so left alone
+    run = re.compile(rf"{_NUMBER}(?:(?:\s*[,;]\s*|\s+){_NUMBER}){{{max(min_numbers - 1, 1)},}}")
+
+    def _numbers(match: re.Match) -> str:
+        span = match.group(0)
+        return match.group(0) if _THOUSANDS.search(span) else store.put("numbers", span)
+
+    text = run.sub(_numbers, text)
+
+    def _quoted(match: re.Match) -> str:
+        body = match.group(2)
+        if len(body) < min_chars or HANDLE.fullmatch(body):
+            return match.group(0)
+        return f"{match.group(1)}{store.put('text', body)}{match.group(0)[-1]}"
+
+    replaced = _QUOTED.sub(_quoted, text)
+    if replaced != text:
+        return replaced
+    after = _AFTER_COLON.search(text)
+    if after and len(after.group(1)) >= min_chars and not HANDLE.fullmatch(after.group(1).strip()):
+        return text[: after.start(1)] + store.put("text", after.group(1))
+    return text
@@ -0,0 +1,139 @@
+"""Batch runner: many queries through one compiled (async) graph.
+
+Input is JSONL: one object per line with ``query`` (and optional ``id``), or
+a bare JSON string. Results are appended to the output JSONL as they
+complete, one object per query with the response or the captured error.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from langchain_core.messages import HumanMessage
+
+from agent.deadline import deadline_scope
+
+
+@dataclass
+class BatchItem:
+    index: int
+    id: str
+    query: str
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    ok: int = 0
+    errors: int = 0
+    wall_seconds: float = 0.0
+    latencies_ms: List[float] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Completed queries per second of wall time."""
+        return self.total / self.wall_seconds if self.wall_seconds else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile of per-query latency (ms)."""
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        rank = max(math.ceil(p / 100 * len(ordered)) - 1, 0)
+        return ordered[min(rank, len(ordered) - 1)]
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "ok": self.ok,
+            "errors": self.errors,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "throughput_qps": round(self.throughput, 3),
+            "latency_ms": {
+                f"p{p}": round(self.percentile(p), 1) for p in (50, 90, 95, 99)
+            } | {"max": round(max(self.latencies_ms, default=0.0), 1)},
+        }
+
+
+def read_jsonl(path: str | Path) -> List[BatchItem]:
+    """Parse batch input; blank lines are skipped, malformed lines raise ValueError."""
+    items: List[BatchItem] = []
+    with open(path, encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{path}:{lineno}: invalid JSON ({exc.msg})") from exc
+            if isinstance(record, str):
+                query, item_id = record, None
+            elif isinstance(record, dict) and isinstance(record.get("query"), str):
+                query, item_id = record["query"], record.get("id")
+            else:
+                raise ValueError(f"{path}:{lineno}: expected a string or an object with a 'query' field")
+            index = len(items)
+            items.append(BatchItem(index=index, id=str(item_id if item_id is not None else index), query=query))
+    return items
+
+
+async def run_batch(
+    graph,
+    items: List[BatchItem],
+    out_path: str | Path,
+    *,
+    concurrency: int = 4,
+    recursion_limit: int = 25,
+    deadline: Optional[float] = None,
+    on_result: Optional[Callable[[dict], None]] = None,
+) -> BatchSummary:
+    """Run ``items`` with at most ``concurrency`` in flight; stream results to ``out_path``.
+
+    ``deadline`` (seconds) bounds each query from the moment it starts running.
+    """
+    summary = BatchSummary(total=len(items))
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def _one(item: BatchItem) -> dict:
+        async with semaphore:
+            started = time.perf_counter()
+            record = {"id": item.id, "index": item.index, "query": item.query}
+            try:
+                with deadline_scope(deadline):
+                    result = await graph.ainvoke(
+                        {"messages": [HumanMessage(content=item.query)]},
+                        config={
+                            "configurable": {"thread_id": f"batch-{item.id}-{uuid.uuid4()}"},
+                            "recursion_limit": recursion_limit,
+                        },
+                    )
+                record["response"] = result["messages"][-1].content
+                record["error"] = None
+            except Exception as exc:  # per-item capture; the batch keeps going
+                record["response"] = None
+                record["error"] = f"{type(exc).__name__}: {exc}"
+            record["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return record
+
+    started = time.perf_counter()
+    with open(out_path, "w", encoding="utf-8") as out:
+        for future in asyncio.as_completed([_one(item) for item in items]):
+            record = await future
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            summary.latencies_ms.append(record["latency_ms"])
+            if record["error"] is None:
+                summary.ok += 1
+            else:
+                summary.errors += 1
+            if on_result is not None:
+                on_result(record)
+    summary.wall_seconds = time.perf_counter() - started
+    return summary
@@ -0,0 +1,193 @@
+"""Offline benchmark suite for the supervisor graph.
+
+Everything runs against ``ScriptedChatModel`` (``LLM_PROVIDER=fake``), so no
+API key or network is involved and results are repeatable. The suite reports:
+
+- ``framework``: end-to-end latency with zero model latency, i.e. the cost of
+  the supervisor/handoff design itself, plus per-node timings
+- ``simulated``: the same with ``model_latency`` seconds per model call
+- ``throughput``: queries/second and latency percentiles per concurrency level
+- ``memory``: peak Python allocations (tracemalloc) while repeating the
+  highest-concurrency run, and the process max RSS
+
+Per-node entries are keyed ``node:<name>`` (top-level graph nodes),
+``worker:<agent>`` (a handoff, i.e. a whole worker subgraph run),
+``tool:<name>`` (worker tools) and ``model:<agent>``, as recorded by
+``agent.metrics.MetricsCallbackHandler``. ``self_ms`` is a node's time minus
+the model calls nested inside it.
+
+``compare`` checks a result against a saved baseline; ``lgsq bench`` wraps
+all of this and exits non-zero on regressions.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.messages import HumanMessage
+
+from agent.batch import BatchItem, run_batch
+from agent.checkpoint import BoundedMemorySaver
+from agent.metrics import MetricsCallbackHandler
+
+DEFAULT_QUERIES = [
+    "Calculate stats for: 10, 20, 30, 40, 50",
+    "Extract entities from 'Microsoft and Google opened offices in Berlin'",
+    "Analyze text 'OpenAI released GPT models in San Francisco' and compute stats for 3, 5, 8, 13",
+    "Show a table with the mean and median of 2.5, 3.5, 9, 12",
+    "What keywords appear in 'data pipelines move data between data stores'?",
+]
+
+
+def _latency_summary(latencies_ms: Sequence[float]) -> dict:
+    ordered = sorted(latencies_ms)
+    pick = lambda p: ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)]
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(pick(50), 3),
+        "p95": round(pick(95), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+@contextmanager
+def _scoped_env(**values: str) -> Iterator[None]:
+    """Set environment variables for the duration of the block, then restore them."""
+    saved = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def build_bench_graph(model_latency: float = 0.0):
+    """Async supervisor graph on the scripted model; no cache, pre-router or shared state.
+
+    The settings apply to this graph only: it is built in full (workers
+    included) while they are set, and the environment is restored afterwards.
+    """
+    from agent.graph import build_system_tools_mode
+
+    # Repeated queries would otherwise be served from the LLM cache and the tool memo
+    with _scoped_env(LLM_PROVIDER="fake", FAKE_LLM_LATENCY=str(model_latency), LLM_CACHE="off", TOOL_MEMO="off"):
+        return build_system_tools_mode(async_mode=True, checkpointer=BoundedMemorySaver(), eager_workers=True)
+
+
+async def measure_latency(graph, queries: Sequence[str], repeats: int) -> dict:
+    """Sequential end-to-end latency with per-node timings."""
+    timer = MetricsCallbackHandler()
+    latencies: List[float] = []
+    runs = 0
+    for _ in range(repeats):
+        for query in queries:
+            config = {"configurable": {"thread_id": f"bench-{uuid.uuid4()}"}, "callbacks": [timer]}
+            started = time.perf_counter()
+            await graph.ainvoke({"messages": [HumanMessage(content=query)]}, config=config)
+            latencies.append((time.perf_counter() - started) * 1000)
+            runs += 1
+    return {"queries": runs, "latency_ms": _latency_summary(latencies), "nodes": timer.report(runs)}
+
+
+async def measure_throughput(graph, queries: Sequence[str], levels: Sequence[int], requests: int) -> dict:
+    """Throughput and latency percentiles for ``requests`` queries at each concurrency level."""
+    items = [BatchItem(index=i, id=str(i), query=queries[i % len(queries)]) for i in range(requests)]
+    results = {}
+    for level in levels:
+        summary = await run_batch(graph, items, os.devnull, concurrency=level)
+        results[str(level)] = summary.as_dict()
+    return results
+
+
+def _max_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_benchmark(
+    *,
+    model_latency: float = 0.05,
+    repeats: int = 5,
+    concurrency: Sequence[int] = (1, 4, 16),
+    requests: int = 48,
+    queries: Sequence[str] = DEFAULT_QUERIES,
+) -> dict:
+    """Run the full suite; returns a JSON-serializable dict."""
+    framework = await measure_latency(build_bench_graph(0.0), queries, repeats)
+
+    graph = build_bench_graph(model_latency)
+    simulated = await measure_latency(graph, queries, max(repeats // 2, 1))
+
+    levels = sorted(set(concurrency))
+    throughput = await measure_throughput(graph, queries, levels, requests)
+    # Separate pass: tracemalloc slows allocation-heavy code, so keep it out of the timings
+    tracemalloc.start()
+    try:
+        await measure_throughput(graph, queries, levels[-1:], requests)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "config": {
+            "model_latency_s": model_latency,
+            "repeats": repeats,
+            "requests": requests,
+            "concurrency": levels,
+            "queries": len(queries),
+        },
+        "framework": framework,
+        "simulated": simulated,
+        "throughput": throughput,
+        "memory": {
+            "tracemalloc_peak_mb": round(peak / (1024 * 1024), 2),
+            "max_rss_mb": _max_rss_mb(),
+        },
+    }
+
+
+def _tracked_metrics(result: dict) -> Dict[str, tuple[float, bool]]:
+    """Metric name -> (value, higher_is_better)."""
+    metrics = {
+        "framework.latency_ms.p50": (result["framework"]["latency_ms"]["p50"], False),
+        "simulated.latency_ms.p50": (result["simulated"]["latency_ms"]["p50"], False),
+        "memory.tracemalloc_peak_mb": (result["memory"]["tracemalloc_peak_mb"], False),
+    }
+    for level, summary in result["throughput"].items():
+        metrics[f"throughput.{level}.throughput_qps"] = (summary["throughput_qps"], True)
+    return metrics
+
+
+def compare(result: dict, baseline: dict, threshold: float = 0.25) -> List[str]:
+    """Regressions worse than ``threshold`` (relative) versus ``baseline``; empty when clean."""
+    current = _tracked_metrics(result)
+    regressions = []
+    for name, (base_value, higher_is_better) in _tracked_metrics(baseline).items():
+        if name not in current or not base_value:
+            continue
+        value = current[name][0]
+        change = (value - base_value) / base_value
+        if (-change if higher_is_better else change) > threshold:
+            regressions.append(f"{name}: {base_value} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def run(**kwargs) -> dict:
+    """Sync wrapper around ``run_benchmark``."""
+    return asyncio.run(run_benchmark(**kwargs))
@@ -0,0 +1,254 @@
+"""Shared LLM response cache for the supervisor and worker models.
+
+Plugs into LangChain's ``BaseCache`` hook (``ChatOpenAI(cache=...)``), so the
+key already covers the model name/parameters and the bound tools via
+``llm_string``. Lookups try the exact serialized prompt first, then a
+normalized form (message ids, metadata and whitespace differences dropped).
+
+Backends:
+- ``LRUCache``: in-process, bounded, with TTL
+- ``SQLiteCache``: on-disk, survives restarts
+
+Configured from env (``LLM_CACHE``, ``LLM_CACHE_PATH``, ``LLM_CACHE_TTL``,
+``LLM_CACHE_MAXSIZE``, ``LLM_CACHE_DISABLE``).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from langchain_core._api import suppress_langchain_beta_warning
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+_WS = re.compile(r"\s+")
+# Serialized message fields that vary between otherwise identical prompts
+_VOLATILE_KEYS = {"id", "response_metadata", "usage_metadata", "additional_kwargs", "tool_call_id"}
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in sorted(value.items()) if k not in _VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return _WS.sub(" ", value).strip()
+    return value
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical form of a serialized prompt; falls back to whitespace folding."""
+    try:
+        return json.dumps(_normalize(json.loads(prompt)), sort_keys=True, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return _WS.sub(" ", prompt).strip()
+
+
+def _key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _fresh(generations: Sequence[Generation]) -> list[Generation]:
+    """Copies with message ids cleared so replayed answers don't collide in graph state."""
+    out = []
+    for gen in generations:
+        message = getattr(gen, "message", None)
+        if message is not None:
+            gen = gen.model_copy(update={"message": message.model_copy(update={"id": None})})
+        out.append(gen)
+    return out
+
+
+class _CountingCache(BaseCache, ABC):
+    """Exact-then-normalized lookup with hit/miss/eviction counters; backends implement the hooks."""
+
+    def __init__(self) -> None:
+        self._stats_lock = threading.Lock()
+        self._counters = {"hits": 0, "normalized_hits": 0, "misses": 0, "updates": 0, "evictions": 0}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._counters[name] += n
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["normalized_hits"] + counters["misses"]
+        counters["hit_rate"] = round((lookups - counters["misses"]) / lookups, 3) if lookups else 0.0
+        counters["size"] = self.size()
+        return counters
+
+    # Backend hooks
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Sequence[Generation]]:
+        """Stored generations for ``key``, or None when missing or expired."""
+
+    @abstractmethod
+    def _set(self, key: str, value: Sequence[Generation]) -> None:
+        """Store ``value`` under ``key``, evicting as the backend requires."""
+
+    @abstractmethod
+    def size(self) -> int:
+        """Number of stored entries."""
+
+    # BaseCache API
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        value = self._get(_key(prompt, llm_string))
+        if value is not None:
+            self._count("hits")
+            return _fresh(value)
+        value = self._get(_key(normalize_prompt(prompt), llm_string))
+        if value is not None:
+            self._count("normalized_hits")
+            return _fresh(value)
+        self._count("misses")
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self._set(_key(prompt, llm_string), return_val)
+        self._set(_key(normalize_prompt(prompt), llm_string), return_val)
+        self._count("updates")
+
+
+class LRUCache(_CountingCache):
+    """In-process LRU with a per-entry TTL (seconds; 0 disables expiry)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: OrderedDict[str, tuple[float, Sequence[Generation]]] = OrderedDict()
+
+    def _get(self, key: str) -> Optional[Sequence[Generation]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self._count("evictions")
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Sequence[Generation]) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), list(value))
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(_CountingCache):
+    """On-disk cache; entries older than ``ttl`` seconds are dropped on read."""
+
+    def __init__(self, path: str | Path = ".cache/llm_cache.sqlite", ttl: float = 86400.0, maxsize: int = 0) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    def _get(self, key: str) -> Optional[Sequence[Generation]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl and time.time() - row[1] > self.ttl:
+                with self._conn:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._count("evictions")
+                return None
+        with suppress_langchain_beta_warning():
+            return loads(row[0])
+
+    def _set(self, key: str, value: Sequence[Generation]) -> None:
+        payload = dumps(list(value))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created) VALUES (?, ?, ?)",
+                (key, payload, time.time()),
+            )
+            if self.maxsize:
+                cur = self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.maxsize,),
+                )
+                if cur.rowcount > 0:
+                    self._count("evictions", cur.rowcount)
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+
+_shared_lock = threading.Lock()
+_shared: Optional[_CountingCache] = None
+
+
+def get_shared_cache() -> Optional[_CountingCache]:
+    """Process-wide cache selected by ``LLM_CACHE`` (off | memory | sqlite)."""
+    global _shared
+    backend = os.getenv("LLM_CACHE", "off").strip().lower()
+    if backend in {"", "off", "false", "0", "none"}:
+        return None
+    with _shared_lock:
+        if _shared is None:
+            ttl = float(os.getenv("LLM_CACHE_TTL", "86400"))
+            maxsize = int(os.getenv("LLM_CACHE_MAXSIZE", "1024"))
+            if backend == "sqlite":
+                path = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+                _shared = SQLiteCache(path, ttl=ttl, maxsize=maxsize)
+            elif backend == "memory":
+                _shared = LRUCache(maxsize=maxsize, ttl=ttl)
+            else:
+                raise ValueError(f"Unknown LLM_CACHE backend: {backend!r} (use off, memory or sqlite)")
+        return _shared
+
+
+def llm_cache_for(agent: str) -> BaseCache | bool | None:
+    """Value for a model's ``cache=`` field: the shared cache, or False if ``agent`` opted out.
+
+    ``LLM_CACHE_DISABLE`` is a comma-separated list of agent names
+    (``supervisor``, ``text_agent``, ``data_agent``).
+    """
+    disabled = {a.strip() for a in os.getenv("LLM_CACHE_DISABLE", "").split(",") if a.strip()}
+    if agent in disabled:
+        return False
+    return get_shared_cache()
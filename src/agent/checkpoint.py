@@ -0,0 +1,284 @@
+"""Checkpointers with bounded memory.
+
+``BoundedMemorySaver`` is an ``InMemorySaver`` that evicts whole threads
+(LRU + idle TTL) and prunes old checkpoints inside each thread, so a
+long-lived process that opens a new thread per request stays flat.
+``sqlite_saver()`` keeps checkpoints on disk with the same
+per-thread cap. Both report resident checkpoint counts and bytes via
+``stats()``.
+
+Selected from env by ``checkpointer_from_env()`` (``CHECKPOINTER``,
+``CHECKPOINT_MAX_THREADS``, ``CHECKPOINT_MAX_PER_THREAD``,
+``CHECKPOINT_TTL``, ``CHECKPOINT_PATH``).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """In-memory checkpointer with thread LRU/TTL eviction and a per-thread checkpoint cap.
+
+    The latest root checkpoint and the latest checkpoint of any still-running
+    nested graph (worker subgraphs) are never pruned, so resuming a thread
+    always works while it is resident.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = 256,
+        max_checkpoints_per_thread: int = 20,
+        ttl: float = 3600.0,
+        serde=None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.max_threads = max_threads
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._last_access: OrderedDict[str, float] = OrderedDict()
+        # (thread_id, checkpoint_ns, checkpoint_id) -> channel_versions, used for blob GC
+        self._versions: dict[tuple[str, str, str], dict] = {}
+        self.evicted_threads = 0
+        self.pruned_checkpoints = 0
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    def get_tuple(self, config: RunnableConfig):
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            if thread_id in self._last_access:
+                self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            self._versions[(thread_id, checkpoint_ns, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+            self._touch(thread_id)
+            self._prune_thread(thread_id)
+            self._evict_threads(keep=thread_id)
+            return result
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+            checkpoint_id = config["configurable"]["checkpoint_id"]
+            # Never resurrect writes for a checkpoint that was already pruned/evicted
+            if checkpoint_id not in self.storage.get(thread_id, {}).get(checkpoint_ns, {}):
+                return
+            super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._last_access.pop(thread_id, None)
+            for key in [k for k in self._versions if k[0] == thread_id]:
+                del self._versions[key]
+
+    def _prune_thread(self, thread_id: str) -> None:
+        namespaces = self.storage.get(thread_id)
+        if not namespaces:
+            return
+        entries = sorted(
+            ((cid, ns) for ns, checkpoints in namespaces.items() for cid in checkpoints),
+            reverse=True,
+        )
+        if len(entries) <= self.max_checkpoints_per_thread:
+            return
+        root = namespaces.get("")
+        root_latest = max(root) if root else ""
+        protected = {("", root_latest)} if root_latest else set()
+        for ns, checkpoints in namespaces.items():
+            latest = max(checkpoints) if checkpoints else ""
+            if ns and latest > root_latest:  # nested graph still running
+                protected.add((ns, latest))
+        budget = max(self.max_checkpoints_per_thread - len(protected), 0)
+        drop = [(ns, cid) for cid, ns in entries if (ns, cid) not in protected][budget:]
+        touched_ns = set()
+        for ns, cid in drop:
+            del namespaces[ns][cid]
+            self.writes.pop((thread_id, ns, cid), None)
+            self._versions.pop((thread_id, ns, cid), None)
+            touched_ns.add(ns)
+        self.pruned_checkpoints += len(drop)
+        for ns in touched_ns:
+            live = {
+                (channel, version)
+                for cid in namespaces[ns]
+                for channel, version in self._versions.get((thread_id, ns, cid), {}).items()
+            }
+            for key in [k for k in self.blobs if k[0] == thread_id and k[1] == ns and (k[2], k[3]) not in live]:
+                del self.blobs[key]
+            if not namespaces[ns]:
+                del namespaces[ns]
+
+    def _evict_threads(self, keep: str) -> None:
+        now = time.monotonic()
+        while self._last_access:
+            oldest, last_seen = next(iter(self._last_access.items()))
+            over_cap = len(self._last_access) > self.max_threads
+            expired = bool(self.ttl) and now - last_seen > self.ttl
+            if oldest == keep or not (over_cap or expired):
+                break
+            self.delete_thread(oldest)
+            self.evicted_threads += 1
+
+    def stats(self) -> dict:
+        """Resident threads/checkpoints and approximate serialized bytes."""
+        with self._lock:
+            checkpoints = sum(len(c) for ns in self.storage.values() for c in ns.values())
+            size = sum(
+                len(cp[1]) + len(meta[1])
+                for ns in self.storage.values()
+                for c in ns.values()
+                for cp, meta, _parent in c.values()
+            )
+            size += sum(len(v[1]) for v in self.blobs.values())
+            size += sum(len(w[2][1]) for ws in self.writes.values() for w in ws.values())
+            return {
+                "backend": "bounded",
+                "threads": len(self.storage),
+                "checkpoints": checkpoints,
+                "blobs": len(self.blobs),
+                "bytes": size,
+                "evicted_threads": self.evicted_threads,
+                "pruned_checkpoints": self.pruned_checkpoints,
+            }
+
+
+def _sqlite_saver_cls():
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise ImportError(
+            "CHECKPOINTER=sqlite requires langgraph-checkpoint-sqlite (pip install langgraph-checkpoint-sqlite)"
+        ) from exc
+    return SqliteSaver
+
+
+def sqlite_saver(path: str | Path = ".cache/checkpoints.sqlite", max_checkpoints_per_thread: int = 20):
+    """SQLite-backed checkpointer that survives restarts and works with ``ainvoke``.
+
+    Async methods run the sync implementation in a worker thread (the stock
+    ``SqliteSaver`` is sync-only).
+    """
+    SqliteSaver = _sqlite_saver_cls()
+
+    class _PersistentSqliteSaver(SqliteSaver):
+        def put(self, config, checkpoint, metadata, new_versions):
+            result = super().put(config, checkpoint, metadata, new_versions)
+            if max_checkpoints_per_thread:
+                self._prune(config["configurable"]["thread_id"])
+            return result
+
+        def _prune(self, thread_id: str) -> None:
+            with self.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? "
+                    "AND checkpoint_id NOT IN (SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT ?) "
+                    "AND checkpoint_id NOT IN (SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? "
+                    "GROUP BY checkpoint_ns)",
+                    (thread_id, thread_id, max_checkpoints_per_thread, thread_id),
+                )
+                if cur.rowcount:
+                    cur.execute(
+                        "DELETE FROM writes WHERE thread_id = ? AND (checkpoint_ns, checkpoint_id) NOT IN "
+                        "(SELECT checkpoint_ns, checkpoint_id FROM checkpoints WHERE thread_id = ?)",
+                        (thread_id, thread_id),
+                    )
+
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None) -> AsyncIterator:
+            items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+            for item in items:
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id):
+            return await asyncio.to_thread(self.delete_thread, thread_id)
+
+        def stats(self) -> dict:
+            with self.cursor(transaction=False) as cur:
+                threads, checkpoints = cur.execute(
+                    "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints"
+                ).fetchone()
+                size = cur.execute(
+                    "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints"
+                ).fetchone()[0]
+                size += cur.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes").fetchone()[0]
+            return {
+                "backend": "sqlite",
+                "path": str(path),
+                "threads": threads,
+                "checkpoints": checkpoints,
+                "bytes": size,
+                "file_bytes": Path(path).stat().st_size if Path(path).exists() else 0,
+            }
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    return _PersistentSqliteSaver(conn)
+
+
+def checkpointer_from_env() -> BaseCheckpointSaver:
+    """Checkpointer selected by ``CHECKPOINTER`` (bounded | memory | sqlite; default bounded)."""
+    backend = os.getenv("CHECKPOINTER", "bounded").strip().lower()
+    max_per_thread = int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "20"))
+    if backend == "memory":
+        return InMemorySaver()
+    if backend == "sqlite":
+        return sqlite_saver(
+            os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite"),
+            max_checkpoints_per_thread=max_per_thread,
+        )
+    if backend == "bounded":
+        return BoundedMemorySaver(
+            max_threads=int(os.getenv("CHECKPOINT_MAX_THREADS", "256")),
+            max_checkpoints_per_thread=max_per_thread,
+            ttl=float(os.getenv("CHECKPOINT_TTL", "3600")),
+        )
+    raise ValueError(f"Unknown CHECKPOINTER: {backend!r} (use bounded, memory or sqlite)")
+
+
+def checkpointer_stats(checkpointer: Optional[BaseCheckpointSaver]) -> Optional[dict]:
+    """``stats()`` of a checkpointer when it provides one."""
+    stats = getattr(checkpointer, "stats", None)
+    return stats() if callable(stats) else None
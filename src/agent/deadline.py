@@ -0,0 +1,381 @@
+"""Request deadlines, per-call model timeouts and hedged model calls.
+
+A deadline is set once per request with ``deadline_scope(seconds)`` (CLI,
+batch runner, HTTP server). It lives in a context variable, so the
+supervisor, every handoff and every model call running for that request see
+the same absolute expiry. LangGraph copies the context into its node threads
+and tasks.
+
+``DeadlineChatModel`` wraps every chat model built by ``make_chat_model``:
+
+- each call gets ``min(MODEL_CALL_TIMEOUT, time left)``; when that runs out the
+  call is cancelled (async) or abandoned (sync) and ``ModelTimeout`` is raised
+  (``DeadlineExceeded`` when the request deadline was the limit)
+- with ``MODEL_HEDGE=on``, a call still running after the hedge delay (the
+  observed p95 latency once enough samples exist, ``MODEL_HEDGE_DELAY`` before
+  that) gets a duplicate, and the first response wins
+
+Abandoned sync calls keep their pool thread until the provider returns (OpenAI
+models get the budget as their HTTP timeout, so theirs end on time). At most
+``MODEL_MAX_ABANDONED`` of them may be outstanding: past that, new calls fail
+at once with ``ModelBacklog`` and hedges are skipped, instead of queueing
+behind dead calls until they time out.
+
+The graph turns timeouts into partial answers (see ``partial_answer``).
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from agent.metrics import get_metrics
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("lgsq_deadline", default=None)
+# Shared by all wrapped models for sync timeouts and hedges
+_POOL_SIZE = 32
+_pool = concurrent.futures.ThreadPoolExecutor(max_workers=_POOL_SIZE, thread_name_prefix="lgsq-model")
+
+
+class ModelTimeout(TimeoutError):
+    """A model call ran out of time."""
+
+
+class DeadlineExceeded(ModelTimeout):
+    """The request deadline expired."""
+
+
+class ModelBacklog(ModelTimeout):
+    """Too many abandoned calls still hold model pool threads to start another."""
+
+
+class _AbandonedCalls:
+    """Pool futures whose caller gave up on them, counted until their thread is free."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, future: concurrent.futures.Future) -> None:
+        # A future that never started is simply dropped
+        if future.cancel():
+            return
+        with self._lock:
+            self.count += 1
+        future.add_done_callback(self._release)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self.count -= 1
+
+
+_abandoned = _AbandonedCalls()
+
+
+def abandoned_calls() -> int:
+    """Sync model calls that timed out or lost a hedge but are still running."""
+    return _abandoned.count
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Run the enclosed request with a deadline ``seconds`` from now (None/0 = no deadline)."""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one."""
+    expiry = _deadline.get()
+    return None if expiry is None else expiry - time.monotonic()
+
+
+def request_deadline_from_env() -> Optional[float]:
+    """``REQUEST_DEADLINE`` in seconds; 0 or unset disables it."""
+    seconds = float(os.getenv("REQUEST_DEADLINE", "0") or 0)
+    return seconds if seconds > 0 else None
+
+
+def partial_answer(messages: List[BaseMessage], marker: str) -> str:
+    """Answer built from the worker results of the current turn after a deadline."""
+    results = []
+    for msg in reversed(messages):
+        if msg.type == "human":
+            break
+        # Prefer the worker's own answer (the artifact of a structured handoff)
+        content = getattr(msg, "artifact", None) if isinstance(getattr(msg, "artifact", None), str) else msg.content
+        if msg.type == "tool" and isinstance(content, str) and content and not content.startswith(marker):
+            results.append(content)
+    if not results:
+        return "⏱️ The request hit its deadline before any agent finished. Please try again."
+    body = "\n\n".join(reversed(results))
+    return f"⏱️ The request hit its deadline; here is what finished in time:\n\n{body}"
+
+
+class LatencyWindow:
+    """Recent call latencies, for the p95-based hedge delay."""
+
+    def __init__(self, size: int = 256):
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(max(math.ceil(p / 100 * len(ordered)) - 1, 0), len(ordered) - 1)]
+
+
+def _supports_request_timeout(model: BaseChatModel) -> bool:
+    # OpenAI models accept ``timeout`` per request, which aborts the HTTP call itself
+    return getattr(model, "supports_request_timeout", False) or type(model).__module__.startswith("langchain_openai")
+
+
+class DeadlineChatModel(BaseChatModel):
+    """Wraps a chat model with deadline-aware timeouts and optional hedging."""
+
+    inner: BaseChatModel
+    call_timeout: Optional[float] = None
+    hedge: bool = False
+    hedge_delay: float = 2.0
+    hedge_percentile: float = 95.0
+    hedge_min_samples: int = 20
+    max_abandoned: int = _POOL_SIZE // 2
+    _latencies: LatencyWindow = PrivateAttr(default_factory=LatencyWindow)
+
+    @classmethod
+    def from_env(cls, inner: BaseChatModel, **kwargs) -> "DeadlineChatModel":
+        call_timeout = float(os.getenv("MODEL_CALL_TIMEOUT", "0") or 0)
+        return cls(
+            inner=inner,
+            call_timeout=call_timeout if call_timeout > 0 else None,
+            hedge=os.getenv("MODEL_HEDGE", "").strip().lower() in {"on", "true", "1"},
+            hedge_delay=float(os.getenv("MODEL_HEDGE_DELAY", "2.0")),
+            hedge_percentile=float(os.getenv("MODEL_HEDGE_PERCENTILE", "95")),
+            max_abandoned=int(os.getenv("MODEL_MAX_ABANDONED", str(_POOL_SIZE // 2))),
+            **kwargs,
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self) -> dict:
+        # Same cache keys as the wrapped model
+        return self.inner._identifying_params
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        return self.inner._get_ls_params(stop=stop, **kwargs)
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+    def _budget(self) -> tuple[Optional[float], bool]:
+        """(seconds for this call, whether the request deadline is the limit)."""
+        left = remaining()
+        if left is not None and left <= 0:
+            get_metrics().record_event("deadline_exceeded")
+            raise DeadlineExceeded("request deadline reached before the model call")
+        if left is None or (self.call_timeout is not None and self.call_timeout < left):
+            return self.call_timeout, False
+        return left, True
+
+    def _timed_out(self, by_deadline: bool) -> ModelTimeout:
+        if by_deadline:
+            get_metrics().record_event("deadline_exceeded")
+            return DeadlineExceeded("request deadline reached during a model call")
+        get_metrics().record_event("model_call_timeout")
+        return ModelTimeout(f"model call exceeded {self.call_timeout}s")
+
+    def _pool_full(self) -> bool:
+        return _abandoned.count >= self.max_abandoned
+
+    def _backlog(self) -> ModelBacklog:
+        get_metrics().record_event("model_backlog")
+        return ModelBacklog(
+            f"{_abandoned.count} timed-out model calls are still running "
+            f"(MODEL_MAX_ABANDONED={self.max_abandoned}); not starting another"
+        )
+
+    def _hedge_after(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        observed = self._latencies.percentile(self.hedge_percentile, self.hedge_min_samples)
+        return observed if observed is not None else self.hedge_delay
+
+    def _call_kwargs(self, budget: Optional[float], kwargs: dict) -> dict:
+        if budget is not None and _supports_request_timeout(self.inner):
+            return {**kwargs, "timeout": budget}
+        return kwargs
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        budget, by_deadline = self._budget()
+        hedge_after = self._hedge_after()
+        kwargs = self._call_kwargs(budget, kwargs)
+        started = time.monotonic()
+        if budget is None and hedge_after is None:
+            result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self._latencies.add(time.monotonic() - started)
+            return result
+
+        if self._pool_full():
+            raise self._backlog()
+
+        def _submit(manager):
+            ctx = contextvars.copy_context()
+            return _pool.submit(ctx.run, self.inner._generate, messages, stop, manager, **kwargs)
+
+        futures = [_submit(run_manager)]
+        first_wait = budget if hedge_after is None else min(hedge_after, budget or hedge_after)
+        done, _ = concurrent.futures.wait(futures, timeout=first_wait)
+        if not done and hedge_after is not None:
+            left = None if budget is None else budget - (time.monotonic() - started)
+            if self._pool_full():
+                get_metrics().record_event("hedge_skipped")
+            elif left is None or left > 0:
+                get_metrics().record_event("hedge_fired")
+                futures.append(_submit(None))
+        result = self._first_result_sync(futures, budget, started, by_deadline)
+        self._latencies.add(time.monotonic() - started)
+        return result
+
+    def _first_result_sync(self, futures, budget, started, by_deadline) -> ChatResult:
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            left = None if budget is None else budget - (time.monotonic() - started)
+            if left is not None and left <= 0:
+                break
+            done, pending = concurrent.futures.wait(
+                pending, timeout=left, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        get_metrics().record_event("hedge_won")
+                    for other in pending:
+                        _abandoned.add(other)
+                    return future.result()
+                error = future.exception()
+        for future in pending:
+            _abandoned.add(future)
+        if error is not None and not pending:
+            raise error
+        raise self._timed_out(by_deadline)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        budget, by_deadline = self._budget()
+        hedge_after = self._hedge_after()
+        kwargs = self._call_kwargs(budget, kwargs)
+        started = time.monotonic()
+        tasks = [asyncio.ensure_future(self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs))]
+        try:
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(tasks, timeout=min(hedge_after, budget or hedge_after))
+                if not done and (budget is None or time.monotonic() - started < budget):
+                    get_metrics().record_event("hedge_fired")
+                    tasks.append(asyncio.ensure_future(self.inner._agenerate(messages, stop=stop, **kwargs)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                left = None if budget is None else budget - (time.monotonic() - started)
+                if left is not None and left <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=left, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            get_metrics().record_event("hedge_won")
+                        self._latencies.add(time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            if error is not None and not pending:
+                raise error
+            raise self._timed_out(by_deadline)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        budget, by_deadline = self._budget()
+        kwargs = self._call_kwargs(budget, kwargs)
+        started = time.monotonic()
+        if budget is None:
+            yield from self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self._latencies.add(time.monotonic() - started)
+            return
+
+        if self._pool_full():
+            raise self._backlog()
+        # Produce chunks on a pool thread so a stalled stream cannot outlive the budget
+        chunks: queue.Queue = queue.Queue()
+        done = object()
+
+        def _produce() -> None:
+            try:
+                for chunk in self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    chunks.put(chunk)
+                chunks.put(done)
+            except BaseException as exc:  # re-raised on the consumer side
+                chunks.put(exc)
+
+        producer = _pool.submit(contextvars.copy_context().run, _produce)
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=max(budget - (time.monotonic() - started), 0))
+                except queue.Empty:
+                    raise self._timed_out(by_deadline) from None
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            if not producer.done():
+                _abandoned.add(producer)
+        self._latencies.add(time.monotonic() - started)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        budget, by_deadline = self._budget()
+        started = time.monotonic()
+        stream = self.inner._astream(messages, stop=stop, run_manager=run_manager, **self._call_kwargs(budget, kwargs))
+        try:
+            while True:
+                left = None if budget is None else budget - (time.monotonic() - started)
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), timeout=left)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise self._timed_out(by_deadline) from None
+                yield chunk
+        finally:
+            await stream.aclose()
+        self._latencies.add(time.monotonic() - started)
@@ -0,0 +1,193 @@
+"""LLM-free "direct" pipelines for the workers.
+
+Each ``*_direct_answer`` parses the task deterministically, runs the worker's
+tool chain in plain Python and renders a templated answer. They return None
+whenever the input is not clearly well-formed so the caller can fall back to
+the ReAct agent.
+
+``DirectReturnPolicy`` works on the supervisor side, after the handoff. When
+exactly one worker ran and its answer already looks final, that answer ends
+the turn and the supervisor's synthesis call is skipped.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from agent.analytics import indexed_tool
+from agent.artifacts import resolve_text
+from agent.tools import calculate_stats, extract_entities, format_table, keyword_counts
+
+# Memoized and recorded in the session index, like the ReAct workers' tools
+_calculate_stats = indexed_tool(calculate_stats)
+_extract_entities = indexed_tool(extract_entities)
+_keyword_counts = indexed_tool(keyword_counts)
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+# What may surround the numbers in a clean list: separators and the word "and"
+_LIST_FILLER = re.compile(r"[\s,;\[\]()]+|\band\b", re.I)
+_STATS_INTENT = re.compile(
+    r"\b(stats|statistics|statistical|mean|median|average|avg|stdev|std|summary|summari[sz]e|describe)\b",
+    re.I,
+)
+_ENTITY_INTENT = re.compile(r"\b(entit(y|ies)|names?|organi[sz]ations?|people|places)\b", re.I)
+_KEYWORD_INTENT = re.compile(r"\b(keywords?|key terms|frequenc\w*|top words|word counts?)\b", re.I)
+_THOUSANDS = re.compile(r"\d,\d{3}\b")
+_QUOTED = re.compile(r"[\"“'‘]([^\"”'’]{2,})[\"”'’]")
+_AFTER_COLON = re.compile(r"\b(?:text|from|in|of|analy[sz]e)\s*:\s*(.+)$", re.I | re.S)
+
+
+def _split_number_task(task: str) -> Tuple[str, str]:
+    """Split into (instruction, number span) at the last colon, else at the first number."""
+    if ":" in task:
+        head, span = task.rsplit(":", 1)
+        return head, span
+    match = _NUMBER.search(task)
+    if not match:
+        return task, ""
+    return task[: match.start()], task[match.start():]
+
+
+def parse_numbers(task: str) -> Optional[List[float]]:
+    """Return the number list in ``task`` or None if it is not a clean list."""
+    _, span = _split_number_task(task)
+    # "1,000" could be one number or two; let the model decide
+    if _THOUSANDS.search(span):
+        return None
+    numbers = [float(n) for n in _NUMBER.findall(span)]
+    if not numbers:
+        return None
+    leftover = _LIST_FILLER.sub("", _NUMBER.sub("", span)).strip(" .?!")
+    if leftover:
+        return None
+    return numbers
+
+
+def _fmt(value) -> str:
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def data_direct_answer(task: str) -> Optional[str]:
+    """calculate_stats -> format_table -> templated insights."""
+    # Parsing is plain Python, so handles can be expanded here at no token cost
+    task = resolve_text(task)
+    head, _ = _split_number_task(task)
+    if head.strip() and not _STATS_INTENT.search(head):
+        return None
+    numbers = parse_numbers(task)
+    if numbers is None:
+        return None
+    stats = _calculate_stats.invoke({"numbers": numbers})
+    if "error" in stats:
+        return None
+    table = format_table.invoke({"data": stats})
+    spread = stats["max"] - stats["min"]
+    return (
+        f"{table}\n\n"
+        f"- Mean is **{_fmt(stats['mean'])}** (median {_fmt(stats['median'])}) across {stats['count']} values.\n"
+        f"- Values range from {_fmt(stats['min'])} to {_fmt(stats['max'])} (spread {_fmt(spread)}, stdev {_fmt(stats['stdev'])})."
+    )
+
+
+def extract_text_span(task: str) -> Optional[str]:
+    """Find the inline text to analyze: quoted span first, then text after ``text:``/``from:``."""
+    quoted = _QUOTED.search(task)
+    if quoted:
+        return quoted.group(1).strip()
+    after = _AFTER_COLON.search(task)
+    if after and after.group(1).strip():
+        return after.group(1).strip()
+    return None
+
+
+def text_direct_answer(task: str) -> Optional[str]:
+    """extract_entities and/or keyword_counts -> templated bullet lists."""
+    task = resolve_text(task)
+    span = extract_text_span(task)
+    if not span:
+        return None
+    wants_entities = bool(_ENTITY_INTENT.search(task))
+    wants_keywords = bool(_KEYWORD_INTENT.search(task))
+    if not wants_entities and not wants_keywords:
+        wants_entities = wants_keywords = True
+
+    lines: List[str] = []
+    if wants_entities:
+        entities = _extract_entities.invoke({"text": span})
+        lines.append("**Entities:** " + (", ".join(e["entity"] for e in entities) if entities else "none found"))
+    if wants_keywords:
+        counts = _keyword_counts.invoke({"text": span})
+        terms = ", ".join(f"{row['term']} ({row['count']})" for row in counts)
+        lines.append("**Top keywords:** " + (terms or "none found"))
+    return "\n".join(f"- {line}" for line in lines)
+
+
+_TABLE_ROW = re.compile(r"^\s*\|.*\|\s*$", re.M)
+_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{3,}", re.M)
+_LIST_ITEM = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+\S", re.M)
+_NOT_FINAL = re.compile(r"^(?:\[timeout\]|error\b|sorry\b|i (?:can(?:no|\')t|could(?:n\'t| not)|was unable)\b|please (?:provide|paste|share)\b)", re.I)
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+class DirectReturnPolicy:
+    """Decides whether a single worker answer can end the turn without the supervisor.
+
+    An answer qualifies when it is long enough, does not look like an error or a
+    clarifying question, and has the shape the worker's prompt asks for: a
+    markdown table for ``data_agent``, a list or a few sentences for ``text_agent``.
+    """
+
+    def __init__(self, agents: tuple[str, ...] = ("text_agent", "data_agent"), min_chars: int = 40):
+        self.agents = tuple(agents)
+        self.min_chars = min_chars
+        self._lock = threading.Lock()
+        self._counts: Counter[str] = Counter()
+
+    @classmethod
+    def from_env(cls) -> "DirectReturnPolicy":
+        agents = os.getenv("DIRECT_RETURN_AGENTS", "text_agent,data_agent")
+        return cls(
+            agents=tuple(a.strip() for a in agents.split(",") if a.strip()),
+            min_chars=int(os.getenv("DIRECT_RETURN_MIN_CHARS", "40")),
+        )
+
+    def is_complete(self, agent: str, text: str) -> bool:
+        """Completeness check for one worker answer."""
+        text = text.strip()
+        if agent not in self.agents or len(text) < self.min_chars:
+            return False
+        if _NOT_FINAL.match(text) or text.rstrip("*_ ").endswith("?"):
+            return False
+        if agent == "data_agent":
+            return len(_TABLE_ROW.findall(text)) >= 2 and bool(_TABLE_RULE.search(text))
+        return bool(_LIST_ITEM.search(text)) or text.count(". ") >= 1
+
+    def decide(self, agent: str, text: str) -> Optional[str]:
+        """The answer to return as-is (lightly normalized), or None to let the supervisor synthesize."""
+        ok = self.is_complete(agent, text)
+        with self._lock:
+            self._counts[f"{agent}:{'direct' if ok else 'supervisor'}"] += 1
+        if not ok:
+            return None
+        lines = [line.rstrip() for line in text.strip().splitlines()]
+        return _BLANK_RUNS.sub("\n\n", "\n".join(lines))
+
+    def stats(self) -> dict:
+        """Direct returns vs. supervisor fallbacks per worker."""
+        with self._lock:
+            counts = dict(self._counts)
+        out = {}
+        for key, n in counts.items():
+            agent, outcome = key.split(":")
+            out.setdefault(agent, {"direct": 0, "supervisor": 0})[outcome] = n
+        return out
+
+
+def direct_return_from_env() -> Optional[DirectReturnPolicy]:
+    """Build the direct-return policy when ``DIRECT_RETURN=on`` (disabled otherwise)."""
+    if os.getenv("DIRECT_RETURN", "").strip().lower() in {"on", "true", "1"}:
+        return DirectReturnPolicy.from_env()
+    return None
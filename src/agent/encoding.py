@@ -0,0 +1,236 @@
+"""Compact encoding of tool and handoff results.
+
+By default a tool's return value reaches the model as ``json.dumps`` output,
+and a handoff returns the worker's whole prose answer to the supervisor.
+This module makes both smaller:
+
+- ``encode_result``: a list of dicts becomes CSV with a single header row
+  (``term,count``), a flat dict becomes ``key=value; ...`` pairs, and other
+  values become JSON without spaces. Floats are rounded by the
+  ``RESULT_ROUNDING`` policy: ``sig:6`` (significant digits, the default),
+  ``fixed:2`` (decimal places) or ``off``
+- ``compact_tool``: wraps a worker tool so its ToolMessage holds the compact
+  form. The tool's Python return value is unchanged for direct callers
+- ``encode_handoff``: a structured handoff result. A ``status=...`` line is
+  followed by ``[tool]`` sections with the compact output of each tool the
+  worker ran, or by the worker's prose (markdown tables turned into CSV)
+  when that is shorter or no tool ran. ``HANDOFF_MAX_CHARS`` caps the size
+
+Every encoding reports raw vs. encoded token estimates as a
+``result_encoding`` callback event. ``agent.metrics`` totals them per tool
+and handoff, and ``--stats`` shows them. ``RESULT_ENCODING=json`` and
+``HANDOFF_FORMAT=prose`` restore the previous behaviour.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import math
+import os
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks.manager import dispatch_custom_event
+from langchain_core.tools import BaseTool, StructuredTool
+
+ENCODING_EVENT = "result_encoding"
+_CHARS_PER_TOKEN = 4
+_TABLE_LINE = re.compile(r"^\s*\|(.*)\|\s*$")
+_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{3,}")
+_PAIR = re.compile(r"^([^=;\n]+)=([^;\n]*)$")
+# Tools whose output is a presentation of other results, not a fact of its own
+_PRESENTATION = frozenset({"format_table"})
+
+
+def approx_tokens(text: str) -> int:
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def compact_enabled() -> bool:
+    return os.getenv("RESULT_ENCODING", "compact").strip().lower() != "json"
+
+
+def rounding_policy() -> Tuple[str, int]:
+    """(mode, digits) from ``RESULT_ROUNDING``; mode is ``sig``, ``fixed`` or ``off``."""
+    raw = os.getenv("RESULT_ROUNDING", "sig:6").strip().lower()
+    mode, _, digits = raw.partition(":")
+    if mode not in {"sig", "fixed"}:
+        return "off", 0
+    return mode, int(digits or 6)
+
+
+def round_numbers(value: Any, policy: Optional[Tuple[str, int]] = None) -> Any:
+    """``value`` with every float rounded by the policy (nested lists and dicts included)."""
+    mode, digits = policy or rounding_policy()
+    if mode == "off":
+        return value
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return value
+        rounded = float(f"{value:.{digits}g}") if mode == "sig" else round(value, digits)
+        return int(rounded) if rounded.is_integer() and abs(rounded) < 1e15 else rounded
+    if isinstance(value, dict):
+        return {k: round_numbers(v, (mode, digits)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [round_numbers(v, (mode, digits)) for v in value]
+    return value
+
+
+def _scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def encode_rows(rows: Sequence[dict]) -> str:
+    """CSV with one header row over the union of keys (first-seen order)."""
+    columns: dict = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(["" if row.get(c) is None else _text(row.get(c)) for c in columns])
+    return out.getvalue().rstrip("\n")
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_result(value: Any) -> str:
+    """Compact text for a tool's return value."""
+    value = round_numbers(value)
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list) and value and all(isinstance(r, dict) and all(map(_scalar, r.values())) for r in value):
+        return encode_rows(value)
+    if isinstance(value, dict) and value and all(_scalar(v) for v in value.values()) \
+            and not any(";" in str(k) or "=" in str(k) for k in value):
+        return "; ".join(f"{k}={'' if v is None else _text(v)}" for k, v in value.items())
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _number(text: str) -> Any:
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def decode_result(text: str) -> Any:
+    """Best-effort inverse of ``encode_result`` (JSON, ``key=value`` pairs or CSV rows)."""
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        pass
+    parts = [p.strip() for p in text.split("; ")]
+    pairs = [_PAIR.match(p) for p in parts]
+    if parts and all(pairs):
+        return {m.group(1).strip(): _number(m.group(2).strip()) for m in pairs}
+    lines = list(csv.reader(io.StringIO(text)))
+    if len(lines) >= 2 and all(len(line) == len(lines[0]) for line in lines):
+        return [{k: _number(v) for k, v in zip(lines[0], line)} for line in lines[1:]]
+    return text
+
+
+def compact_markdown(text: str) -> str:
+    """Prose with markdown tables turned into CSV and blank-line runs collapsed."""
+    out: List[str] = []
+    table: List[List[str]] = []
+
+    def _flush():
+        if table:
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator="\n").writerows(table)
+            out.append(buffer.getvalue().rstrip("\n"))
+            table.clear()
+
+    for line in text.splitlines():
+        row = _TABLE_LINE.match(line)
+        if row:
+            if not _TABLE_RULE.match(line):
+                table.append([cell.strip().replace("\\|", "|") for cell in re.split(r"(?<!\\)\|", row.group(1))])
+            continue
+        _flush()
+        if line.strip() or (out and out[-1].strip()):
+            out.append(line.rstrip())
+    _flush()
+    return "\n".join(out).strip()
+
+
+def report(name: str, raw: str, encoded: str) -> None:
+    """Send raw vs. encoded token estimates to the run's callback handlers."""
+    try:
+        dispatch_custom_event(ENCODING_EVENT, {
+            "name": name,
+            "raw_tokens": approx_tokens(raw),
+            "encoded_tokens": approx_tokens(encoded),
+        })
+    except RuntimeError:
+        # Called outside a run (e.g. a tool invoked directly): nobody to report to
+        pass
+
+
+def compact_tool(tool: BaseTool) -> BaseTool:
+    """``tool`` with compact ToolMessage content (unchanged when ``RESULT_ENCODING=json``)."""
+    if not compact_enabled():
+        return tool
+
+    def _encoded(value: Any) -> str:
+        encoded = encode_result(value)
+        raw = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        report(f"tool:{tool.name}", raw, encoded)
+        return encoded
+
+    # Call the function itself, so callbacks see a single tool run
+    def _run(**kwargs):
+        return _encoded(tool.func(**kwargs))
+
+    async def _arun(**kwargs):
+        return _encoded(await tool.coroutine(**kwargs))
+
+    return StructuredTool.from_function(
+        func=_run,
+        coroutine=_arun if getattr(tool, "coroutine", None) else None,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+    )
+
+
+def structured_handoff() -> bool:
+    return os.getenv("HANDOFF_FORMAT", "structured").strip().lower() != "prose"
+
+
+def _limit(text: str, max_chars: int) -> str:
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    cut = cut if cut > max_chars // 2 else max_chars
+    return text[:cut].rstrip() + f"\n… [truncated {len(text) - cut} chars]"
+
+
+def encode_handoff(agent: str, messages: Sequence[Any], status: str = "ok", max_chars: Optional[int] = None) -> str:
+    """Structured handoff result for the supervisor from a worker run's new messages."""
+    if max_chars is None:
+        max_chars = int(os.getenv("HANDOFF_MAX_CHARS", "4000"))
+    tool_results = [m for m in messages if getattr(m, "type", "") == "tool"]
+    final = messages[-1] if messages else None
+    answer = final.content if final is not None and isinstance(getattr(final, "content", None), str) else ""
+    # The ToolMessage already names the agent, and each fact names its tool
+    lines = [f"status={status}"]
+    facts = []
+    for msg in [m for m in tool_results if m.name not in _PRESENTATION] or tool_results:
+        content = msg.content if isinstance(msg.content, str) else json.dumps(msg.content, ensure_ascii=False)
+        facts.append(f"[{msg.name}]\n{compact_markdown(content)}")
+    prose = compact_markdown(answer)
+    # Tool results are the facts; a short answer that already carries them is cheaper still
+    body = facts if facts and sum(map(len, facts)) < len(prose) else [prose] if prose else facts
+    encoded = _limit("\n".join(lines + body), max_chars)
+    report(f"handoff:{agent}", answer, encoded)
+    return encoded
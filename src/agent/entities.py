@@ -0,0 +1,339 @@
+"""Entity extraction engine behind the ``extract_entities`` tool.
+
+Two sources of mentions, merged per document:
+
+- pattern: a precompiled Unicode tokenizer finds runs of capitalized words
+  ("Zoë Saldaña", "São Paulo", "Bank of America") and acronyms ("IBM",
+  "NASA") in any cased script; leading function words ("The", "In", ...)
+  are dropped
+- gazetteer (optional): known names, one per line as ``name<TAB>label``,
+  matched case-insensitively on word boundaries by an Aho-Corasick
+  automaton; gazetteer matches win over overlapping pattern spans
+
+The automaton is compiled once into a flat binary file next to the list
+(``<list>.ac``, or the temp dir when that directory is read-only; rebuilt
+when the list changes) and memory-mapped, so every
+process in the pool shares the same pages instead of rebuilding it.
+``ENTITY_GAZETTEER`` sets the default list.
+
+Each entity comes back with its label, count and character offsets.
+``extract_entities_batch`` runs many documents in one call, on the shared
+process pool (``ENTITY_PROCESSES``).
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from agent.pool import default_processes, process_pool
+
+# A word starts with a letter; digits, apostrophes and inner hyphens may follow ("O'Neil", "Jean-Luc")
+_WORD = re.compile(r"[^\W\d_](?:[^\W_]|['’\-](?=[^\W_]))*")
+# Lowercase words allowed inside a name when capitalized words follow
+_CONNECTORS = frozenset({"of", "de", "da", "do", "dos", "das", "del", "della", "di", "du", "van", "von", "der", "den", "la", "le", "y", "al", "bin", "ibn"})
+_LEADING_STOPWORDS = frozenset(
+    "the a an this that these those it its in on at to for from by with and but or if when while as of "
+    "he she we they you i my our your their his her there here what which who how why "
+    "please extract find list show analyze analyse count".split()
+)
+_GAP = re.compile(r"[ \t]+")
+_POSSESSIVE = ("'s", "’s")
+
+_MAGIC = b"LGSQAC01"
+_HEADER = struct.Struct("<8s5I")
+
+
+def _is_capitalized(word: str) -> bool:
+    return word[0].isupper()
+
+
+def _fold(text: str) -> str:
+    """Lowercase without changing the length, so offsets stay valid (``"İ".lower()`` is 2 chars)."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+
+def pattern_mentions(text: str) -> Iterator[Tuple[int, int, str]]:
+    """(start, end, label) spans of capitalized names (``NAME``) and acronyms (``ACRONYM``)."""
+    words = [(m.start(), m.end(), m.group(0)) for m in _WORD.finditer(text)]
+    i = 0
+    while i < len(words):
+        start, end, word = words[i]
+        if not _is_capitalized(word):
+            i += 1
+            continue
+        # Extend across single spaces through capitalized words and connectors
+        j = i
+        while j + 1 < len(words):
+            gap = text[words[j][1]:words[j + 1][0]]
+            nxt = words[j + 1][2]
+            if not _GAP.fullmatch(gap) or words[j][2].endswith(_POSSESSIVE):
+                break
+            if _is_capitalized(nxt):
+                j += 1
+                continue
+            if nxt in _CONNECTORS and j + 2 < len(words) and _is_capitalized(words[j + 2][2]) \
+                    and _GAP.fullmatch(text[words[j + 1][1]:words[j + 2][0]]):
+                j += 2
+                continue
+            break
+        span = words[i:j + 1]
+        while span and span[0][2].lower() in _LEADING_STOPWORDS:
+            span = span[1:]
+        if span:
+            first, last = span[0], span[-1]
+            end = last[1] - 2 if last[2].endswith(_POSSESSIVE) else last[1]
+            if len(span) > 1 or end - first[0] > 1:
+                label = "ACRONYM" if len(span) == 1 and text[first[0]:end].isupper() else "NAME"
+                yield first[0], end, label
+        i = j + 1
+
+
+class Gazetteer:
+    """Aho-Corasick automaton over a memory-mapped, compiled gazetteer."""
+
+    def __init__(self, compiled: Path):
+        self.path = compiled
+        with open(compiled, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, nodes, edges, outputs, patterns, strings = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{compiled} is not a compiled gazetteer")
+        view = memoryview(self._mmap)[_HEADER.size:]
+        sizes = [nodes + 1, edges, edges, nodes, nodes + 1, outputs, patterns + 1]
+        arrays, offset = [], 0
+        for n in sizes:
+            arrays.append(view[offset:offset + 4 * n].cast("I"))
+            offset += 4 * n
+        (self._edge_start, self._edge_char, self._edge_target, self._fail,
+         self._out_start, self._out_pattern, self._string_start) = arrays
+        self._strings = view[offset:offset + strings]
+        self._root_chars = frozenset(self._edge_char[self._edge_start[0]:self._edge_start[1]])
+        self.size = patterns
+        self._lengths: Dict[int, int] = {}
+
+    def entry(self, pattern: int) -> Tuple[str, str]:
+        """(name, label) of a pattern id."""
+        raw = bytes(self._strings[self._string_start[pattern]:self._string_start[pattern + 1]]).decode("utf-8")
+        name, _, label = raw.partition("\t")
+        return name, label or "GAZETTEER"
+
+    def _step(self, node: int, c: int) -> int:
+        edge_start, edge_char = self._edge_start, self._edge_char
+        while True:
+            lo, hi = edge_start[node], edge_start[node + 1]
+            j = bisect_left(edge_char, c, lo, hi)
+            if j < hi and edge_char[j] == c:
+                return self._edge_target[j]
+            if node == 0:
+                return 0
+            node = self._fail[node]
+
+    def matches(self, text: str) -> List[Tuple[int, int, int]]:
+        """Leftmost-longest, non-overlapping whole-word matches as (start, end, pattern)."""
+        lowered = _fold(text)
+        found = []
+        node = 0
+        root_chars, out_start, out_pattern, string_start = self._root_chars, self._out_start, self._out_pattern, self._string_start
+        for i, ch in enumerate(lowered):
+            c = ord(ch)
+            if node == 0 and c not in root_chars:
+                continue
+            node = self._step(node, c)
+            for k in range(out_start[node], out_start[node + 1]):
+                pattern = out_pattern[k]
+                length = self._lengths.get(pattern)
+                if length is None:
+                    length = self._lengths[pattern] = len(self.entry(pattern)[0])
+                start = i + 1 - length
+                if (start == 0 or not _is_word_char(text[start - 1])) and (i + 1 == len(text) or not _is_word_char(text[i + 1])):
+                    found.append((start, i + 1, pattern))
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        chosen, end = [], -1
+        for match in found:
+            if match[0] >= end:
+                chosen.append(match)
+                end = match[1]
+        return chosen
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def compile_gazetteer(source: Path, target: Path) -> None:
+    """Build the automaton for ``source`` (``name[<TAB>label]`` lines) and write it to ``target``."""
+    entries: Dict[str, str] = {}
+    with open(source, encoding="utf-8") as handle:
+        for line in handle:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            name, _, label = line.partition("\t")
+            name = " ".join(name.split())
+            if name:
+                entries.setdefault(_fold(name), f"{name}\t{label.strip()}" if label.strip() else name)
+
+    children: List[Dict[int, int]] = [{}]
+    outputs: List[List[int]] = [[]]
+    for pattern, key in enumerate(entries):
+        node = 0
+        for ch in key:
+            c = ord(ch)
+            if c not in children[node]:
+                children.append({})
+                outputs.append([])
+                children[node][c] = len(children) - 1
+            node = children[node][c]
+        outputs[node].append(pattern)
+
+    fail = [0] * len(children)
+    queue = deque(children[0].values())
+    while queue:
+        node = queue.popleft()
+        for c, child in children[node].items():
+            queue.append(child)
+            f = fail[node]
+            while f and c not in children[f]:
+                f = fail[f]
+            fail[child] = children[f].get(c, 0)
+            # Suffix outputs are folded in, so matching never walks the fail chain for output
+            outputs[child] = outputs[child] + outputs[fail[child]]
+
+    edge_start, edge_char, edge_target = array("I", [0]), array("I"), array("I")
+    out_start, out_pattern = array("I", [0]), array("I")
+    for node, edges in enumerate(children):
+        for c in sorted(edges):
+            edge_char.append(c)
+            edge_target.append(edges[c])
+        edge_start.append(len(edge_char))
+        out_pattern.extend(outputs[node])
+        out_start.append(len(out_pattern))
+    blob = bytearray()
+    string_start = array("I", [0])
+    for raw in entries.values():
+        blob += raw.encode("utf-8")
+        string_start.append(len(blob))
+
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as out:
+        out.write(_HEADER.pack(_MAGIC, len(children), len(edge_char), len(out_pattern), len(entries), len(blob)))
+        for arr in (edge_start, edge_char, edge_target, array("I", fail), out_start, out_pattern, string_start):
+            out.write(arr.tobytes())
+        out.write(blob)
+    tmp.replace(target)
+
+
+def _compiled_path(source: Path, mtime: float) -> Path:
+    target = source.with_name(source.name + ".ac")
+    if os.access(source.parent, os.W_OK):
+        return target
+    # Read-only location: keep the compiled file in the temp dir, named after the source path
+    # and version so every process (and later runs) reuse the same file
+    digest = hashlib.sha1(str(source.resolve()).encode("utf-8")).hexdigest()[:16]
+    version = hashlib.sha1(repr(mtime).encode("ascii")).hexdigest()[:8]
+    return Path(tempfile.gettempdir()) / f"lgsq-{digest}-{version}-{target.name}"
+
+
+def _remove_stale(compiled: Path) -> None:
+    """Delete temp-dir builds of the same gazetteer from older versions of its source."""
+    if not compiled.name.startswith("lgsq-"):
+        return
+    digest, _, name = compiled.name[len("lgsq-"):].split("-", 2)
+    for old in compiled.parent.glob(f"lgsq-{digest}-*-{name}"):
+        if old != compiled:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+@lru_cache(maxsize=8)
+def _load(source: str, mtime: float) -> Gazetteer:
+    path = Path(source)
+    compiled = _compiled_path(path, mtime)
+    if not compiled.exists() or compiled.stat().st_mtime < mtime:
+        compile_gazetteer(path, compiled)
+        _remove_stale(compiled)
+    return Gazetteer(compiled)
+
+
+def load_gazetteer(path: Optional[str] = None) -> Optional[Gazetteer]:
+    """The gazetteer at ``path`` (default ``ENTITY_GAZETTEER``), compiled and mapped once per process."""
+    path = path or os.getenv("ENTITY_GAZETTEER") or None
+    if path is None:
+        return None
+    return _load(str(Path(path).resolve()), Path(path).stat().st_mtime)
+
+
+def find_entities(text: str, gazetteer: Optional[Gazetteer] = None, offsets: bool = True) -> List[dict]:
+    """Entities in order of first mention: ``{"entity", "label", "count", "offsets"}``."""
+    found: Dict[str, dict] = {}
+    taken: List[Tuple[int, int]] = []
+
+    def _add(name: str, label: str, start: int, end: int) -> None:
+        entry = found.setdefault(name, {"entity": name, "label": label, "count": 0, "offsets": []})
+        entry["count"] += 1
+        entry["offsets"].append([start, end])
+
+    if gazetteer is not None:
+        for start, end, pattern in gazetteer.matches(text):
+            name, label = gazetteer.entry(pattern)
+            _add(name, label, start, end)
+            taken.append((start, end))
+    starts = [s for s, _ in taken]
+    for start, end, label in pattern_mentions(text):
+        k = bisect_left(starts, end)
+        # Skip pattern spans that overlap a gazetteer match
+        if k and taken[k - 1][1] > start:
+            continue
+        _add(text[start:end], label, start, end)
+
+    entities = sorted(found.values(), key=lambda e: e["offsets"][0][0])
+    if not offsets:
+        for entry in entities:
+            del entry["offsets"]
+    return entities
+
+
+def _extract(text: str, gazetteer_path: Optional[str], offsets: bool) -> List[dict]:
+    return find_entities(text, load_gazetteer(gazetteer_path) if gazetteer_path else None, offsets)
+
+
+def extract_entities_batch(
+    documents: Sequence[str],
+    *,
+    gazetteer: Optional[str] = None,
+    offsets: bool = True,
+    processes: Optional[int] = None,
+) -> dict:
+    """Per-document entities plus corpus-wide counts, on the process pool when ``processes > 1``."""
+    gazetteer = gazetteer or os.getenv("ENTITY_GAZETTEER") or None
+    processes = processes if processes is not None else default_processes("ENTITY_PROCESSES")
+    if processes > 1 and len(documents) > 1:
+        results = list(process_pool(processes).map(_extract, documents, repeat(gazetteer), repeat(offsets)))
+    else:
+        results = [_extract(doc, gazetteer, offsets) for doc in documents]
+    corpus: Dict[str, dict] = {}
+    for entities in results:
+        for entity in entities:
+            total = corpus.setdefault(entity["entity"], {"entity": entity["entity"], "label": entity["label"], "count": 0, "documents": 0})
+            total["count"] += entity["count"]
+            total["documents"] += 1
+    return {
+        "documents": results,
+        "corpus": sorted(corpus.values(), key=lambda e: -e["count"]),
+    }
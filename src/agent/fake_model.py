@@ -0,0 +1,221 @@
+"""Deterministic local chat model for offline runs, tests and benchmarks.
+
+``ScriptedChatModel`` needs no network or API key. It supports
+``bind_tools`` and mimics how the supervisor and workers use the model:
+
+- with handoff tools bound, it routes to ``transfer_to_text`` / ``transfer_to_data``,
+  or to ``session_lookup`` for follow-ups about earlier results
+- with worker tools bound, it calls ``calculate_stats`` -> ``format_table`` or
+  ``extract_entities`` + ``keyword_counts``
+- after tool results, it answers with the tool outputs
+- without tools (e.g. history summaries), it echoes a short summary
+
+Pass ``responses=[AIMessage(...), ...]`` to replay an explicit script instead.
+``latency`` adds a simulated per-call delay (seconds), and every
+``tail_every``-th call waits ``tail_latency`` more (a stuck call); streaming
+yields one chunk per word.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from agent.artifacts import HANDLE
+from agent.encoding import decode_result
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_QUOTED = re.compile(r"[\"“'‘]([^\"”'’]{2,})[\"”'’]")
+_TEXT_INTENT = re.compile(r"\b(entit\w*|keywords?|analy[sz]e|text)\b", re.I)
+_DATA_INTENT = re.compile(r"\b(stats|statistics|mean|median|average|table)\b", re.I)
+_FOLLOW_UP = re.compile(r"\b(last|previous|earlier|so far|this session)\b", re.I)
+_LOOKUP_KINDS = (
+    ("entities", re.compile(r"\bentit\w*", re.I)),
+    ("keywords", re.compile(r"\bkeywords?\b", re.I)),
+    ("stats", _DATA_INTENT),
+)
+
+
+def _tool_names(tools: Optional[Sequence[dict]]) -> List[str]:
+    return [t.get("function", {}).get("name", t.get("name", "")) for t in tools or []]
+
+
+def _text_span(text: str) -> str:
+    handle = next((m.group(0) for m in HANDLE.finditer(text) if m.group(1) == "text"), None)
+    if handle:
+        return handle
+    quoted = _QUOTED.search(text)
+    if quoted:
+        return quoted.group(1)
+    return text.split(":", 1)[1].strip() if ":" in text else text
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Offline chat model with tool calling, simulated latency and token streaming."""
+
+    model_name: str = "scripted-fake"
+    latency: float = 0.0
+    tail_latency: float = 0.0
+    tail_every: int = 0
+    responses: Optional[List[AIMessage]] = None
+    _counter: Any = PrivateAttr(default_factory=itertools.count)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+    _delays: Any = PrivateAttr(default_factory=itertools.count)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name}
+
+    @property
+    def calls(self) -> int:
+        """Number of model calls served so far."""
+        return self._calls
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _delay(self) -> float:
+        with self._lock:
+            n = next(self._delays) + 1
+        slow = self.tail_every > 0 and n % self.tail_every == 0
+        return self.latency + (self.tail_latency if slow else 0.0)
+
+    def _call_id(self) -> str:
+        with self._lock:
+            return f"call_{next(self._counter)}"
+
+    def _reply(self, messages: List[BaseMessage], tools: Optional[Sequence[dict]]) -> AIMessage:
+        with self._lock:
+            index = self._calls
+            self._calls += 1
+        if self.responses:
+            return self.responses[index % len(self.responses)].model_copy()
+
+        names = _tool_names(tools)
+        last = messages[-1]
+        # Tool results since the last AI turn
+        results: List[ToolMessage] = []
+        for msg in reversed(messages):
+            if not isinstance(msg, ToolMessage):
+                break
+            results.insert(0, msg)
+
+        if results:
+            if "format_table" in names and any(r.name == "calculate_stats" for r in results):
+                stats = next(r for r in results if r.name == "calculate_stats")
+                data = decode_result(stats.content) if isinstance(stats.content, str) else None
+                if not isinstance(data, (dict, list)):
+                    data = {"result": str(stats.content)}
+                return AIMessage(content="", tool_calls=[self._tool_call("format_table", {"data": data})])
+            body = "\n\n".join(str(r.content) for r in results)
+            return AIMessage(content=f"Here are the results:\n\n{body}")
+
+        text = last.content if isinstance(last.content, str) else str(last.content)
+        human = next((m for m in reversed(messages) if m.type == "human"), last)
+        query = human.content if isinstance(human.content, str) else text
+        calls = []
+        if "session_lookup" in names and _FOLLOW_UP.search(query) and not _NUMBER.search(query):
+            kind = next((kind for kind, pattern in _LOOKUP_KINDS if pattern.search(query)), None)
+            if kind:
+                turn = 0 if re.search(r"\b(so far|this session)\b", query, re.I) else -1
+                return AIMessage(content="", tool_calls=[self._tool_call("session_lookup", {"kind": kind, "turn": turn})])
+        # Artifact handles stand in for large inputs; pass them through like a real model
+        number_handle = next((m.group(0) for m in HANDLE.finditer(query) if m.group(1) == "numbers"), None)
+        numbers = [float(n) for n in _NUMBER.findall(HANDLE.sub(" ", query))]
+        if "transfer_to_text" in names and (_TEXT_INTENT.search(query) or _QUOTED.search(query)):
+            calls.append(self._tool_call("transfer_to_text", {"task": query}))
+        if "transfer_to_data" in names and (len(numbers) >= 2 or number_handle or _DATA_INTENT.search(query)):
+            calls.append(self._tool_call("transfer_to_data", {"task": query}))
+        if "calculate_stats" in names and (numbers or number_handle):
+            calls.append(self._tool_call("calculate_stats", {"numbers": number_handle or numbers}))
+        if "extract_entities" in names:
+            calls.append(self._tool_call("extract_entities", {"text": _text_span(query)}))
+        if "keyword_counts" in names:
+            calls.append(self._tool_call("keyword_counts", {"text": _text_span(query)}))
+        if calls:
+            return AIMessage(content="", tool_calls=calls)
+        if not names:
+            return AIMessage(content="Summary: " + " ".join(text.split())[:200])
+        return AIMessage(content=f"I can analyze text (entities, keywords) and numbers (statistics). You said: {query}")
+
+    def _tool_call(self, name: str, args: dict) -> dict:
+        return {"name": name, "args": args, "id": self._call_id(), "type": "tool_call"}
+
+    def _with_usage(self, messages: List[BaseMessage], reply: AIMessage) -> AIMessage:
+        prompt_tokens = count_tokens_approximately(messages)
+        completion_tokens = count_tokens_approximately([reply])
+        reply.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        reply.response_metadata = {"model_name": self.model_name}
+        return reply
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> ChatResult:
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        reply = self._with_usage(messages, self._reply(messages, tools))
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> ChatResult:
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        reply = self._with_usage(messages, self._reply(messages, tools))
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    def _chunks(self, reply: AIMessage) -> List[AIMessageChunk]:
+        if reply.tool_calls or not isinstance(reply.content, str):
+            return [AIMessageChunk(
+                content=reply.content,
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i, "type": "tool_call_chunk"}
+                    for i, c in enumerate(reply.tool_calls)
+                ],
+                usage_metadata=reply.usage_metadata,
+                response_metadata=reply.response_metadata,
+            )]
+        words = re.findall(r"\S+\s*|\s+", reply.content) or [""]
+        chunks = [AIMessageChunk(content=w) for w in words]
+        chunks[-1] = AIMessageChunk(
+            content=words[-1],
+            usage_metadata=reply.usage_metadata,
+            response_metadata=reply.response_metadata,
+        )
+        return chunks
+
+    def _stream(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        for chunk in self._chunks(self._with_usage(messages, self._reply(messages, tools))):
+            if run_manager and isinstance(chunk.content, str):
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        for chunk in self._chunks(self._with_usage(messages, self._reply(messages, tools))):
+            if run_manager and isinstance(chunk.content, str):
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
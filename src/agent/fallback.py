@@ -0,0 +1,250 @@
+"""Latency-aware model selection with fallback across providers.
+
+A model spec lists candidates, best quality tier first::
+
+    openai:gpt-4o-mini@1, anthropic:claude-3-5-haiku-latest@1, fake:scripted@2
+
+``RoutedChatModel`` sends each call to the fastest healthy candidate in the
+best tier that has a healthy member. A candidate that has not been measured
+yet counts as fastest, so every candidate gets tried once. If the call fails,
+it falls back to the next candidate in that order. Health is tracked per
+model across all agents: a rolling error rate above ``MODEL_MAX_ERROR_RATE``
+takes a model out for ``MODEL_COOLDOWN`` seconds.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, ClassVar, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from agent.metrics import get_metrics
+
+
+@dataclass(frozen=True)
+class ModelCandidate:
+    provider: str
+    model: str
+    tier: int = 1
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+def parse_model_spec(spec: str, default_provider: str = "openai") -> List[ModelCandidate]:
+    """``provider:model@tier`` entries separated by commas; bare names use ``default_provider``."""
+    candidates = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        tier = 1
+        if "@" in entry:
+            entry, tier_text = entry.rsplit("@", 1)
+            tier = int(tier_text)
+        provider, _, model = entry.partition(":") if ":" in entry else (default_provider, "", entry)
+        candidates.append(ModelCandidate(provider.strip().lower(), model.strip(), tier))
+    if not candidates:
+        raise ValueError(f"Empty model spec: {spec!r}")
+    return candidates
+
+
+class ModelHealth:
+    """Rolling latency (EWMA) and error rate for one model, shared across agents."""
+
+    def __init__(self, window: int = 20, max_error_rate: float = 0.5, cooldown: float = 30.0, alpha: float = 0.3):
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.down_until = 0.0
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, ok: bool, seconds: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self._outcomes.append(ok)
+            if ok:
+                self.latency = seconds if self.latency is None else self.alpha * seconds + (1 - self.alpha) * self.latency
+                return
+            self.errors += 1
+            window_errors = self._outcomes.count(False)
+            if window_errors >= 2 and window_errors / len(self._outcomes) > self.max_error_rate:
+                self.down_until = time.monotonic() + self.cooldown
+                self._outcomes.clear()
+
+    def estimate(self) -> float:
+        """Expected latency for ordering: 0 when untried (explore first), inf when it only failed."""
+        if self.latency is not None:
+            return self.latency
+        return 0.0 if self.calls == 0 else float("inf")
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+                "healthy": self.healthy(),
+            }
+
+
+_health: Dict[str, ModelHealth] = {}
+_health_lock = threading.Lock()
+
+
+def health_for(name: str) -> ModelHealth:
+    with _health_lock:
+        if name not in _health:
+            _health[name] = ModelHealth(
+                max_error_rate=float(os.getenv("MODEL_MAX_ERROR_RATE", "0.5")),
+                cooldown=float(os.getenv("MODEL_COOLDOWN", "30")),
+            )
+        return _health[name]
+
+
+def health_stats() -> Dict[str, dict]:
+    """Per-model rolling stats for every model used so far."""
+    with _health_lock:
+        items = list(_health.items())
+    return {name: health.stats() for name, health in sorted(items)}
+
+
+class RoutedChatModel(BaseChatModel):
+    """Chat model over several candidates: fastest healthy first, falling back on errors."""
+
+    candidates: List[BaseChatModel]
+    names: List[str]
+    tiers: List[int]
+    # Forwards a per-request ``timeout`` to the OpenAI candidates (see agent.deadline)
+    supports_request_timeout: ClassVar[bool] = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"candidates": self.names, "tiers": self.tiers}
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = "|".join(self.names)
+        return params
+
+    def bind_tools(self, tools: Sequence, **kwargs):
+        # Provider-neutral tool schemas; each candidate formats them on use
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def order(self) -> List[int]:
+        """Candidate indexes in the order they should be tried."""
+        health = [health_for(name) for name in self.names]
+        indexes = range(len(self.candidates))
+        healthy = [i for i in indexes if health[i].healthy()]
+        # Unhealthy models stay as a last resort
+        rest = [i for i in indexes if i not in healthy]
+        by_speed = lambda i: (self.tiers[i], health[i].estimate(), i)
+        return sorted(healthy, key=by_speed) + sorted(rest, key=by_speed)
+
+    def _kwargs_for(self, index: int, kwargs: dict) -> dict:
+        kwargs = dict(kwargs)
+        tools = kwargs.pop("tools", None)
+        timeout = kwargs.pop("timeout", None)
+        candidate = self.candidates[index]
+        if tools:
+            kwargs = candidate.bind_tools(tools, **kwargs).kwargs
+        if timeout is not None and type(candidate).__module__.startswith("langchain_openai"):
+            kwargs["timeout"] = timeout
+        return kwargs
+
+    def _record(self, index: int, ok: bool, started: float, fallback: bool) -> None:
+        health_for(self.names[index]).record(ok, time.monotonic() - started)
+        if fallback:
+            get_metrics().record_event("model_fallback")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        error: Optional[Exception] = None
+        for attempt, index in enumerate(self.order()):
+            started = time.monotonic()
+            try:
+                result = self.candidates[index]._generate(
+                    messages, stop=stop, run_manager=run_manager, **self._kwargs_for(index, kwargs)
+                )
+            except Exception as exc:
+                self._record(index, False, started, attempt > 0)
+                error = exc
+                continue
+            self._record(index, True, started, attempt > 0)
+            return result
+        raise error
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        error: Optional[Exception] = None
+        for attempt, index in enumerate(self.order()):
+            started = time.monotonic()
+            try:
+                result = await self.candidates[index]._agenerate(
+                    messages, stop=stop, run_manager=run_manager, **self._kwargs_for(index, kwargs)
+                )
+            except Exception as exc:
+                self._record(index, False, started, attempt > 0)
+                error = exc
+                continue
+            self._record(index, True, started, attempt > 0)
+            return result
+        raise error
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        error: Optional[Exception] = None
+        for attempt, index in enumerate(self.order()):
+            started = time.monotonic()
+            emitted = False
+            try:
+                for chunk in self.candidates[index]._stream(
+                    messages, stop=stop, run_manager=run_manager, **self._kwargs_for(index, kwargs)
+                ):
+                    emitted = True
+                    yield chunk
+            except Exception as exc:
+                self._record(index, False, started, attempt > 0)
+                if emitted:
+                    raise
+                error = exc
+                continue
+            self._record(index, True, started, attempt > 0)
+            return
+        raise error
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        error: Optional[Exception] = None
+        for attempt, index in enumerate(self.order()):
+            started = time.monotonic()
+            emitted = False
+            try:
+                async for chunk in self.candidates[index]._astream(
+                    messages, stop=stop, run_manager=run_manager, **self._kwargs_for(index, kwargs)
+                ):
+                    emitted = True
+                    yield chunk
+            except Exception as exc:
+                self._record(index, False, started, attempt > 0)
+                if emitted:
+                    raise
+                error = exc
+                continue
+            self._record(index, True, started, attempt > 0)
+            return
+        raise error
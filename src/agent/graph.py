@@ -1,36 +1,153 @@
 import os
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.memory import MemorySaver
+import uuid
+from typing import Annotated, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.graph import END, START, StateGraph, MessagesState
 from langgraph.prebuilt import ToolNode
-from langchain_core.tools import tool
+from langchain_core.tools import InjectedToolCallId, StructuredTool
 
-from agent.agent_builders import create_text_worker, create_data_worker
+from agent.agent_builders import LazyWorker, create_data_worker, create_text_worker
+from agent.analytics import current_thread_id, get_session_index, make_session_lookup_tool, session_index_enabled
+from agent.artifacts import artifacts_enabled, extract_artifacts
+from agent.checkpoint import checkpointer_from_env
+from agent.deadline import ModelTimeout, partial_answer
+from agent.direct import direct_return_from_env
+from agent.encoding import encode_handoff, structured_handoff
+from agent.memory import HistoryManager, SupervisorState
+from agent.metrics import get_metrics, metrics_enabled
+from agent.models import make_chat_model
+from agent.routing import prerouter_from_env
+from agent.streaming import HANDOFF_LABELS
 
 
-def build_system():
-    """Build single-mode supervisor graph: LLM + ToolNode (agent handoffs)."""
-    return build_system_tools_mode()
+def build_system(async_mode: bool = False, prerouter=None, checkpointer=None, history=None, direct_return=None):
+    """Build single-mode supervisor graph: LLM + ToolNode (agent handoffs).
+
+    With ``async_mode=True`` the supervisor node is a coroutine; drive the graph
+    with ``ainvoke``/``astream`` so parallel handoffs run concurrently.
+    ``prerouter`` (anything with ``route(text) -> tool name | None``) skips the
+    routing LLM call for obvious intents; defaults to ``PREROUTER`` from env.
+    ``checkpointer`` defaults to ``CHECKPOINTER`` from env (bounded in-memory).
+    ``history`` (a ``HistoryManager``) bounds multi-turn prompt size; defaults
+    to ``HISTORY_*`` from env. ``direct_return`` (a ``DirectReturnPolicy``)
+    lets a single complete worker answer end the turn without the supervisor's
+    synthesis call; defaults to ``DIRECT_RETURN`` from env. Unless
+    ``ARTIFACTS=off``, large inline payloads become artifact handles first.
+    Unless ``METRICS=off``, the shared metrics handler
+    (``agent.metrics.get_metrics()``) is attached to every run, as is the
+    active profiler (``agent.profiling``) under ``--profile``; ``callbacks``
+    passed per call replace them, so include them to keep recording.
+    """
+    from agent.profiling import active_profiler
+
+    if prerouter is None:
+        prerouter = prerouter_from_env()
+    if checkpointer is None:
+        checkpointer = checkpointer_from_env()
+    if direct_return is None:
+        direct_return = direct_return_from_env()
+    graph = build_system_tools_mode(
+        async_mode=async_mode,
+        prerouter=prerouter,
+        checkpointer=checkpointer,
+        history=history,
+        direct_return=direct_return,
+    )
+    callbacks = [get_metrics()] if metrics_enabled() else []
+    if active_profiler() is not None:
+        callbacks.append(active_profiler())
+    if callbacks:
+        graph = graph.with_config({"callbacks": callbacks})
+    return graph
+
+
+# Prefix of handoff results for workers that ran out of time
+TIMEOUT_MARKER = "[timeout]"
 
 
 def _make_handoff_tool(agent_graph, *, name: str, description: str):
-    def _handoff(task: str) -> str:
+    agent = HANDOFF_LABELS.get(name, name)
+    structured = structured_handoff()
+
+    def _result(result) -> tuple[str, Optional[str]]:
+        msgs = result["messages"]
+        msg = msgs[-1]
+        answer = getattr(msg, "content", str(msg))
+        if not structured:
+            # No separate payload: consumers fall back to the message content
+            return answer, None
+        # Only the worker's own messages: everything after the task we sent
+        start = next((i + 1 for i in range(len(msgs) - 1, -1, -1) if msgs[i].type == "human"), 0)
+        # The supervisor gets the compact result; the prose stays on the ToolMessage artifact
+        return encode_handoff(agent, msgs[start:]), answer
+
+    def _journaled(call_id: str, output: tuple[str, Optional[str]]) -> tuple[str, Optional[str]]:
+        from agent.jobs import journal_step
+
+        journal_step(call_id, *output)
+        return output
+
+    def _timed_out(exc: ModelTimeout) -> tuple[str, Optional[str]]:
+        return f"{TIMEOUT_MARKER} {agent} did not finish: {exc}", None
+
+    def _handoff(task: str, tool_call_id: Annotated[str, InjectedToolCallId] = "") -> tuple[str, Optional[str]]:
+        from agent.jobs import journaled_step
+
+        # A resumed job reuses handoffs that finished before the interruption
+        done = journaled_step(tool_call_id)
+        if done is not None:
+            return done
         # Ensure the worker agent gets a proper HumanMessage to trigger its ReAct loop
-        result = agent_graph.invoke({"messages": [HumanMessage(content=task)]})
-        msg = result["messages"][-1]
-        return getattr(msg, "content", str(msg))
+        try:
+            result = agent_graph.invoke({"messages": [HumanMessage(content=task)]})
+        except ModelTimeout as exc:
+            return _timed_out(exc)
+        return _journaled(tool_call_id, _result(result))
+
+    async def _ahandoff(task: str, tool_call_id: Annotated[str, InjectedToolCallId] = "") -> tuple[str, Optional[str]]:
+        from agent.jobs import journaled_step
 
-    _handoff.__name__ = name
-    _handoff.__doc__ = description
-    return tool(_handoff)
+        done = journaled_step(tool_call_id)
+        if done is not None:
+            return done
+        # Async path: ToolNode gathers parallel handoffs, so worker loops overlap
+        try:
+            result = await agent_graph.ainvoke({"messages": [HumanMessage(content=task)]})
+        except ModelTimeout as exc:
+            return _timed_out(exc)
+        return _journaled(tool_call_id, _result(result))
+
+    return StructuredTool.from_function(
+        func=_handoff,
+        coroutine=_ahandoff,
+        name=name,
+        description=description,
+        response_format="content_and_artifact",
+    )
 
 
-def build_system_tools_mode():
-    """Supervisor LLM with agent handoff via tools (supports parallel tool calls)."""
+def build_system_tools_mode(
+    async_mode: bool = False,
+    prerouter=None,
+    checkpointer=None,
+    history=None,
+    direct_return=None,
+    eager_workers: bool = False,
+):
+    """Supervisor LLM with agent handoff via tools (supports parallel tool calls).
+
+    Workers are built on their first handoff (``LazyWorker``), or right away
+    with ``eager_workers`` so the whole graph reads its settings now.
+    ``checkpointer`` is used as given; ``build_system`` supplies the env default.
+    """
     model_name = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    text_agent = create_text_worker(model_name)
-    data_agent = create_data_worker(model_name)
+    worker_mode = os.getenv("WORKER_MODE", "react").strip().lower()
+    text_agent = LazyWorker("text_agent", lambda: create_text_worker(model_name, mode=worker_mode))
+    data_agent = LazyWorker("data_agent", lambda: create_data_worker(model_name, mode=worker_mode))
+    if eager_workers:
+        text_agent.get()
+        data_agent.get()
 
     transfer_to_text = _make_handoff_tool(
         text_agent,
@@ -47,8 +164,14 @@ def build_system_tools_mode():
         ),
     )
 
-    def _bind(model: ChatOpenAI):
-        return model.bind_tools([transfer_to_text, transfer_to_data])
+    supervisor_tools = [transfer_to_text, transfer_to_data]
+    indexed = session_index_enabled()
+    if indexed:
+        # Follow-ups about earlier results are answered from the session index
+        supervisor_tools.append(make_session_lookup_tool())
+
+    def _bind(model: BaseChatModel):
+        return model.bind_tools(supervisor_tools)
 
     SUP_PROMPT = (
         "You are the Supervisor in the langgraph-supervised-quickstart project (https://github.com/joaomede/langgraph-supervised-quickstart).\n"
@@ -63,7 +186,7 @@ def build_system_tools_mode():
         
         "2. DATA AGENT (transfer_to_data)\n"
         "   - Capabilities: Statistical analysis, data formatting\n"
-        "   - Tools: calculate_stats (mean, median, stdev, min, max), format_table (markdown tables)\n"
+        "   - Tools: calculate_stats (mean, median, stdev, min, max), format_table (markdown tables, paged or summarized when large)\n"
         "   - Use when: User provides numbers, asks for statistics, needs data visualization\n"
         "   - Example: 'Calculate stats for: 10, 20, 30, 40, 50'\n\n"
         
@@ -73,7 +196,17 @@ def build_system_tools_mode():
         "- Route numerical/statistical tasks to DATA AGENT via transfer_to_data\n"
         "- For mixed requests (text + numbers), you MAY call both tools in parallel\n"
         "- Synthesize agent results into a clear, concise final answer\n"
-        "- If user mentions text/file but doesn't provide it, ask them to paste the content inline\n\n"
+        "- If user mentions text/file but doesn't provide it, ask them to paste the content inline\n"
+        "- Large inputs appear as handles like <<text:1a2b3c4d5e6f>> or <<numbers:1a2b3c4d5e6f>>; "
+        "copy them unchanged into the task (the agents' tools resolve them) and never ask for the content\n"
+        "- Agent results are compact: a status=... line, then [tool] sections with key=value pairs or CSV rows "
+        "(header first); present them to the user as readable prose, lists or markdown tables\n"
+        + (
+            "- For follow-ups about results of earlier turns (e.g. 'what were the entities in my last query?'), "
+            "call session_lookup instead of handing the task to an agent again\n"
+            if indexed else ""
+        )
+        + "\n"
         
         "=== CONSTRAINTS ===\n"
         "- NO file I/O, NO web access, NO external resources\n"
@@ -81,29 +214,142 @@ def build_system_tools_mode():
         "- Keep responses concise and focused\n"
     )
 
-    model = ChatOpenAI(model=model_name)
+    model = make_chat_model(model_name, agent="supervisor")
     llm = _bind(model)
-    tools_node = ToolNode([transfer_to_text, transfer_to_data])
+    tools_node = ToolNode(supervisor_tools)
+    if history is None:
+        history = HistoryManager.from_env(model)
+
+    llm_config = {"run_name": "supervisor_llm", "tags": ["orchestrator", "tools-mode"]}
 
-    def supervisor_llm(state: MessagesState):
+    def _with_system_prompt(state: SupervisorState):
         msgs = state["messages"]
         if not msgs or (msgs and getattr(msgs[0], "type", getattr(msgs[0], "role", "")) != "system"):
-            msgs = [{"role": "system", "content": SUP_PROMPT}] + msgs
-        resp = llm.invoke(
-            msgs,
-            config={"run_name": "supervisor_llm", "tags": ["orchestrator", "tools-mode"]},
-        )
+            prompt = SUP_PROMPT
+            if state.get("summary"):
+                prompt += "\n=== EARLIER CONVERSATION (SUMMARY) ===\n" + state["summary"] + "\n"
+            msgs = [{"role": "system", "content": prompt}] + msgs
+        return msgs
+
+    def _partial(state: SupervisorState):
+        # Out of time: answer with whatever the workers finished
+        return {"messages": [AIMessage(content=partial_answer(state["messages"], TIMEOUT_MARKER))]}
+
+    def supervisor_llm(state: SupervisorState):
+        try:
+            resp = llm.invoke(_with_system_prompt(state), config=llm_config)
+        except ModelTimeout:
+            return _partial(state)
+        return {"messages": [resp]}
+
+    async def asupervisor_llm(state: SupervisorState):
+        try:
+            resp = await llm.ainvoke(_with_system_prompt(state), config=llm_config)
+        except ModelTimeout:
+            return _partial(state)
         return {"messages": [resp]}
 
+    # Folding is an optimisation: skip it rather than fail the turn on a timeout
+    def trim_history(state: SupervisorState):
+        try:
+            return history.fold(state)
+        except ModelTimeout:
+            return {}
+
+    async def atrim_history(state: SupervisorState):
+        try:
+            return await history.afold(state)
+        except ModelTimeout:
+            return {}
+
+    def store_artifacts(state: SupervisorState):
+        last = state["messages"][-1]
+        if not isinstance(last, HumanMessage) or not isinstance(last.content, str):
+            return {}
+        content = extract_artifacts(last.content)
+        if content == last.content:
+            return {}
+        # Same id: the compact message replaces the original in the thread
+        return {"messages": [HumanMessage(content=content, id=last.id)]}
+
+    session_index = get_session_index()
+
+    def begin_turn(state: SupervisorState):
+        last = state["messages"][-1]
+        if isinstance(last, HumanMessage) and isinstance(last.content, str):
+            session_index.begin_turn(current_thread_id(), last.content)
+        return {}
+
     def route_after_llm(state: MessagesState):
         last = state["messages"][-1]
         tool_calls = getattr(last, "tool_calls", None)
         return "tools" if tool_calls else END
 
-    builder = StateGraph(MessagesState)
-    builder.add_node("llm", supervisor_llm)
+    def pre_route(state: MessagesState):
+        last = state["messages"][-1]
+        if not isinstance(last, HumanMessage) or not isinstance(last.content, str):
+            return {}
+        target = prerouter.route(last.content)
+        if target is None:
+            return {}
+        # Emit the handoff the supervisor would have chosen; it still synthesizes the answer
+        call = {"name": target, "args": {"task": last.content}, "id": f"prerouted_{uuid.uuid4().hex[:12]}"}
+        return {"messages": [AIMessage(content="", tool_calls=[call])]}
+
+    def route_after_prerouter(state: MessagesState):
+        return "tools" if getattr(state["messages"][-1], "tool_calls", None) else "llm"
+
+    def _single_handoff(messages):
+        """(agent, answer) when the last tool round was exactly one handoff, else None."""
+        results = []
+        for msg in reversed(messages):
+            if msg.type != "tool":
+                break
+            results.append(msg)
+        if len(results) != 1 or results[0].name not in HANDOFF_LABELS or results[0].status == "error":
+            return None
+        # The worker's own answer travels as the artifact when handoffs are structured
+        content = results[0].artifact if isinstance(results[0].artifact, str) else results[0].content
+        return HANDOFF_LABELS[results[0].name], content if isinstance(content, str) else ""
+
+    def direct_return_node(state: MessagesState):
+        handoff = _single_handoff(state["messages"])
+        answer = direct_return.decide(*handoff) if handoff else None
+        if answer is None:
+            return {}
+        # The worker answer becomes the supervisor's reply for this turn
+        return {"messages": [AIMessage(content=answer, name=handoff[0])]}
+
+    def route_after_direct_return(state: MessagesState):
+        return END if state["messages"][-1].type == "ai" else "llm"
+
+    builder = StateGraph(SupervisorState)
+    builder.add_node("llm", asupervisor_llm if async_mode else supervisor_llm)
     builder.add_node("tools", tools_node)
-    builder.add_edge(START, "llm")
+    entry = START
+    if artifacts_enabled():
+        builder.add_node("artifacts", store_artifacts)
+        builder.add_edge(START, "artifacts")
+        entry = "artifacts"
+    if indexed:
+        builder.add_node("session", begin_turn)
+        builder.add_edge(entry, "session")
+        entry = "session"
+    if history is not None:
+        builder.add_node("history", atrim_history if async_mode else trim_history)
+        builder.add_edge(entry, "history")
+        entry = "history"
+    if prerouter is not None:
+        builder.add_node("prerouter", pre_route)
+        builder.add_edge(entry, "prerouter")
+        builder.add_conditional_edges("prerouter", route_after_prerouter, {"tools": "tools", "llm": "llm"})
+    else:
+        builder.add_edge(entry, "llm")
     builder.add_conditional_edges("llm", route_after_llm, {"tools": "tools", END: END})
-    builder.add_edge("tools", "llm")
-    return builder.compile(checkpointer=MemorySaver())
+    if direct_return is not None:
+        builder.add_node("direct_return", direct_return_node)
+        builder.add_edge("tools", "direct_return")
+        builder.add_conditional_edges("direct_return", route_after_direct_return, {"llm": "llm", END: END})
+    else:
+        builder.add_edge("tools", "llm")
+    return builder.compile(checkpointer=checkpointer)
@@ -0,0 +1,381 @@
+"""Durable local job queue: submit queries, run them from worker processes, resume after crashes.
+
+Jobs live in a SQLite file (``JOBS_PATH``, WAL mode) shared by every process:
+
+- ``lgsq submit`` adds queued jobs
+- ``lgsq worker --processes N`` starts N processes. Each one claims the oldest
+  queued job under a lease (``JOB_LEASE`` seconds, renewed while it runs) and
+  runs the graph against a shared SQLite checkpointer (``CHECKPOINT_PATH``),
+  using the job's own thread
+- ``lgsq status`` shows counts per state and the latest jobs
+
+A worker that crashes or is killed stops renewing its lease, and the job goes
+back to the queue once the lease runs out. Ctrl-C releases the job at once.
+The next attempt resumes the thread from its last checkpoint instead of
+starting over. Finished handoffs are also journaled per tool call, so when
+the tools step is re-run only the handoffs that had not finished run again.
+Workers keep artifacts on disk (``ARTIFACT_DIR``, by default ``artifacts/``
+next to the checkpoint file) so a resumed job can still resolve the handles
+stored in its checkpoints.
+A job that keeps failing is marked ``failed`` after ``JOB_MAX_ATTEMPTS``.
+"""
+from __future__ import annotations
+
+import contextvars
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    thread_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    resumed INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+CREATE TABLE IF NOT EXISTS steps (
+    thread_id TEXT NOT NULL,
+    call_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    artifact TEXT,
+    PRIMARY KEY (thread_id, call_id)
+);
+"""
+
+STATUSES = ("queued", "running", "done", "failed")
+
+
+@dataclass
+class Job:
+    id: str
+    query: str
+    thread_id: str
+    status: str
+    attempts: int
+    worker: Optional[str] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    resumed: int = 0
+    created: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+
+class JobQueue:
+    """SQLite job table plus the handoff step journal; safe across threads and processes."""
+
+    def __init__(self, path: str | Path = ".cache/jobs.sqlite", lease: float = 60.0, max_attempts: int = 3):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        return cls(
+            os.getenv("JOBS_PATH", ".cache/jobs.sqlite"),
+            lease=float(os.getenv("JOB_LEASE", "60")),
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        # IMMEDIATE takes the write lock up front, so two workers never claim the same job
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                yield cur
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            cur.execute("COMMIT")
+
+    def submit(self, query: str, job_id: Optional[str] = None, thread_id: Optional[str] = None) -> str:
+        job_id = job_id or uuid.uuid4().hex[:12]
+        with self._transaction() as cur:
+            cur.execute(
+                "INSERT INTO jobs (id, query, thread_id, created) VALUES (?, ?, ?, ?)",
+                (job_id, query, thread_id or f"job-{job_id}", time.time()),
+            )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Oldest queued job, or a running job whose lease expired (its worker died)."""
+        now = time.time()
+        with self._transaction() as cur:
+            # A worker that died mid-job never reached fail(); stop reclaiming it past the limit
+            cur.execute(
+                "UPDATE jobs SET status = 'failed', lease_until = NULL, finished = ?, "
+                "error = COALESCE(error, 'lease expired after the last attempt') "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = cur.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND lease_until < ? AND attempts < ?) "
+                "ORDER BY created LIMIT 1",
+                (now, self.max_attempts),
+            ).fetchone()
+            if row is None:
+                return None
+            cur.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "started = COALESCE(started, ?) WHERE id = ?",
+                (worker, now + self.lease, now, row[0]),
+            )
+        return self.get(row[0])
+
+    def renew(self, job_id: str, worker: str) -> bool:
+        """Extend the lease; False when the job is no longer ours."""
+        with self._transaction() as cur:
+            cur.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + self.lease, job_id, worker),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker: str, result: str, resumed: bool = False) -> bool:
+        """Store the answer; False when the lease was lost and another worker owns the job."""
+        with self._transaction() as cur:
+            cur.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_until = NULL, finished = ?, "
+                "resumed = resumed + ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (result, time.time(), int(resumed), job_id, worker),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: str, worker: str, error: str) -> str:
+        """Record an error; the job is retried until ``max_attempts``. Returns the new status."""
+        with self._transaction() as cur:
+            row = cur.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            status = "failed" if row is None or row[0] >= self.max_attempts else "queued"
+            cur.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, finished = ? WHERE id = ? AND worker = ?",
+                (status, error, time.time() if status == "failed" else None, job_id, worker),
+            )
+        return status
+
+    def release(self, job_id: str, worker: str) -> None:
+        """Give an interrupted job back to the queue without counting the attempt."""
+        with self._transaction() as cur:
+            cur.execute(
+                "UPDATE jobs SET status = 'queued', lease_until = NULL, attempts = MAX(attempts - 1, 0) "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (job_id, worker),
+            )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, query, thread_id, status, attempts, worker, result, error, resumed, created, started, finished "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        return Job(*row) if row else None
+
+    def jobs(self, limit: int = 20, status: Optional[str] = None) -> List[Job]:
+        """Most recent jobs first."""
+        where, args = ("WHERE status = ?", (status,)) if status else ("", ())
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, query, thread_id, status, attempts, worker, result, error, resumed, created, started, finished "
+                f"FROM jobs {where} ORDER BY created DESC LIMIT ?",
+                (*args, limit),
+            ).fetchall()
+        return [Job(*row) for row in rows]
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in STATUSES} | dict(rows)
+
+    # handoff step journal
+
+    def step(self, thread_id: str, call_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, artifact FROM steps WHERE thread_id = ? AND call_id = ?", (thread_id, call_id)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def record_step(self, thread_id: str, call_id: str, content: str, artifact: Optional[str]) -> None:
+        with self._transaction() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO steps (thread_id, call_id, content, artifact) VALUES (?, ?, ?, ?)",
+                (thread_id, call_id, content, artifact),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# Set while a worker runs a job, so handoffs can reuse results journaled by an earlier attempt
+_journal: contextvars.ContextVar[Optional[Tuple[JobQueue, str]]] = contextvars.ContextVar("job_journal", default=None)
+
+
+def journaled_step(call_id: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+    """(content, artifact) of a handoff finished by an earlier attempt of the current job."""
+    journal = _journal.get()
+    if journal is None or not call_id:
+        return None
+    queue, thread_id = journal
+    return queue.step(thread_id, call_id)
+
+
+def journal_step(call_id: Optional[str], content: str, artifact: Optional[str]) -> None:
+    journal = _journal.get()
+    if journal is not None and call_id:
+        queue, thread_id = journal
+        queue.record_step(thread_id, call_id, content, artifact)
+
+
+def _final_answer(state) -> Optional[str]:
+    messages = state.values.get("messages", []) if state else []
+    if messages and messages[-1].type == "ai" and not getattr(messages[-1], "tool_calls", None):
+        return messages[-1].content if isinstance(messages[-1].content, str) else str(messages[-1].content)
+    return None
+
+
+def run_job(graph, queue: JobQueue, job: Job) -> Tuple[str, bool]:
+    """Run (or resume) one job on ``graph``; returns (answer, resumed)."""
+    from langchain_core.messages import HumanMessage
+
+    config = {"configurable": {"thread_id": job.thread_id}, "run_name": "job", "tags": ["job"]}
+    # Threads are per job, so any checkpoint here comes from an earlier attempt
+    state = graph.get_state(config)
+    state = state if state.values else None
+    token = _journal.set((queue, job.thread_id))
+    try:
+        if state is not None and state.next:
+            # Interrupted mid-run: continue from the last completed node
+            graph.invoke(None, config)
+            resumed = True
+        elif state is not None and _final_answer(state) is not None and _has_message(state, _message_id(job)):
+            # The previous attempt finished the run but died before recording it
+            resumed = True
+        else:
+            # The id survives the artifact layer rewriting the message content
+            graph.invoke({"messages": [HumanMessage(content=job.query, id=_message_id(job))]}, config)
+            resumed = False
+    finally:
+        _journal.reset(token)
+    return _final_answer(graph.get_state(config)) or "", resumed
+
+
+def _message_id(job: Job) -> str:
+    return f"job-{job.id}"
+
+
+def _has_message(state, message_id: str) -> bool:
+    return any(m.id == message_id for m in state.values.get("messages", []))
+
+
+def _renew_lease(queue: JobQueue, job: Job, worker: str, stop: threading.Event) -> None:
+    while not stop.wait(queue.lease / 3):
+        if not queue.renew(job.id, worker):
+            return
+
+
+def worker_loop(worker: str, *, drain: bool = False, poll: float = 1.0, on_event=None) -> int:
+    """Claim and run jobs until interrupted (or, with ``drain``, until the queue is empty).
+
+    Returns the number of jobs this worker finished.
+    """
+    from agent import build_system
+    from agent.checkpoint import sqlite_saver
+
+    queue = JobQueue.from_env()
+    checkpoint_path = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite")
+    # Checkpoints hold artifact handles; a worker resuming another's job must be able to resolve them
+    os.environ.setdefault("ARTIFACT_DIR", str(Path(checkpoint_path).parent / "artifacts"))
+    checkpointer = sqlite_saver(
+        checkpoint_path,
+        max_checkpoints_per_thread=int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "20")),
+    )
+    # Several processes write the same checkpoint file
+    checkpointer.conn.execute("PRAGMA journal_mode=WAL")
+    checkpointer.conn.execute("PRAGMA busy_timeout=30000")
+    graph = build_system(checkpointer=checkpointer)
+    emit = on_event or (lambda *args: None)
+    finished = 0
+    while True:
+        job = queue.claim(worker)
+        if job is None:
+            if drain:
+                return finished
+            time.sleep(poll)
+            continue
+        emit("start", worker, job)
+        stop = threading.Event()
+        threading.Thread(target=_renew_lease, args=(queue, job, worker, stop), daemon=True).start()
+        try:
+            answer, resumed = run_job(graph, queue, job)
+        except KeyboardInterrupt:
+            queue.release(job.id, worker)
+            emit("released", worker, job)
+            raise
+        except Exception as exc:  # noqa: BLE001 - recorded on the job, retried up to max_attempts
+            status = queue.fail(job.id, worker, f"{type(exc).__name__}: {exc}")
+            emit(status, worker, job)
+        else:
+            if queue.complete(job.id, worker, answer, resumed=resumed):
+                finished += 1
+                emit("resumed" if resumed else "done", worker, job)
+            else:
+                emit("lost", worker, job)
+        finally:
+            stop.set()
+
+
+def worker_id(index: int = 0) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def _process_main(index: int, drain: bool, poll: float) -> None:
+    try:
+        worker_loop(worker_id(index), drain=drain, poll=poll, on_event=print_event)
+    except KeyboardInterrupt:
+        pass
+
+
+def print_event(event: str, worker: str, job: Job) -> None:
+    print(f"[{worker}] {event} {job.id} (attempt {job.attempts}): {job.query[:60]}", flush=True)
+
+
+def run_workers(processes: int, *, drain: bool = False, poll: float = 1.0) -> None:
+    """Start ``processes`` worker processes and wait for them (Ctrl-C stops all)."""
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    children = [context.Process(target=_process_main, args=(i, drain, poll), name=f"lgsq-worker-{i}") for i in range(processes)]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        # Children got the same SIGINT; give them time to release their jobs
+        for child in children:
+            child.join(timeout=10)
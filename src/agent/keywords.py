@@ -0,0 +1,245 @@
+"""Keyword frequency engine behind the ``keyword_counts`` tool.
+
+Built for whole documents and document sets, not just chat snippets:
+
+- streaming: input (a string, or any iterable of strings such as an open
+  file) is processed in chunks of ``chunk_size`` characters cut at
+  whitespace, so memory grows with the vocabulary, not the input
+- Unicode words: NFC-normalized, case-folded runs of letters, digits and
+  combining marks (Devanagari, Arabic, Cyrillic, accented Latin, ...);
+  Chinese/Japanese runs, which have no spaces, count as overlapping bigrams
+- parallel: strings longer than ``parallel_min_chars`` are split into chunks
+  counted by a process pool, and the per-chunk counters are merged
+- bounded memory: ``sketch_size`` switches exact counting to a mergeable
+  Misra-Gries heavy-hitters summary with at most that many terms; counts
+  are then lower bounds, off by at most ``HeavyHitters.error``
+- batch: ``keyword_counts_batch`` returns per-document and corpus-wide top-k
+
+Defaults come from ``KEYWORD_PROCESSES``, ``KEYWORD_CHUNK_CHARS`` and
+``KEYWORD_PARALLEL_MIN_CHARS``. This module only uses the standard library
+(and ``agent.pool``), so process-pool workers start quickly.
+"""
+from __future__ import annotations
+
+import os
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from agent.pool import default_processes, process_pool
+
+Document = Union[str, Iterable[str], "os.PathLike[str]"]
+
+# Scripts written without spaces between words
+_CJK = "\u3040-\u30ff\u31f0-\u31ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\U00020000-\U0002fa1f"
+_CJK_RUN = re.compile(f"[{_CJK}]+")
+_ASCII_WORD = re.compile(r"\w+", re.ASCII)
+_WORD = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1)
+def _word_pattern() -> re.Pattern:
+    """``\\w`` plus combining marks, which ``re`` leaves out (needed for Indic scripts)."""
+    ranges, start, prev = [], None, None
+    # Marks live in planes 0-1, apart from the variation selectors supplement
+    for cp in list(range(0x20000)) + list(range(0xE0100, 0xE01F0)):
+        if unicodedata.category(chr(cp))[0] == "M":
+            if start is None:
+                start = cp
+            elif cp != prev + 1:
+                ranges.append((start, prev))
+                start = cp
+            prev = cp
+    if start is not None:
+        ranges.append((start, prev))
+    marks = "".join(re.escape(chr(a)) + ("-" + re.escape(chr(b)) if b > a else "") for a, b in ranges)
+    # Marks only continue a word, so the common case stays a plain \w+ scan
+    return re.compile(f"\\w+(?:[{marks}]+\\w*)*")
+
+
+def _bigrams(run: str) -> Iterator[str]:
+    if len(run) == 1:
+        yield run
+        return
+    for i in range(len(run) - 1):
+        yield run[i:i + 2]
+
+
+def count_chunk(chunk: str) -> Counter:
+    """Exact term counts for one chunk (no length filter)."""
+    if chunk.isascii():
+        # Fast path: nothing to normalize, and a much smaller character class
+        return Counter(_ASCII_WORD.findall(chunk.lower().replace("_", " ")))
+    try:
+        chunk.encode("latin-1")
+    except UnicodeEncodeError:
+        pass
+    else:
+        # Latin-1 text is already NFC and has no combining marks or CJK
+        return Counter(_WORD.findall(chunk.casefold().replace("_", " ")))
+    chunk = unicodedata.normalize("NFC", chunk).casefold().replace("_", " ")
+    counts: Counter = Counter()
+    if _CJK_RUN.search(chunk):
+        for run in _CJK_RUN.findall(chunk):
+            counts.update(_bigrams(run))
+        chunk = _CJK_RUN.sub(" ", chunk)
+    counts.update(_word_pattern().findall(chunk))
+    return counts
+
+
+def iter_chunks(source: Union[str, Iterable[str]], chunk_size: int) -> Iterator[str]:
+    """Pieces of about ``chunk_size`` characters, cut at whitespace so no word is split."""
+    if isinstance(source, str):
+        start = 0
+        while start < len(source):
+            end = min(start + chunk_size, len(source))
+            if end < len(source):
+                cut = max(source.rfind(" ", start, end), source.rfind("\n", start, end))
+                end = cut + 1 if cut > start else end
+            yield source[start:end]
+            start = end
+        return
+    buffer: List[str] = []
+    size = 0
+    for piece in source:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            text = "".join(buffer)
+            cut = max(text.rfind(" "), text.rfind("\n"))
+            if cut <= 0:
+                cut = len(text) - 1
+            yield text[: cut + 1]
+            buffer, size = [text[cut + 1:]], len(text) - cut - 1
+    if size:
+        yield "".join(buffer)
+
+
+class HeavyHitters:
+    """Misra-Gries summary: at most ``capacity`` terms, mergeable across chunks and processes.
+
+    Every reported count is at most ``error`` below the true count, and every
+    term more frequent than ``total / (capacity + 1)`` is kept.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Counter = Counter()
+        self.error = 0
+        self.total = 0
+
+    def update(self, counts: Dict[str, int]) -> "HeavyHitters":
+        self.total += sum(counts.values())
+        self.counts.update(counts)
+        self._prune()
+        return self
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        self.total += other.total
+        self.error += other.error
+        self.counts.update(other.counts)
+        self._prune()
+        return self
+
+    def _prune(self) -> None:
+        if len(self.counts) <= self.capacity:
+            return
+        # Subtract the (capacity+1)-th largest count from every term, drop what reaches zero
+        cut = sorted(self.counts.values(), reverse=True)[self.capacity]
+        self.error += cut
+        self.counts = Counter({term: n - cut for term, n in self.counts.items() if n > cut})
+
+    def most_common(self, n: int) -> List[tuple[str, int]]:
+        return self.counts.most_common(n)
+
+
+def _settings(processes: Optional[int], chunk_size: Optional[int], parallel_min_chars: Optional[int]):
+    return (
+        processes if processes is not None else default_processes("KEYWORD_PROCESSES"),
+        chunk_size or int(os.getenv("KEYWORD_CHUNK_CHARS", str(1 << 20))),
+        parallel_min_chars if parallel_min_chars is not None else int(os.getenv("KEYWORD_PARALLEL_MIN_CHARS", str(4 << 20))),
+    )
+
+
+def _count_document(source: Document, chunk_size: int, sketch_size: Optional[int]):
+    """Exact Counter, or a HeavyHitters summary when ``sketch_size`` is set."""
+    if isinstance(source, os.PathLike):
+        with open(source, encoding="utf-8", errors="replace") as handle:
+            return _count_document(handle, chunk_size, sketch_size)
+    total = HeavyHitters(sketch_size) if sketch_size else Counter()
+    for chunk in iter_chunks(source, chunk_size):
+        total.update(count_chunk(chunk))
+    return total
+
+
+def _count_parallel(text: str, chunk_size: int, processes: int, sketch_size: Optional[int]):
+    pool = process_pool(processes)
+    # One task per chunk so uneven pieces balance across workers
+    chunks = list(iter_chunks(text, chunk_size))
+    return _merge(pool.map(_count_document, chunks, repeat(chunk_size), repeat(sketch_size)), sketch_size)
+
+
+def _merge(parts: Iterable, sketch_size: Optional[int]):
+    total = HeavyHitters(sketch_size) if sketch_size else Counter()
+    for part in parts:
+        if sketch_size:
+            total.merge(part)
+        else:
+            total.update(part)
+    return total
+
+
+def _top(counts, top_k: int, min_length: int) -> List[dict]:
+    items = counts.counts if isinstance(counts, HeavyHitters) else counts
+    ranked = Counter({term: n for term, n in items.items() if len(term) >= min_length}).most_common(top_k)
+    return [{"term": term, "count": n} for term, n in ranked]
+
+
+def count_keywords(
+    source: Document,
+    *,
+    sketch_size: Optional[int] = None,
+    processes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    parallel_min_chars: Optional[int] = None,
+):
+    """Term counts for one document: a Counter, or a ``HeavyHitters`` with ``sketch_size``."""
+    processes, chunk_size, parallel_min_chars = _settings(processes, chunk_size, parallel_min_chars)
+    if isinstance(source, str) and processes > 1 and len(source) >= parallel_min_chars:
+        return _count_parallel(source, chunk_size, processes, sketch_size)
+    return _count_document(source, chunk_size, sketch_size)
+
+
+def top_keywords(source: Document, top_k: int = 10, min_length: int = 2, **kwargs) -> List[dict]:
+    """Top-k ``{"term", "count"}`` rows, as returned by the ``keyword_counts`` tool."""
+    return _top(count_keywords(source, **kwargs), top_k, min_length)
+
+
+def keyword_counts_batch(
+    documents: Sequence[Document],
+    top_k: int = 10,
+    min_length: int = 2,
+    *,
+    sketch_size: Optional[int] = None,
+    processes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> dict:
+    """Per-document and corpus-wide top-k over many documents.
+
+    Documents are strings, iterables of strings, or paths (read as UTF-8,
+    streamed). With ``processes > 1`` strings and paths are counted in the
+    process pool, one task per document.
+    """
+    processes, chunk_size, _ = _settings(processes, chunk_size, None)
+    picklable = all(isinstance(d, (str, os.PathLike)) for d in documents)
+    if processes > 1 and picklable and len(documents) > 1:
+        parts = list(process_pool(processes).map(_count_document, documents, repeat(chunk_size), repeat(sketch_size)))
+    else:
+        parts = [_count_document(d, chunk_size, sketch_size) for d in documents]
+    return {
+        "documents": [_top(part, top_k, min_length) for part in parts],
+        "corpus": _top(_merge(parts, sketch_size), top_k, min_length),
+    }
@@ -0,0 +1,154 @@
+"""Token-budgeted conversation history for the supervisor thread.
+
+The graph keeps the whole chat in one checkpointed thread. Before each
+supervisor turn, ``HistoryManager`` counts tokens. Once the history goes over
+budget, the oldest whole turns (a user message plus everything up to the next
+one) are folded into a rolling summary and removed from state. The most
+recent turns stay verbatim, so prompt size stays bounded however long the
+session runs.
+"""
+from __future__ import annotations
+
+import os
+from typing import Callable, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately, get_buffer_string
+from langgraph.graph import MessagesState
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and a multi-agent assistant "
+    "(text analysis + data analysis). Merge the previous summary with the new messages. Keep concrete "
+    "facts the user may ask about later: inputs they provided, entities, keywords, computed statistics. "
+    "Be terse; at most {max_words} words.\n\n"
+    "Previous summary:\n{summary}\n\nNew messages:\n{messages}"
+)
+
+
+class SupervisorState(MessagesState):
+    """Supervisor graph state: messages plus the rolling summary of folded turns."""
+
+    summary: str
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Group messages into turns, each starting at a HumanMessage (tool pairs stay together)."""
+    turns: List[List[BaseMessage]] = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(msg)
+    return turns
+
+
+class ExtractiveSummarizer:
+    """Model-free fallback: keeps the head of each user/assistant message, capped in length."""
+
+    def __init__(self, max_chars: int = 2000, snippet_chars: int = 200):
+        self.max_chars = max_chars
+        self.snippet_chars = snippet_chars
+
+    def summarize(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        lines = [summary] if summary else []
+        for msg in messages:
+            if msg.type not in {"human", "ai"} or not isinstance(msg.content, str) or not msg.content.strip():
+                continue
+            role = "User" if msg.type == "human" else "Assistant"
+            lines.append(f"{role}: {' '.join(msg.content.split())[: self.snippet_chars]}")
+        return "\n".join(lines)[-self.max_chars:]
+
+    async def asummarize(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        return self.summarize(summary, messages)
+
+
+class LLMSummarizer:
+    """Folds turns into the summary with a chat model (no tools bound)."""
+
+    def __init__(self, model, max_words: int = 150):
+        self.model = model
+        self.max_words = max_words
+
+    def _prompt(self, summary: str, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        text = SUMMARY_PROMPT.format(
+            max_words=self.max_words,
+            summary=summary or "(none)",
+            messages=get_buffer_string(messages),
+        )
+        return [HumanMessage(content=text)]
+
+    def summarize(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        resp = self.model.invoke(self._prompt(summary, messages), config={"run_name": "history_summary"})
+        return str(resp.content)
+
+    async def asummarize(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        resp = await self.model.ainvoke(self._prompt(summary, messages), config={"run_name": "history_summary"})
+        return str(resp.content)
+
+
+class HistoryManager:
+    """Keeps the supervisor's history under ``max_tokens``.
+
+    The newest ``keep_turns`` turns are kept verbatim whenever they fit. Older
+    turns are folded into the summary. The current turn is never folded.
+    """
+
+    def __init__(
+        self,
+        summarizer,
+        *,
+        max_tokens: int = 3000,
+        keep_turns: int = 3,
+        token_counter: Callable[[Sequence[BaseMessage]], int] = count_tokens_approximately,
+    ):
+        self.summarizer = summarizer
+        self.max_tokens = max_tokens
+        self.keep_turns = max(keep_turns, 1)
+        self.token_counter = token_counter
+
+    @classmethod
+    def from_env(cls, model) -> Optional["HistoryManager"]:
+        """Built from ``HISTORY_*`` env vars; ``HISTORY_MAX_TOKENS=0`` disables trimming."""
+        max_tokens = int(os.getenv("HISTORY_MAX_TOKENS", "3000"))
+        if max_tokens <= 0:
+            return None
+        if os.getenv("HISTORY_SUMMARIZER", "llm").strip().lower() == "extractive":
+            summarizer = ExtractiveSummarizer()
+        else:
+            summarizer = LLMSummarizer(model)
+        return cls(summarizer, max_tokens=max_tokens, keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", "3")))
+
+    def _count(self, summary: str, messages: Sequence[BaseMessage]) -> int:
+        extra = [SystemMessage(content=summary)] if summary else []
+        return self.token_counter(extra + list(messages))
+
+    def _select(self, state) -> Optional[List[BaseMessage]]:
+        """Messages to fold, or None when the history already fits."""
+        summary = state.get("summary", "")
+        messages = state["messages"]
+        if self._count(summary, messages) <= self.max_tokens:
+            return None
+        turns = split_turns(messages)
+        keep = min(self.keep_turns, len(turns))
+        # Fold more than the default when the kept turns alone still exceed the budget
+        while keep > 1 and self._count(summary, [m for t in turns[-keep:] for m in t]) > self.max_tokens:
+            keep -= 1
+        folded = [m for t in turns[:-keep] for m in t]
+        return folded or None
+
+    def _update(self, folded: List[BaseMessage], summary: str) -> dict:
+        return {
+            "summary": summary,
+            "messages": [RemoveMessage(id=m.id) for m in folded if m.id],
+        }
+
+    def fold(self, state) -> dict:
+        folded = self._select(state)
+        if not folded:
+            return {}
+        return self._update(folded, self.summarizer.summarize(state.get("summary", ""), folded))
+
+    async def afold(self, state) -> dict:
+        folded = self._select(state)
+        if not folded:
+            return {}
+        return self._update(folded, await self.summarizer.asummarize(state.get("summary", ""), folded))
@@ -0,0 +1,281 @@
+"""Built-in instrumentation: where time and tokens go, without external tracing.
+
+``MetricsCallbackHandler`` is a LangChain callback handler. ``build_system``
+attaches the process-wide instance (``get_metrics()``) to the compiled graph.
+It records:
+
+- wall time per span: ``node:<name>`` (top-level graph nodes),
+  ``worker:<agent>`` (one handoff = one worker subgraph run), ``tool:<name>``
+  (worker tools) and ``model:<agent>``; ``self`` time excludes nested model calls
+- per-model calls, prompt/completion tokens and errors, keyed by agent and model
+- retries: retry callbacks plus retryable HTTP responses (429/5xx) seen by
+  the shared OpenAI HTTP clients
+- events such as hedged calls and expired deadlines (``record_event``)
+- raw vs. compact token estimates of encoded tool and handoff results
+  (``result_encoding`` custom events from ``agent.encoding``)
+
+Export with ``as_dict()`` (JSON) or ``to_prometheus()``. ``METRICS=off``
+disables the handler.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent.streaming import HANDOFF_LABELS
+
+_RETRYABLE = {408, 409, 429}
+
+
+class _Span:
+    __slots__ = ("count", "total", "model", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.model = 0.0
+        self.max = 0.0
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Thread-safe span timer and token counter; cheap enough to leave on."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._roots: set[uuid.UUID] = set()
+        self._parents: Dict[uuid.UUID, Optional[uuid.UUID]] = {}
+        self._open: Dict[uuid.UUID, tuple[Optional[str], float]] = {}
+        self._model_keys: Dict[uuid.UUID, tuple[str, str]] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans: Dict[str, _Span] = defaultdict(_Span)
+            self.models: Dict[tuple[str, str], Counter] = defaultdict(Counter)
+            self.retries = 0
+            self.http_responses: Counter = Counter()
+            self.events: Counter = Counter()
+            self.encoding: Dict[str, Counter] = defaultdict(Counter)
+            self.runs = 0
+
+    # span bookkeeping
+    def _start(self, run_id, parent_run_id, label: Optional[str]) -> None:
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            self._open[run_id] = (label, time.perf_counter())
+
+    def _end(self, run_id) -> Optional[float]:
+        now = time.perf_counter()
+        with self._lock:
+            label, started = self._open.pop(run_id, (None, now))
+            parent = self._parents.pop(run_id, None)
+            self._roots.discard(run_id)
+            if label is None:
+                return None
+            elapsed = now - started
+            span = self.spans[label]
+            span.count += 1
+            span.total += elapsed
+            span.max = max(span.max, elapsed)
+            if label.startswith("model:"):
+                # Model time counts against every labelled ancestor still running
+                while parent is not None:
+                    ancestor = self._open.get(parent)
+                    if ancestor and ancestor[0]:
+                        self.spans[ancestor[0]].model += elapsed
+                    parent = self._parents.get(parent)
+            return elapsed
+
+    def _agent_for(self, parent_run_id) -> str:
+        with self._lock:
+            parent = parent_run_id
+            while parent is not None:
+                label = (self._open.get(parent) or (None,))[0]
+                if label and label.startswith("worker:"):
+                    return label.split(":", 1)[1]
+                parent = self._parents.get(parent)
+        return "supervisor"
+
+    # callbacks
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        label = None
+        with self._lock:
+            if parent_run_id is None:
+                self._roots.add(run_id)
+                self.runs += 1
+            elif parent_run_id in self._roots and kwargs.get("name"):
+                label = f"node:{kwargs['name']}"
+        self._start(run_id, parent_run_id, label)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        label = f"worker:{HANDOFF_LABELS[name]}" if name in HANDOFF_LABELS else f"tool:{name}"
+        self._start(run_id, parent_run_id, label)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        agent = self._agent_for(parent_run_id)
+        model = (metadata or {}).get("ls_model_name") or "unknown"
+        with self._lock:
+            self._model_keys[run_id] = (agent, model)
+        self._start(run_id, parent_run_id, f"model:{agent}")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        elapsed = self._end(run_id)
+        usage = Counter()
+        for generations in response.generations:
+            for gen in generations:
+                meta = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                usage["input_tokens"] += meta.get("input_tokens", 0)
+                usage["output_tokens"] += meta.get("output_tokens", 0)
+        with self._lock:
+            key = self._model_keys.pop(run_id, ("supervisor", "unknown"))
+            stats = self.models[key]
+            stats["calls"] += 1
+            stats.update(usage)
+            stats["seconds"] += elapsed or 0.0
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+        with self._lock:
+            key = self._model_keys.pop(run_id, ("supervisor", "unknown"))
+            self.models[key]["errors"] += 1
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        with self._lock:
+            self.retries += 1
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_custom_event(self, name, data, *, run_id, **kwargs):
+        # Raw vs. compact size of each encoded tool/handoff result (agent.encoding)
+        if name == "result_encoding":
+            with self._lock:
+                stats = self.encoding[data["name"]]
+                stats["calls"] += 1
+                stats["raw_tokens"] += data["raw_tokens"]
+                stats["encoded_tokens"] += data["encoded_tokens"]
+
+    def record_http_status(self, status: int) -> None:
+        """Hook for the shared HTTP clients; 408/409/429/5xx are retried by the OpenAI SDK."""
+        with self._lock:
+            self.http_responses[status] += 1
+            if status in _RETRYABLE or status >= 500:
+                self.retries += 1
+
+    def record_event(self, name: str) -> None:
+        """Count a named event (``hedge_fired``, ``hedge_won``, ``deadline_exceeded``, ...)."""
+        with self._lock:
+            self.events[name] += 1
+
+    # export
+    def as_dict(self) -> dict:
+        with self._lock:
+            spans = {
+                label: {
+                    "count": s.count,
+                    "total_ms": round(s.total * 1000, 3),
+                    "mean_ms": round(s.total * 1000 / s.count, 3) if s.count else 0.0,
+                    "max_ms": round(s.max * 1000, 3),
+                    "self_ms": round((s.total - s.model) * 1000, 3),
+                }
+                for label, s in sorted(self.spans.items())
+            }
+            models = [
+                {"agent": agent, "model": model, **{k: round(v, 3) if isinstance(v, float) else v for k, v in stats.items()}}
+                for (agent, model), stats in sorted(self.models.items())
+            ]
+            return {
+                "runs": self.runs,
+                "spans": spans,
+                "models": models,
+                "retries": self.retries,
+                "http_responses": {str(k): v for k, v in sorted(self.http_responses.items())},
+                "events": dict(sorted(self.events.items())),
+                "encoding": {
+                    name: {**stats, "saved_tokens": stats["raw_tokens"] - stats["encoded_tokens"]}
+                    for name, stats in sorted(self.encoding.items())
+                },
+            }
+
+    def report(self, queries: int) -> dict:
+        """Span totals averaged per query (used by the benchmark suite)."""
+        n = max(queries, 1)
+        return {
+            label: {
+                "calls_per_query": round(s["count"] / n, 2),
+                "ms_per_query": round(s["total_ms"] / n, 3),
+                "self_ms_per_query": round(s["self_ms"] / n, 3),
+            }
+            for label, s in self.as_dict()["spans"].items()
+        }
+
+    def to_prometheus(self, prefix: str = "lgsq") -> str:
+        data = self.as_dict()
+        lines = [f"# TYPE {prefix}_graph_runs_total counter", f"{prefix}_graph_runs_total {data['runs']}"]
+        lines.append(f"# TYPE {prefix}_span_seconds summary")
+        for label, s in data["spans"].items():
+            kind, name = label.split(":", 1)
+            tags = f'kind="{kind}",name="{name}"'
+            lines.append(f"{prefix}_span_seconds_sum{{{tags}}} {s['total_ms'] / 1000:.6f}")
+            lines.append(f"{prefix}_span_seconds_count{{{tags}}} {s['count']}")
+        lines.append(f"# TYPE {prefix}_span_self_seconds_total counter")
+        for label, s in data["spans"].items():
+            kind, name = label.split(":", 1)
+            lines.append(f'{prefix}_span_self_seconds_total{{kind="{kind}",name="{name}"}} {s["self_ms"] / 1000:.6f}')
+        tags = [(m, f'agent="{m["agent"]}",model="{m["model"]}"') for m in data["models"]]
+        lines.append(f"# TYPE {prefix}_model_calls_total counter")
+        lines += [f"{prefix}_model_calls_total{{{t}}} {m.get('calls', 0)}" for m, t in tags]
+        lines.append(f"# TYPE {prefix}_model_tokens_total counter")
+        for m, t in tags:
+            lines.append(f'{prefix}_model_tokens_total{{{t},type="input"}} {m.get("input_tokens", 0)}')
+            lines.append(f'{prefix}_model_tokens_total{{{t},type="output"}} {m.get("output_tokens", 0)}')
+        lines.append(f"# TYPE {prefix}_model_errors_total counter")
+        lines += [f"{prefix}_model_errors_total{{{t}}} {m.get('errors', 0)}" for m, t in tags]
+        lines.append(f"# TYPE {prefix}_retries_total counter")
+        lines.append(f"{prefix}_retries_total {data['retries']}")
+        lines.append(f"# TYPE {prefix}_http_responses_total counter")
+        for status, n in data["http_responses"].items():
+            lines.append(f'{prefix}_http_responses_total{{status="{status}"}} {n}')
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, n in data["events"].items():
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {n}')
+        lines.append(f"# TYPE {prefix}_encoded_result_tokens_total counter")
+        for name, stats in data["encoding"].items():
+            for kind in ("raw", "encoded"):
+                lines.append(f'{prefix}_encoded_result_tokens_total{{name="{name}",type="{kind}"}} {stats[kind + "_tokens"]}')
+        return "\n".join(lines) + "\n"
+
+
+_shared: Optional[MetricsCallbackHandler] = None
+_shared_lock = threading.Lock()
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("METRICS", "on").strip().lower() not in {"off", "false", "0", "no"}
+
+
+def get_metrics() -> MetricsCallbackHandler:
+    """Process-wide handler attached by ``build_system``."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = MetricsCallbackHandler()
+        return _shared
@@ -0,0 +1,153 @@
+"""Chat model factory shared by the supervisor and both workers.
+
+``LLM_PROVIDER`` selects the backend: ``openai`` (default) or ``fake`` (the
+offline ``ScriptedChatModel``; ``FAKE_LLM_LATENCY`` adds a per-call delay,
+``FAKE_LLM_TAIL_LATENCY``/``FAKE_LLM_TAIL_EVERY`` an occasional slow call).
+Every model is wrapped in ``DeadlineChatModel`` (timeouts, hedging).
+
+Each agent can use its own model spec (``SUPERVISOR_MODEL``,
+``TEXT_AGENT_MODEL``, ``DATA_AGENT_MODEL``; default ``OPENAI_MODEL``). A spec
+may list several ``provider:model@tier`` candidates (``openai``,
+``anthropic``, ``fake``); see ``agent.fallback`` for how one is picked.
+
+OpenAI models share one pooled sync and one pooled async HTTP client per
+process, so the supervisor and workers reuse warm keep-alive connections
+instead of each opening its own pool. Pool size, timeouts and retries come
+from ``OPENAI_POOL_SIZE``, ``OPENAI_CONNECT_TIMEOUT``, ``OPENAI_READ_TIMEOUT``
+and ``OPENAI_MAX_RETRIES``. Response status codes feed ``agent.metrics``.
+Provider SDKs (and httpx) are imported only when a spec uses them.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+from typing import TYPE_CHECKING, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from agent.cache import llm_cache_for
+from agent.deadline import DeadlineChatModel
+from agent.fake_model import ScriptedChatModel
+from agent.fallback import ModelCandidate, RoutedChatModel, parse_model_spec
+from agent.metrics import get_metrics
+
+if TYPE_CHECKING:
+    import httpx
+
+_clients_lock = threading.Lock()
+_sync_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def use_fake_provider() -> bool:
+    return os.getenv("LLM_PROVIDER", "openai").strip().lower() == "fake"
+
+
+def http_timeout() -> httpx.Timeout:
+    """Connect/read timeouts (seconds) from env; write and pool waits use the read timeout."""
+    import httpx
+
+    read = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))
+    return httpx.Timeout(read, connect=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5")))
+
+
+def _limits() -> httpx.Limits:
+    import httpx
+
+    size = int(os.getenv("OPENAI_POOL_SIZE", "20"))
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size, keepalive_expiry=60)
+
+
+def _record_response(response: httpx.Response) -> None:
+    get_metrics().record_http_status(response.status_code)
+
+
+async def _arecord_response(response: httpx.Response) -> None:
+    _record_response(response)
+
+
+def shared_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    """Process-wide pooled clients, created on first use.
+
+    The async client's connections belong to the event loop that opened them;
+    the CLI, batch runner and server each run a single loop per process.
+    """
+    global _sync_client, _async_client
+    import httpx
+
+    with _clients_lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(
+                timeout=http_timeout(), limits=_limits(), event_hooks={"response": [_record_response]}
+            )
+            _async_client = httpx.AsyncClient(
+                timeout=http_timeout(), limits=_limits(), event_hooks={"response": [_arecord_response]}
+            )
+            atexit.register(_sync_client.close)
+        return _sync_client, _async_client
+
+
+AGENTS = ("supervisor", "text_agent", "data_agent")
+
+
+def model_spec_for(agent: str, default: Optional[str] = None) -> List[ModelCandidate]:
+    """Candidates for ``agent``: ``<AGENT>_MODEL`` (e.g. ``TEXT_AGENT_MODEL``), else ``OPENAI_MODEL``."""
+    spec = os.getenv(f"{agent.upper()}_MODEL") or default or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    candidates = parse_model_spec(spec, default_provider="fake" if use_fake_provider() else "openai")
+    if use_fake_provider():
+        # Offline runs never reach a real provider
+        candidates = [ModelCandidate("fake", c.model, c.tier) for c in candidates]
+    return candidates
+
+
+def providers_in_use() -> set[str]:
+    """Providers referenced by any agent's model spec (used to check API keys)."""
+    return {c.provider for agent in AGENTS for c in model_spec_for(agent)}
+
+
+def _build_candidate(candidate: ModelCandidate) -> BaseChatModel:
+    if candidate.provider == "fake":
+        return ScriptedChatModel(
+            model_name=candidate.model if candidate.model.startswith("fake") else f"fake-{candidate.model}",
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+            tail_latency=float(os.getenv("FAKE_LLM_TAIL_LATENCY", "0")),
+            tail_every=int(os.getenv("FAKE_LLM_TAIL_EVERY", "0")),
+        )
+    if candidate.provider == "openai":
+        # Imported on demand: the OpenAI SDK dominates import time
+        from langchain_openai import ChatOpenAI
+
+        http_client, http_async_client = shared_http_clients()
+        return ChatOpenAI(
+            model=candidate.model,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            timeout=http_timeout(),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+        )
+    if candidate.provider == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+
+        return ChatAnthropic(
+            model=candidate.model,
+            timeout=float(os.getenv("OPENAI_READ_TIMEOUT", "60")),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+        )
+    raise ValueError(f"Unknown model provider {candidate.provider!r} (use openai, anthropic or fake)")
+
+
+def make_chat_model(model_name: Optional[str] = None, *, agent: str) -> BaseChatModel:
+    """Chat model for ``agent`` (``supervisor``, ``text_agent`` or ``data_agent``).
+
+    ``model_name`` is the default when no per-agent spec is configured. Specs
+    with several candidates become a ``RoutedChatModel`` (fallback chain).
+    """
+    candidates = model_spec_for(agent, model_name)
+    models = [_build_candidate(c) for c in candidates]
+    if len(models) == 1:
+        inner = models[0]
+    else:
+        inner = RoutedChatModel(candidates=models, names=[c.name for c in candidates], tiers=[c.tier for c in candidates])
+    # Caching happens on the wrapper, so cache hits skip timeouts and hedging
+    return DeadlineChatModel.from_env(inner, cache=llm_cache_for(agent))
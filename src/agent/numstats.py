@@ -0,0 +1,176 @@
+"""Statistics engine behind the ``calculate_stats`` tool.
+
+Values are held as compact float64 NumPy arrays (a plain list of floats
+when NumPy is not installed):
+
+- ``StatsAccumulator`` keeps count, mean, M2, min and max. Arrays are read
+  once, in cache-sized blocks whose moments are merged exactly (Chan et
+  al.), as are accumulators from chunks, threads or processes
+- median and percentiles use selection (``numpy.partition``), not a full sort
+- ``as_array`` parses lists, ``<<numbers:...>>`` handles and number text;
+  parsed handles are memoized by digest, so repeated questions about the
+  same artifact skip parsing
+
+``describe`` returns the same keys the tool always has (count, mean, median,
+stdev, min, max), plus ``p<N>`` for requested percentiles.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from agent.artifacts import HANDLE, resolve_text
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_SEPARATORS = str.maketrans({",": " ", ";": " "})
+
+_parsed: OrderedDict[str, object] = OrderedDict()
+_parsed_lock = threading.Lock()
+_PARSED_MAX = 16
+# float64 values per block: the block stays in cache between its mean and M2 passes
+_BLOCK = 1 << 16
+
+
+class StatsAccumulator:
+    """Streaming count/mean/variance/min/max; mergeable across chunks and workers."""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values) -> "StatsAccumulator":
+        """Fold in a chunk of values (array or sequence)."""
+        if np is not None:
+            values = np.asarray(values, dtype=np.float64).ravel()
+            for start in range(0, values.size, _BLOCK):
+                # Block moments in C, then combined with the running moments
+                block = values[start:start + _BLOCK]
+                chunk = StatsAccumulator()
+                chunk.count = int(block.size)
+                chunk.mean = float(block.mean())
+                centered = block - chunk.mean
+                chunk.m2 = float(np.dot(centered, centered))
+                chunk.min = float(block.min())
+                chunk.max = float(block.max())
+                self.merge(chunk)
+            return self
+        for x in values:
+            x = float(x)
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (x - self.mean)
+            self.min = min(self.min, x)
+            self.max = max(self.max, x)
+        return self
+
+    def merge(self, other: "StatsAccumulator") -> "StatsAccumulator":
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.min, self.max = other.count, other.mean, other.m2, other.min, other.max
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (n - 1), like ``statistics.variance``."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def as_dict(self) -> dict:
+        return {"count": self.count, "mean": self.mean, "stdev": self.stdev, "min": self.min, "max": self.max}
+
+
+def _parse(text: str):
+    if np is not None:
+        return np.array(text.translate(_SEPARATORS).split(), dtype=np.float64)
+    return [float(n) for n in _NUMBER.findall(text)]
+
+
+def as_array(value: Union[Sequence[float], str]):
+    """float64 array (or list without NumPy) from a list, a handle or number text."""
+    if not isinstance(value, str):
+        return np.asarray(value, dtype=np.float64) if np is not None else [float(x) for x in value]
+    handle = HANDLE.fullmatch(value.strip())
+    if handle is None:
+        text = resolve_text(value)
+        return np.array(_NUMBER.findall(text), dtype=np.float64) if np is not None else _parse(text)
+    digest = handle.group(2)
+    with _parsed_lock:
+        if digest in _parsed:
+            _parsed.move_to_end(digest)
+            return _parsed[digest]
+    # Number artifacts hold only numbers and separators, so a plain split parses them
+    values = _parse(resolve_text(value)) if handle.group(1) == "numbers" else as_array(resolve_text(value))
+    with _parsed_lock:
+        _parsed[digest] = values
+        while len(_parsed) > _PARSED_MAX:
+            _parsed.popitem(last=False)
+    return values
+
+
+def quantiles(values, qs: Iterable[float]) -> List[float]:
+    """Linear-interpolated quantiles (0-1) by selection rather than a full sort."""
+    qs = list(qs)
+    if not all(0 <= q <= 1 for q in qs):
+        raise ValueError(f"quantiles must be between 0 and 1, got {qs}")
+    n = len(values)
+    positions = [q * (n - 1) for q in qs]
+    if np is not None:
+        kth = sorted({int(math.floor(p)) for p in positions} | {min(int(math.floor(p)) + 1, n - 1) for p in positions})
+        part = np.partition(values, kth)
+        pick = lambda i: float(part[i])
+    else:
+        ordered = sorted(values)
+        pick = lambda i: float(ordered[i])
+    result = []
+    for p in positions:
+        lo = int(math.floor(p))
+        hi = min(lo + 1, n - 1)
+        result.append(pick(lo) + (pick(hi) - pick(lo)) * (p - lo))
+    return result
+
+
+def describe(values, percentiles: Optional[Iterable[float]] = None, digits: int = 2) -> dict:
+    """count/mean/median/stdev/min/max (+ ``p<N>``) for a non-empty array or list."""
+    acc = StatsAccumulator().update(values)
+    wanted = [float(p) for p in percentiles or ()]
+    bad = [p for p in wanted if not 0 <= p <= 100]
+    if bad:
+        raise ValueError(f"percentiles must be between 0 and 100, got {', '.join(f'{p:g}' for p in bad)}")
+    median, *extra = quantiles(values, [0.5] + [p / 100 for p in wanted])
+    stats = {
+        "count": acc.count,
+        "mean": round(acc.mean, digits),
+        "median": round(median, digits),
+        "stdev": round(acc.stdev, digits) if acc.count > 1 else 0,
+        "min": acc.min,
+        "max": acc.max,
+    }
+    for p, value in zip(wanted, extra):
+        stats[f"p{p:g}"] = round(value, digits)
+    return stats
@@ -0,0 +1,37 @@
+"""Shared process pool for the CPU-bound text engines (keywords, entities).
+
+Children start with forkserver (spawn where unavailable): the graph runs tools
+on threads, and forking a threaded process can deadlock. The pool is created
+on first use and resized when a different worker count is requested.
+"""
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def default_processes(env_var: str) -> int:
+    """``env_var`` if set, else the CPU count."""
+    return int(os.getenv(env_var, str(os.cpu_count() or 1)))
+
+
+def process_pool(processes: int) -> ProcessPoolExecutor:
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+            _pool_size = processes
+            atexit.register(_pool.shutdown)
+        return _pool
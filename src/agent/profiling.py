@@ -0,0 +1,352 @@
+"""Built-in profiler: where CPU time and memory go inside a run, per graph node.
+
+``Profiler`` is a LangChain callback handler that keeps, per thread, the stack
+of open spans, labelled as in ``agent.metrics``: ``graph`` (one top-level
+run, so time outside its nodes is framework overhead), ``node:<name>``,
+``worker:<agent>``, ``tool:<name>`` and ``model:<agent>``. Code outside the
+graph can be tagged with ``span(label)``, as the CLI does for rendering
+(``cli:render``). Two modes:
+
+- ``cpu``: a sampling thread reads every thread's Python stack every
+  ``PROFILE_INTERVAL`` seconds (default 0.005) and weights it by the CPU time
+  that thread used since the previous sample (per-thread CPU clocks; wall
+  time where the platform has none), so idle and waiting threads cost
+  nothing
+- ``alloc``: ``tracemalloc`` is read and cleared at every span boundary, so
+  each snapshot holds only blocks allocated since the previous boundary that
+  are still alive; their bytes are charged to the innermost open span, by
+  allocation site. Tracing slows everything down, more so with deeper
+  tracebacks: ``PROFILE_ALLOC_FRAMES`` (default 4) sets the depth
+
+Samples are totalled over every run while the profiler is active (a single
+query, a chat session or a whole batch). ``write`` produces a collapsed-stack
+file (``span;span;frame;frame weight`` per line, for ``flamegraph.pl`` or
+speedscope) and a text summary of the top ``PROFILE_TOP`` functions or
+allocation sites per span. Under async runs concurrent spans share the
+event-loop thread, so samples go to the span that started last.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent.streaming import HANDOFF_LABELS
+
+MODES = ("cpu", "alloc")
+OUTSIDE = "(outside spans)"
+# Deepest Python frames kept per sample (innermost first)
+_MAX_DEPTH = 96
+_SKIP_FILES = (__file__, tracemalloc.__file__)
+
+
+def _frame_name(code) -> str:
+    module = Path(code.co_filename).stem
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}".replace(";", ",").replace(" ", "_")
+
+
+class Profiler(BaseCallbackHandler):
+    """Per-span CPU samples (``cpu``) or allocation sites (``alloc``) for graph runs."""
+
+    run_inline = True
+
+    def __init__(self, mode: str = "cpu", interval: float = 0.005, frames: int = 4):
+        if mode not in MODES:
+            raise ValueError(f"profile mode must be one of {', '.join(MODES)}, not {mode!r}")
+        self.mode = mode
+        self.interval = interval
+        self.frames = frames
+        self._lock = threading.Lock()
+        self._roots: set[uuid.UUID] = set()
+        self._stacks: Dict[int, List[Tuple[object, str]]] = defaultdict(list)
+        self._owner: Dict[object, int] = {}
+        # (span label, frame) -> weight; weights are CPU microseconds or bytes
+        self.self_weight: Dict[str, Counter] = defaultdict(Counter)
+        self.total_weight: Dict[str, Counter] = defaultdict(Counter)
+        self.collapsed: Counter = Counter()
+        self.samples = 0
+        self.started = self.elapsed = 0.0
+        # Display names of code objects (cpu) and (file, line) sites (alloc)
+        self._names: Dict[object, str] = {}
+        self._cpu_last: Dict[int, float] = {}
+        self._clocks: Dict[int, Optional[int]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._tracing = False
+        self._own_tracing = False
+
+    # lifecycle
+    def start(self) -> "Profiler":
+        self.started = time.perf_counter()
+        if self.mode == "cpu":
+            self._thread = threading.Thread(target=self._sample_loop, name="lgsq-profiler", daemon=True)
+            self._thread.start()
+        else:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self._own_tracing = True
+            tracemalloc.clear_traces()
+            self._tracing = True
+        return self
+
+    def stop(self) -> None:
+        if self.mode == "cpu" and self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        elif self.mode == "alloc" and self._tracing:
+            self._boundary(threading.get_ident())
+            self._tracing = False
+            if self._own_tracing:
+                tracemalloc.stop()
+                self._own_tracing = False
+        self.elapsed = time.perf_counter() - self.started
+
+    # span stacks
+    def push(self, key, label: str) -> None:
+        ident = threading.get_ident()
+        if self.mode == "alloc":
+            self._boundary(ident)
+        with self._lock:
+            self._stacks[ident].append((key, label))
+            self._owner[key] = ident
+
+    def pop(self, key) -> None:
+        with self._lock:
+            ident = self._owner.pop(key, None)
+        if ident is None:
+            return
+        if self.mode == "alloc":
+            self._boundary(ident)
+        with self._lock:
+            stack = self._stacks[ident]
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i][0] == key:
+                    del stack[i]
+                    break
+
+    def _path(self, ident: int) -> List[str]:
+        return [label for _, label in self._stacks.get(ident, ())] or [OUTSIDE]
+
+    def _worker_for(self, ident: int) -> str:
+        with self._lock:
+            for _, label in reversed(self._stacks.get(ident, ())):
+                if label.startswith("worker:"):
+                    return label.split(":", 1)[1]
+        return "supervisor"
+
+    # callbacks
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            with self._lock:
+                self._roots.add(run_id)
+            self.push(run_id, "graph")
+        elif parent_run_id in self._roots and kwargs.get("name"):
+            self.push(run_id, f"node:{kwargs['name']}")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        with self._lock:
+            self._roots.discard(run_id)
+        self.pop(run_id)
+
+    on_chain_error = on_chain_end
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self.push(run_id, f"worker:{HANDOFF_LABELS[name]}" if name in HANDOFF_LABELS else f"tool:{name}")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self.pop(run_id)
+
+    on_tool_error = on_tool_end
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self.push(run_id, f"model:{self._worker_for(threading.get_ident())}")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.pop(run_id)
+
+    on_llm_error = on_llm_end
+
+    # cpu sampling
+    def _thread_cpu(self, ident: int) -> Optional[float]:
+        if ident not in self._clocks:
+            try:
+                self._clocks[ident] = time.pthread_getcpuclockid(ident)
+            except (AttributeError, OSError, OverflowError):
+                self._clocks[ident] = None
+        clock = self._clocks[ident]
+        if clock is None:
+            return None
+        try:
+            return time.clock_gettime(clock)
+        except OSError:
+            # The thread has exited
+            return None
+
+    def _sample_loop(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                cpu = self._thread_cpu(ident)
+                if cpu is None:
+                    weight = self.interval
+                else:
+                    weight = cpu - self._cpu_last.get(ident, cpu)
+                    self._cpu_last[ident] = cpu
+                if weight <= 0:
+                    continue
+                self._record(ident, frame, int(weight * 1_000_000))
+            del frames
+
+    def _record(self, ident: int, frame, weight: int) -> None:
+        names, stack = self._names, []
+        while frame is not None and len(stack) < _MAX_DEPTH:
+            code = frame.f_code
+            name = names.get(code)
+            if name is None:
+                name = names[code] = _frame_name(code)
+            stack.append(name)
+            frame = frame.f_back
+        if not stack:
+            return
+        with self._lock:
+            path = self._path(ident)
+            label = path[-1]
+            self.samples += 1
+            self.self_weight[label][stack[0]] += weight
+            totals = self.total_weight[label]
+            for name in set(stack):
+                totals[name] += weight
+            self.collapsed[";".join(path + stack[::-1])] += weight
+
+    # allocation tracking
+    def _boundary(self, ident: int) -> None:
+        """Charge blocks allocated since the previous boundary to the innermost span of ``ident``."""
+        with self._lock:
+            if not self._tracing:
+                return
+            # Clearing keeps every snapshot as small as the interval it covers
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.clear_traces()
+            path = self._path(ident)
+            label = path[-1]
+            self.samples += 1
+            names = self._names
+            for stat in snapshot.statistics("traceback"):
+                if stat.traceback[-1].filename in _SKIP_FILES:
+                    continue
+                sites = []
+                for frame in stat.traceback:
+                    key = (frame.filename, frame.lineno)
+                    site = names.get(key)
+                    if site is None:
+                        site = names[key] = f"{Path(frame.filename).stem}:{frame.lineno}"
+                    sites.append(site)
+                self.self_weight[label][sites[-1]] += stat.size
+                totals = self.total_weight[label]
+                for site in set(sites):
+                    totals[site] += stat.size
+                # tracemalloc tracebacks are oldest call first
+                self.collapsed[";".join(path + sites)] += stat.size
+
+    # export
+    def spans(self) -> List[Tuple[str, int]]:
+        """(span label, self weight) pairs, heaviest first."""
+        with self._lock:
+            return sorted(((label, sum(c.values())) for label, c in self.self_weight.items()), key=lambda x: -x[1])
+
+    def hottest(self, label: str, top: int = 20) -> List[Tuple[str, int, int]]:
+        """(frame or site, self weight, inclusive weight) for one span label."""
+        with self._lock:
+            totals = self.total_weight[label]
+            return [(name, w, totals[name]) for name, w in self.self_weight[label].most_common(top)]
+
+    def format_weight(self, weight: float) -> str:
+        return f"{weight / 1000:.1f} ms" if self.mode == "cpu" else f"{weight / 1024:.1f} KiB"
+
+    def summary(self, top: int = 20) -> str:
+        spans = self.spans()
+        total = sum(w for _, w in spans) or 1
+        what = "CPU time" if self.mode == "cpu" else "net allocated memory"
+        unit = f"{self.interval * 1000:g} ms sampling" if self.mode == "cpu" else f"{self.frames}-frame tracebacks"
+        lines = [
+            f"lgsq profile: {self.mode} ({unit}), {self.samples} samples over {self.elapsed:.2f}s wall",
+            f"Total {what}: {self.format_weight(total)}",
+            "",
+        ]
+        for label, weight in spans:
+            lines.append(f"{label}  {self.format_weight(weight)}  ({weight / total:.0%})")
+            lines.append(f"  {'self':>12}  {'incl':>12}  {'function' if self.mode == 'cpu' else 'site'}")
+            for name, own, incl in self.hottest(label, top):
+                lines.append(f"  {self.format_weight(own):>12}  {self.format_weight(incl):>12}  {name}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def write(self, prefix: str, top: int = 20) -> Tuple[Path, Path]:
+        """Write ``<prefix>.collapsed`` and ``<prefix>.txt``; returns both paths."""
+        base = Path(prefix)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        collapsed = base.with_name(base.name + ".collapsed")
+        text = base.with_name(base.name + ".txt")
+        with self._lock:
+            lines = [f"{stack} {weight}" for stack, weight in sorted(self.collapsed.items())]
+        collapsed.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+        text.write_text(self.summary(top) + "\n", encoding="utf-8")
+        return collapsed, text
+
+
+_active: Optional[Profiler] = None
+
+
+def active_profiler() -> Optional[Profiler]:
+    """The running profiler, attached to graphs by ``build_system``."""
+    return _active
+
+
+def start_profiler(mode: Optional[str] = None) -> Profiler:
+    """Start the process-wide profiler (``PROFILE`` and ``PROFILE_INTERVAL`` from env)."""
+    global _active
+    if _active is not None:
+        return _active
+    _active = Profiler(
+        mode=(mode or os.getenv("PROFILE", "cpu")).strip().lower(),
+        interval=float(os.getenv("PROFILE_INTERVAL", "0.005")),
+        frames=int(os.getenv("PROFILE_ALLOC_FRAMES", "4")),
+    ).start()
+    return _active
+
+
+def stop_profiler() -> Optional[Profiler]:
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+@contextmanager
+def span(label: str) -> Iterator[None]:
+    """Attribute work outside graph runs (e.g. rendering) to ``label``; no-op when not profiling."""
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    key = object()
+    profiler.push(key, label)
+    try:
+        yield
+    finally:
+        profiler.pop(key)
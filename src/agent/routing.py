@@ -0,0 +1,131 @@
+"""Deterministic routing around the supervisor LLM.
+
+``RulePreRouter`` runs before the supervisor LLM. When a rule set classifies
+the latest user message with enough confidence, the graph emits the handoff
+tool call itself and the supervisor only synthesizes the answer (one model
+call saved). Anything ambiguous or mixed falls back to the LLM router.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class RouteRule:
+    """Adds ``weight`` to ``tool`` when ``pattern`` matches the query."""
+
+    name: str
+    tool: str
+    pattern: re.Pattern
+    weight: float
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    tool: str
+    confidence: float
+    rules: tuple[str, ...]
+
+
+_NUMBER_LIST = r"-?\d+(?:\.\d+)?(?:\s*[,;]\s*|\s+)-?\d+(?:\.\d+)?"
+
+DEFAULT_RULES: tuple[RouteRule, ...] = (
+    RouteRule(
+        "stats_keyword",
+        "transfer_to_data",
+        re.compile(r"\b(stats|statistics|mean|median|average|avg|stdev|std|standard deviation|min|max)\b", re.I),
+        0.5,
+    ),
+    RouteRule("number_list", "transfer_to_data", re.compile(_NUMBER_LIST), 0.5),
+    # Large payloads arrive as artifact handles (see agent.artifacts)
+    RouteRule("numbers_artifact", "transfer_to_data", re.compile(r"<<numbers:[0-9a-f]{12}>>"), 0.5),
+    RouteRule("table_keyword", "transfer_to_data", re.compile(r"\b(table|tabulate)\b", re.I), 0.2),
+    RouteRule(
+        "text_keyword",
+        "transfer_to_text",
+        re.compile(r"\b(entities|entity|keywords?|key terms|analy[sz]e (the )?text|word frequenc\w*)\b", re.I),
+        0.5,
+    ),
+    RouteRule(
+        "inline_text",
+        "transfer_to_text",
+        re.compile(r"(:\s*[^\W\d_]+\s+[^\W\d_]+)|(['\"“][^'\"”]*[^\W\d_]{3,}[^'\"”]*['\"”])"),
+        0.4,
+    ),
+    RouteRule("text_artifact", "transfer_to_text", re.compile(r"<<text:[0-9a-f]{12}>>"), 0.4),
+)
+
+
+class RulePreRouter:
+    """Regex/keyword classifier with a confidence threshold and hit-rate counters.
+
+    Any object exposing ``route(text) -> str | None`` can be plugged into
+    ``build_system(prerouter=...)``; this is the default implementation.
+    """
+
+    def __init__(self, rules: tuple[RouteRule, ...] = DEFAULT_RULES, threshold: float = 0.8):
+        self.rules = tuple(rules)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._hits: Counter[str] = Counter()
+        self._total = 0
+
+    @classmethod
+    def from_env(cls) -> "RulePreRouter":
+        return cls(threshold=float(os.getenv("PREROUTER_THRESHOLD", "0.8")))
+
+    def classify(self, text: str) -> Optional[RouteDecision]:
+        """Score each worker; return the winner only if it is unambiguous."""
+        scores: dict[str, float] = {}
+        matched: dict[str, list[str]] = {}
+        for rule in self.rules:
+            if rule.pattern.search(text):
+                scores[rule.tool] = scores.get(rule.tool, 0.0) + rule.weight
+                matched.setdefault(rule.tool, []).append(rule.name)
+        if not scores:
+            return None
+        tool, score = max(scores.items(), key=lambda kv: kv[1])
+        # Competing evidence for another worker means a mixed request: leave it to the LLM
+        runner_up = max((s for t, s in scores.items() if t != tool), default=0.0)
+        confidence = min(1.0, score) * (1.0 - min(1.0, runner_up))
+        return RouteDecision(tool, round(confidence, 3), tuple(matched[tool]))
+
+    def route(self, text: str) -> Optional[str]:
+        """Return the handoff tool name for high-confidence queries, else None."""
+        decision = self.classify(text)
+        target = decision.tool if decision and decision.confidence >= self.threshold else None
+        with self._lock:
+            self._total += 1
+            self._hits[target or "llm"] += 1
+        return target
+
+    def stats(self) -> dict:
+        """Per-route hit counts and rates (``llm`` = fell back to the supervisor)."""
+        with self._lock:
+            total = self._total
+            hits = dict(self._hits)
+        return {
+            "total": total,
+            "threshold": self.threshold,
+            "routes": {
+                name: {"hits": n, "rate": round(n / total, 3) if total else 0.0}
+                for name, n in sorted(hits.items())
+            },
+        }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._hits.clear()
+            self._total = 0
+
+
+def prerouter_from_env() -> Optional[RulePreRouter]:
+    """Build the default pre-router when ``PREROUTER=rules`` (disabled otherwise)."""
+    if os.getenv("PREROUTER", "").strip().lower() in {"rules", "true", "1", "on"}:
+        return RulePreRouter.from_env()
+    return None
@@ -0,0 +1,283 @@
+"""HTTP serving mode: a dependency-free ASGI app around one compiled graph.
+
+Routes:
+- ``POST /invoke``  ``{"query", "thread_id"?, "deadline"?}`` -> ``{"thread_id", "response", "latency_ms"}``
+- ``POST /stream``  same body, answered as server-sent events (``token``,
+  ``handoff``, ``tool``, ``worker_done``, ``reset``, then ``done`` or ``error``)
+- ``GET /healthz``  liveness
+- ``GET /metrics``  Prometheus text format (server counters plus ``agent.metrics``)
+
+The graph is built once (async mode) at startup and shared by all requests.
+A global limiter caps in-flight runs; requests beyond the queue depth get a
+503 with ``Retry-After`` instead of piling up. Run it with ``lgsq serve``
+(uvicorn) or any ASGI server; ``LLM_PROVIDER=fake`` makes it fully offline.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+from langchain_core.messages import HumanMessage
+
+from agent.cache import get_shared_cache
+from agent.checkpoint import checkpointer_stats
+from agent.deadline import deadline_scope, request_deadline_from_env
+from agent.metrics import get_metrics, metrics_enabled
+from agent.streaming import astream_events
+
+
+class Overloaded(Exception):
+    """Raised when the wait queue is full."""
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` requests run at once; at most ``max_queue`` wait for a slot."""
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = max(limit, 1)
+        self.max_queue = max(max_queue, 0)
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.in_flight = 0
+        self.waiting = 0
+
+    async def __aenter__(self):
+        if self.in_flight >= self.limit and self.waiting >= self.max_queue:
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.in_flight -= 1
+        self._semaphore.release()
+        return False
+
+
+class SupervisorServer:
+    """ASGI application; pass ``graph`` to reuse an existing (async) compiled graph."""
+
+    def __init__(
+        self,
+        graph=None,
+        *,
+        max_concurrency: int = 8,
+        max_queue: int = 32,
+        recursion_limit: int = 25,
+        deadline: Optional[float] = None,
+    ):
+        self.graph = graph
+        self.deadline = deadline
+        self.limiter = ConcurrencyLimiter(max_concurrency, max_queue)
+        self.recursion_limit = recursion_limit
+        self.requests: Counter[tuple[str, int]] = Counter()
+        self.latency_sum: Counter[str] = Counter()
+        self.latency_count: Counter[str] = Counter()
+        self.rejected = 0
+        self.started_at = time.time()
+
+    @classmethod
+    def from_env(cls, graph=None) -> "SupervisorServer":
+        return cls(
+            graph,
+            max_concurrency=int(os.getenv("SERVER_MAX_CONCURRENCY", "8")),
+            max_queue=int(os.getenv("SERVER_MAX_QUEUE", "32")),
+            deadline=request_deadline_from_env(),
+        )
+
+    def _ensure_graph(self):
+        if self.graph is None:
+            from agent.graph import build_system
+
+            self.graph = build_system(async_mode=True)
+        return self.graph
+
+    # ASGI entry point
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        method, path = scope["method"], scope["path"]
+        started = time.perf_counter()
+        status = 500
+        try:
+            if path == "/healthz" and method == "GET":
+                status = await _send_json(send, 200, {"status": "ok"})
+            elif path == "/metrics" and method == "GET":
+                status = await _send_text(send, 200, self.metrics(), "text/plain; version=0.0.4")
+            elif path in {"/invoke", "/stream"} and method == "POST":
+                status = await self._run(path, receive, send)
+            elif path in {"/healthz", "/metrics", "/invoke", "/stream"}:
+                status = await _send_json(send, 405, {"error": "method not allowed"})
+            else:
+                status = await _send_json(send, 404, {"error": "not found"})
+        finally:
+            self.requests[(path, status)] += 1
+            self.latency_sum[path] += time.perf_counter() - started
+            self.latency_count[path] += 1
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self._ensure_graph()
+                except Exception as exc:
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _run(self, path: str, receive, send) -> int:
+        try:
+            body = json.loads(await _read_body(receive) or b"{}")
+        except ValueError:
+            return await _send_json(send, 400, {"error": "body must be JSON"})
+        query = body.get("query") if isinstance(body, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            return await _send_json(send, 400, {"error": "'query' (non-empty string) is required"})
+
+        deadline = body.get("deadline", self.deadline)
+        if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float)) or deadline <= 0):
+            return await _send_json(send, 400, {"error": "'deadline' must be a positive number of seconds"})
+        thread_id = body.get("thread_id")
+        if thread_id is None:
+            thread_id = f"http-{uuid.uuid4()}"
+        elif not isinstance(thread_id, str) or not thread_id.strip():
+            return await _send_json(send, 400, {"error": "'thread_id' must be a non-empty string"})
+        inputs = {"messages": [HumanMessage(content=query)]}
+        config = {"configurable": {"thread_id": thread_id}, "recursion_limit": self.recursion_limit}
+        graph = self._ensure_graph()
+
+        try:
+            async with self.limiter:
+                if path == "/invoke":
+                    started = time.perf_counter()
+                    try:
+                        with deadline_scope(deadline):
+                            result = await graph.ainvoke(inputs, config=config)
+                    except Exception as exc:
+                        return await _send_json(send, 500, {"thread_id": thread_id, "error": f"{type(exc).__name__}: {exc}"})
+                    return await _send_json(send, 200, {
+                        "thread_id": thread_id,
+                        "response": result["messages"][-1].content,
+                        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                    })
+                with deadline_scope(deadline):
+                    return await self._stream(graph, inputs, config, thread_id, send)
+        except Overloaded:
+            self.rejected += 1
+            return await _send_json(send, 503, {"error": "server busy, retry later"}, headers=[(b"retry-after", b"1")])
+
+    async def _stream(self, graph, inputs, config, thread_id: str, send) -> int:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-thread-id", thread_id.encode()),
+            ],
+        })
+
+        async def emit(event: str, data: dict) -> None:
+            payload = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            await send({"type": "http.response.body", "body": payload.encode("utf-8"), "more_body": True})
+
+        try:
+            async for event in astream_events(graph, inputs, config):
+                await emit(event.pop("type"), event)
+            state = await graph.aget_state(config)
+            await emit("done", {"thread_id": thread_id, "response": state.values["messages"][-1].content})
+        except Exception as exc:
+            await emit("error", {"thread_id": thread_id, "error": f"{type(exc).__name__}: {exc}"})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+        return 200
+
+    def metrics(self) -> str:
+        lines = [
+            "# TYPE lgsq_requests_total counter",
+            *(
+                f'lgsq_requests_total{{path="{path}",status="{status}"}} {n}'
+                for (path, status), n in sorted(self.requests.items())
+            ),
+            "# TYPE lgsq_request_duration_seconds summary",
+            *(
+                f'lgsq_request_duration_seconds_sum{{path="{path}"}} {self.latency_sum[path]:.6f}\n'
+                f'lgsq_request_duration_seconds_count{{path="{path}"}} {self.latency_count[path]}'
+                for path in sorted(self.latency_count)
+            ),
+            "# TYPE lgsq_requests_rejected_total counter",
+            f"lgsq_requests_rejected_total {self.rejected}",
+            "# TYPE lgsq_requests_in_flight gauge",
+            f"lgsq_requests_in_flight {self.limiter.in_flight}",
+            "# TYPE lgsq_queue_depth gauge",
+            f"lgsq_queue_depth {self.limiter.waiting}",
+            "# TYPE lgsq_uptime_seconds gauge",
+            f"lgsq_uptime_seconds {time.time() - self.started_at:.0f}",
+        ]
+        cp = checkpointer_stats(getattr(self.graph, "checkpointer", None))
+        if cp:
+            lines += [
+                "# TYPE lgsq_checkpoints_resident gauge",
+                f"lgsq_checkpoints_resident {cp['checkpoints']}",
+                "# TYPE lgsq_checkpoint_bytes gauge",
+                f"lgsq_checkpoint_bytes {cp['bytes']}",
+            ]
+        cache = get_shared_cache()
+        if cache is not None:
+            stats = cache.stats()
+            lines += ["# TYPE lgsq_llm_cache_events_total counter"] + [
+                f'lgsq_llm_cache_events_total{{event="{name}"}} {stats[name]}'
+                for name in ("hits", "normalized_hits", "misses", "evictions")
+            ]
+        text = "\n".join(lines) + "\n"
+        return text + get_metrics().to_prometheus() if metrics_enabled() else text
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return body
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_text(send, status: int, text: str, content_type: str, headers: Optional[list] = None) -> int:
+    body = text.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+        + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+    return status
+
+
+async def _send_json(send, status: int, payload: dict, headers: Optional[list] = None) -> int:
+    return await _send_text(send, status, json.dumps(payload, ensure_ascii=False), "application/json", headers)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000) -> None:
+    """Run the server with uvicorn (optional dependency)."""
+    try:
+        import uvicorn
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise ImportError("lgsq serve requires uvicorn (pip install uvicorn)") from exc
+    uvicorn.run(SupervisorServer.from_env(), host=host, port=port, log_level=os.getenv("SERVER_LOG_LEVEL", "info"))
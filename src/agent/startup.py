@@ -0,0 +1,80 @@
+"""Cold-start breakdown for ``lgsq --startup-report``.
+
+Import times come from fresh interpreters running ``python -X importtime``
+(this process has already imported most modules): ``cli`` is what every
+invocation pays, ``agent.graph`` what a query adds. Self time is summed per
+top-level package. Build times are measured in this process:
+importing the graph module, ``build_system()`` (supervisor only), and each
+worker, which the graph otherwise builds on its first handoff.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def import_times(module: str = "cli", top: int = 12) -> dict:
+    """Cold import of ``module`` in a child interpreter; per-package self time in ms."""
+    src = str(Path(__file__).resolve().parents[1])
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [src, os.getenv("PYTHONPATH")]))}
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"import {module} failed")
+
+    packages: Counter = Counter()
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():
+            packages[name.split(".")[0]] += int(self_us)
+    total_us = sum(packages.values())
+    return {
+        "module": module,
+        "interpreter_wall_ms": round(wall_ms, 1),
+        "imports_ms": round(total_us / 1000, 1),
+        "packages": {name: round(us / 1000, 1) for name, us in packages.most_common(top)},
+    }
+
+
+def _timed(fn) -> tuple[object, float]:
+    started = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - started) * 1000, 1)
+
+
+def build_times() -> Dict[str, float]:
+    """Milliseconds for each build phase in this process, in the order a run pays them."""
+    phases: Dict[str, float] = {}
+    _, phases["import agent.graph"] = _timed(lambda: __import__("agent.graph"))
+    from agent.agent_builders import create_data_worker, create_text_worker
+    from agent.graph import build_system
+
+    _, phases["build_system() (supervisor)"] = _timed(build_system)
+    model_name = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    mode = os.getenv("WORKER_MODE", "react").strip().lower()
+    # Deferred until the first handoff to each worker
+    _, phases["text_agent (first handoff)"] = _timed(lambda: create_text_worker(model_name, mode=mode))
+    _, phases["data_agent (first handoff)"] = _timed(lambda: create_data_worker(model_name, mode=mode))
+    return phases
+
+
+def startup_report(top: int = 12, modules: Optional[List[str]] = None) -> dict:
+    """Import and build breakdown; JSON-serializable."""
+    return {
+        "imports": [import_times(module, top) for module in (modules or ["cli", "agent.graph"])],
+        "build_ms": build_times(),
+    }
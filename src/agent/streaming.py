@@ -0,0 +1,79 @@
+"""Turn supervisor graph streams into simple UI events.
+
+Shared by the CLI (``--stream``) and the HTTP server (``/stream``). Each
+event is a dict with a ``type``:
+
+- ``token``: ``{"text"}`` supervisor output token (top-level graph only)
+- ``handoff``: ``{"agent", "tool"}`` the supervisor delegated to a worker
+- ``tool``: ``{"name"}`` a worker (or the supervisor, for ``session_lookup``)
+  called one of its tools
+- ``worker_done``: ``{"agent"}`` a worker returned its answer
+- ``reset``: text streamed so far was not the final answer (tool calls followed)
+"""
+from __future__ import annotations
+
+from typing import AsyncIterator, Iterator, List
+
+# Handoff tool name -> worker label
+HANDOFF_LABELS = {
+    "transfer_to_text": "text_agent",
+    "transfer_to_data": "data_agent",
+}
+
+STREAM_KWARGS = {"stream_mode": ["messages", "updates"], "subgraphs": True}
+
+
+def _events(namespace, mode: str, payload) -> List[dict]:
+    if mode == "messages":
+        chunk, metadata = payload
+        # Worker tokens stay internal; only the top-level supervisor speaks to the user
+        if namespace or metadata.get("langgraph_node") != "llm":
+            return []
+        if isinstance(chunk.content, str) and chunk.content:
+            return [{"type": "token", "text": chunk.content}]
+        return []
+
+    events: List[dict] = []
+    for node, update in (payload or {}).items():
+        messages = update.get("messages", []) if isinstance(update, dict) else []
+        if not namespace and node in {"llm", "prerouter"} and messages:
+            calls = getattr(messages[-1], "tool_calls", None) or []
+            if calls:
+                events.append({"type": "reset"})
+            for call in calls:
+                if call["name"] not in HANDOFF_LABELS:
+                    # A supervisor tool (session_lookup), not a worker
+                    events.append({"type": "tool", "name": call["name"]})
+                    continue
+                events.append({
+                    "type": "handoff",
+                    "tool": call["name"],
+                    "agent": HANDOFF_LABELS[call["name"]],
+                })
+        elif not namespace and node == "direct_return":
+            # A worker answer returned as-is: deliver it as one token
+            for msg in messages:
+                if isinstance(msg.content, str) and msg.content:
+                    events.append({"type": "token", "text": msg.content})
+        elif not namespace and node == "tools":
+            for msg in messages:
+                name = getattr(msg, "name", None) or "tool"
+                if name in HANDOFF_LABELS:
+                    events.append({"type": "worker_done", "agent": HANDOFF_LABELS[name]})
+        elif namespace and node == "tools":
+            for msg in messages:
+                events.append({"type": "tool", "name": getattr(msg, "name", None) or "tool"})
+    return events
+
+
+def stream_events(graph, inputs, config) -> Iterator[dict]:
+    """Sync event stream over ``graph.stream``."""
+    for namespace, mode, payload in graph.stream(inputs, config=config, **STREAM_KWARGS):
+        yield from _events(namespace, mode, payload)
+
+
+async def astream_events(graph, inputs, config) -> AsyncIterator[dict]:
+    """Async event stream over ``graph.astream``."""
+    async for namespace, mode, payload in graph.astream(inputs, config=config, **STREAM_KWARGS):
+        for event in _events(namespace, mode, payload):
+            yield event
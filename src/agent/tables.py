@@ -0,0 +1,316 @@
+"""Table engine behind the ``format_table`` tool.
+
+Rows are streamed once. ``TableBuilder.add`` keeps the column union (in
+first-seen order), display widths, numeric column summaries, the first and
+last rows and, with ``sort_by``, a bounded top-N heap. Every row is also
+spooled to a temporary file (in memory up to 1 MiB, then on disk), so memory
+stays bounded however many rows arrive.
+
+``render`` returns the whole table when it fits ``max_tokens``
+(``TABLE_MAX_TOKENS``, about 4 characters per token). Otherwise it returns a
+summary with the first and last rows. A page (``page``/``page_size``) or the
+top-N rows are rendered the same way. Whenever rows are left out, the full
+table is written to the artifact store, and its ``<<text:...>>`` handle is
+included in the output.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import tempfile
+from collections import deque
+from itertools import count, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agent.artifacts import get_artifact_store, resolve_text
+
+_CHARS_PER_TOKEN = 4
+_SPOOL_BYTES = 1 << 20
+
+
+def _settings() -> Tuple[int, int, int, int]:
+    return (
+        int(os.getenv("TABLE_MAX_TOKENS", "1500")),
+        int(os.getenv("TABLE_PREVIEW_ROWS", "10")),
+        int(os.getenv("TABLE_PAGE_ROWS", "50")),
+        int(os.getenv("TABLE_MAX_CELL_CHARS", "60")),
+    )
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    text = value if type(value) is str else str(value)
+    if "|" in text or "\n" in text or "\r" in text or "\t" in text:
+        text = text.replace("|", "\\|").replace("\r", " ").replace("\n", " ").replace("\t", " ")
+    return text
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def iter_rows(data: Any) -> Iterator[dict]:
+    """Rows from a list of dicts, a metrics dict, or JSON / JSON-lines text (or a handle to it)."""
+    if isinstance(data, str):
+        text = resolve_text(data).strip()
+        if not text:
+            return
+        try:
+            data = json.loads(text)
+        except ValueError:
+            # JSON lines: parsed one at a time
+            data = (json.loads(line) for line in text.splitlines() if line.strip())
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield {"Metric": key, "Value": value}
+        return
+    for row in data:
+        yield row if isinstance(row, dict) else {"value": row}
+
+
+class _Reversed:
+    """Inverts ordering, so the top-N heap keeps the smallest values for ascending sorts."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other: "_Reversed") -> bool:
+        return other.key < self.key
+
+    def __gt__(self, other: "_Reversed") -> bool:
+        return self.key < other.key
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Reversed) and self.key == other.key
+
+
+class TableBuilder:
+    """Single pass over the rows: columns, widths, summaries, head/tail and spool.
+
+    Rows are kept as lists of cell strings in column order; rows seen before a
+    column first appeared are simply shorter.
+    """
+
+    def __init__(self, preview_rows: int = 10, sort_by: Optional[str] = None, top: Optional[int] = None,
+                 descending: bool = True, max_cell_chars: int = 60):
+        self.columns: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._widths: List[int] = []
+        self.numeric: Dict[str, list] = {}
+        self.rows = 0
+        self.max_cell_chars = max_cell_chars
+        self.head: List[List[str]] = []
+        self.tail: deque = deque(maxlen=preview_rows)
+        self._preview_rows = preview_rows
+        self.sort_by = sort_by
+        self.top = top
+        self._descending = descending
+        self._heap: List[tuple] = []
+        self._seq = count()
+        # Tab-separated cells, one row per line (_cell removes tabs and newlines)
+        self._spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES, mode="w+", encoding="utf-8")
+
+    def add(self, row: dict) -> None:
+        index, widths, cells = self._index, self._widths, []
+        for key, value in row.items():
+            i = index.get(key)
+            if i is None:
+                i = self._column(key)
+            text = _cell(value)
+            if i >= len(cells):
+                cells.extend([""] * (i + 1 - len(cells)))
+            cells[i] = text
+            if len(text) > widths[i]:
+                widths[i] = len(text)
+            kind = type(value)
+            if kind is int or kind is float:
+                stats = self.numeric.get(key)
+                if stats is None:
+                    stats = self.numeric[key] = [0, 0.0, value, value]
+                stats[0] += 1
+                stats[1] += value
+                if value < stats[2]:
+                    stats[2] = value
+                elif value > stats[3]:
+                    stats[3] = value
+        self.rows += 1
+        if len(self.head) < self._preview_rows:
+            self.head.append(cells)
+        else:
+            self.tail.append(cells)
+        if self.sort_by is not None and self.top:
+            self._push(row.get(self.sort_by), cells)
+        self._spool.write("\t".join(cells) + "\n")
+
+    def _column(self, key: Any) -> int:
+        name = _cell(key)
+        self._index[key] = len(self.columns)
+        self.columns.append(name)
+        self._widths.append(max(len(name), 3))
+        return self._index[key]
+
+    @property
+    def widths(self) -> List[int]:
+        return [min(w, self.max_cell_chars) for w in self._widths]
+
+    def _push(self, value: Any, cells: List[str]) -> None:
+        # Numbers rank above text, text above missing values, in either direction
+        if _is_number(value):
+            kind, key = 2, value
+        elif value is None:
+            kind, key = 0, 0
+        else:
+            kind, key = 1, str(value)
+        entry = ((kind, key if self._descending else _Reversed(key)), -next(self._seq), cells)
+        if len(self._heap) < self.top:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def spooled(self, start: int = 0, stop: Optional[int] = None) -> Iterator[List[str]]:
+        """Rows ``start:stop`` back from the spool."""
+        self._spool.seek(0)
+        for line in islice(self._spool, start, stop):
+            yield line[:-1].split("\t")
+        self._spool.seek(0, os.SEEK_END)
+
+    def top_rows(self) -> List[List[str]]:
+        return [cells for _, _, cells in sorted(self._heap, reverse=True)]
+
+    # -- rendering -------------------------------------------------------
+
+    def _line(self, cells: Iterable[str]) -> str:
+        return "| " + " | ".join(cells) + " |"
+
+    def _row(self, cells: List[str], widths: List[int]) -> str:
+        out = []
+        for i, width in enumerate(widths):
+            text = cells[i] if i < len(cells) else ""
+            if len(text) > width:
+                text = text[: width - 1] + "…"
+            out.append(text.ljust(width))
+        return self._line(out)
+
+    def _header(self, widths: List[int]) -> List[str]:
+        return [self._row(self.columns, widths), self._line("-" * w for w in widths)]
+
+    def _gap(self, omitted: int, widths: List[int]) -> str:
+        cells = ["…"] * len(widths)
+        cells[0] = f"… {omitted} more rows"
+        return self._line(c.ljust(w) for c, w in zip(cells, widths))
+
+    def full_table(self) -> Iterator[str]:
+        """The whole table as markdown (cells not truncated or padded), in chunks of lines."""
+        n = len(self.columns)
+        yield self._line(self.columns) + "\n" + self._line(["---"] * n) + "\n"
+        batch = []
+        for cells in self.spooled():
+            if len(cells) < n:
+                cells += [""] * (n - len(cells))
+            batch.append("| " + " | ".join(cells) + " |")
+            if len(batch) == 1000:
+                yield "\n".join(batch) + "\n"
+                batch = []
+        if batch:
+            yield "\n".join(batch) + "\n"
+
+    def summary(self) -> str:
+        parts = []
+        for column, (n, total, lo, hi) in self.numeric.items():
+            parts.append(f"{column}: min {lo:g}, max {hi:g}, mean {total / n:g}")
+        return "; ".join(parts)
+
+    def _fit(self, lines: List[str], budget: int) -> bool:
+        return sum(len(line) + 1 for line in lines) <= budget * _CHARS_PER_TOKEN
+
+    def render(self, max_tokens: int, page: Optional[int] = None, page_size: int = 50) -> str:
+        if not self.rows:
+            return "No data"
+        widths = self.widths
+        shape = f"{self.rows} rows × {len(self.columns)} columns"
+        if page is not None:
+            pages = max(1, math.ceil(self.rows / page_size))
+            page = min(max(page, 1), pages)
+            start = (page - 1) * page_size
+            rows = list(self.spooled(start, start + page_size))
+            note = f"Page {page} of {pages} (rows {start + 1}-{start + len(rows)} of {shape})"
+            return self._capped(rows, widths, note, max_tokens)
+        if self.sort_by is not None and self.top:
+            rows = self.top_rows()
+            return self._capped(rows, widths, f"Top {len(rows)} of {shape} by {self.sort_by}", max_tokens)
+        # Padded size of the whole table, known before rendering any of it
+        size = (sum(widths) + 3 * len(widths) + 2) * (self.rows + 2)
+        if size <= max_tokens * _CHARS_PER_TOKEN:
+            rows = self.head + list(self.tail) if self.rows <= 2 * self._preview_rows else self.spooled()
+            return "\n".join(self._header(widths) + [self._row(r, widths) for r in rows])
+        return self._preview(widths, shape, max_tokens)
+
+    def _preview(self, widths: List[int], shape: str, max_tokens: int) -> str:
+        head, tail = list(self.head), list(self.tail)
+        handle = get_artifact_store().put_stream("text", self.full_table())
+        intro = [f"**{shape}** (full table: {handle})"]
+        if self.numeric:
+            intro.append(f"Numeric columns: {self.summary()}")
+        intro.append("")
+        while True:
+            shown = len(head) + len(tail)
+            body = [self._row(r, widths) for r in head]
+            if shown < self.rows:
+                body.append(self._gap(self.rows - shown, widths))
+            body += [self._row(r, widths) for r in tail]
+            lines = intro + self._header(widths) + body
+            if self._fit(lines, max_tokens) or len(head) <= 1:
+                return "\n".join(lines)
+            # Drop from the tail first, then the head
+            if len(tail) >= len(head):
+                tail = tail[1:]
+            else:
+                head = head[:-1]
+
+    def _capped(self, rows: List[List[str]], widths: List[int], note: str, max_tokens: int) -> str:
+        header = self._header(widths)
+        lines = [self._row(r, widths) for r in rows]
+        while lines and not self._fit(header + lines + ["", note], max_tokens):
+            lines.pop()
+        if len(lines) < self.rows:
+            note = f"{note}; full table: {get_artifact_store().put_stream('text', self.full_table())}"
+        return "\n".join(header + lines + ["", note])
+
+    def close(self) -> None:
+        self._spool.close()
+
+
+def render_table(
+    data: Any,
+    *,
+    page: Optional[int] = None,
+    page_size: Optional[int] = None,
+    sort_by: Optional[str] = None,
+    top: Optional[int] = None,
+    descending: bool = True,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """Markdown for ``data`` under a token cap, as returned by the ``format_table`` tool."""
+    # Arguments come from the model: explain bad ones instead of raising
+    for name, value in (("page_size", page_size), ("top", top)):
+        if value is not None and value < 1:
+            return f"Invalid {name}: must be at least 1"
+    cap, preview_rows, page_rows, cell_chars = _settings()
+    builder = TableBuilder(
+        preview_rows=preview_rows,
+        sort_by=sort_by,
+        top=top if top is not None else (page_rows if sort_by else None),
+        descending=descending,
+        max_cell_chars=cell_chars,
+    )
+    try:
+        for row in iter_rows(data):
+            builder.add(row)
+        return builder.render(max_tokens or cap, page=page, page_size=page_size if page_size is not None else page_rows)
+    finally:
+        builder.close()
@@ -1,14 +1,24 @@
 from typing import List
-from collections import Counter
-import re
 from langchain_core.tools import tool
 
+from agent.artifacts import resolve_text
+
+# Large inputs arrive as artifact handles (<<text:...>>, <<numbers:...>>); the
+# tools resolve them, so the payload never passes through a model prompt.
+
 
 @tool
-def extract_entities(text: str) -> list[str]:
-    """Extract Title-Case entities from text."""
-    candidates = re.findall(r"(?:[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)", text)
-    return list(dict.fromkeys(candidates))[:15]
+def extract_entities(text: str, limit: int = 15, with_offsets: bool = False) -> list[dict]:
+    """Extract named entities (capitalized names, acronyms, gazetteer matches) from text.
+
+    Returns ``{"entity", "label", "count"}`` rows, most frequent first (ties in
+    order of first mention), plus character ``offsets`` when ``with_offsets``.
+    Works with accented and non-Latin names. ``text`` may be a <<text:...>> handle.
+    """
+    from agent.entities import find_entities, load_gazetteer
+
+    entities = find_entities(resolve_text(text), load_gazetteer(), offsets=with_offsets)
+    return sorted(entities, key=lambda e: -e["count"])[:limit]
 
 
 @tool
@@ -16,48 +26,59 @@ def keyword_counts(text: str, top_k: int = 10, min_length: int = 2) -> list[dict
     """Return top-k keyword frequencies from text (language-agnostic, case-insensitive).
     
     Filters tokens by minimum length only, no language-specific stopwords.
-    Works with any language using Unicode word characters.
+    Works with any language using Unicode word segmentation. ``text`` may be a
+    <<text:...>> handle.
     """
-    tokens = re.findall(r"[A-Za-zÀ-ÖØ-öø-ÿ0-9]+", text.lower())
-    filtered = [t for t in tokens if len(t) >= min_length]
-    counts = Counter(filtered).most_common(top_k)
-    return [{"term": t, "count": c} for t, c in counts]
+    from agent.keywords import top_keywords
+
+    # Streaming, chunked counter; multi-megabyte inputs fan out to a process pool
+    return top_keywords(resolve_text(text), top_k=top_k, min_length=min_length)
 
 
 ## Intentionally no IO tools here (no file/network access)
 
 
 @tool
-def calculate_stats(numbers: List[float]) -> dict:
-    """Calculate statistics for numbers."""
-    import statistics as st
-    if not numbers:
+def calculate_stats(numbers: List[float] | str, percentiles: List[float] | None = None) -> dict:
+    """Calculate statistics for numbers (a list or a <<numbers:...>> handle).
+
+    Optional ``percentiles`` (0-100) add ``p<N>`` entries, e.g. [90, 99].
+    """
+    from agent.numstats import as_array, describe
+
+    # Blocked moments and selection-based median on a float64 array
+    values = as_array(numbers)
+    if not len(values):
         return {"error": "Empty"}
-    return {
-        "count": len(numbers),
-        "mean": round(st.mean(numbers), 2),
-        "median": round(st.median(numbers), 2),
-        "stdev": round(st.stdev(numbers), 2) if len(numbers) > 1 else 0,
-        "min": min(numbers),
-        "max": max(numbers),
-    }
+    try:
+        return describe(values, percentiles)
+    except ValueError as exc:
+        return {"error": str(exc)}
 
 
 @tool
-def format_table(data: list[dict] | dict | None = None) -> str:
-    """Format data as markdown table."""
+def format_table(
+    data: list[dict] | dict | str | None = None,
+    page: int | None = None,
+    page_size: int | None = None,
+    sort_by: str | None = None,
+    top: int | None = None,
+    descending: bool = True,
+    max_tokens: int | None = None,
+) -> str:
+    """Format data as markdown table (rows, a metrics dict, or JSON / a <<text:...>> handle).
+
+    Large tables come back as a summary with the first and last rows, plus a
+    handle to the full table. Use ``page``/``page_size`` to read a page, or
+    ``sort_by`` with ``top`` for the top-N rows.
+    """
+    from agent.tables import render_table
+
     if not data:
         return "No data"
-    if isinstance(data, dict):
-        rows = [f"| {k} | {v} |" for k, v in data.items()]
-        return "| Metric | Value |\n| --- | --- |\n" + "\n".join(rows)
-    if isinstance(data, list) and data:
-        headers = list(data[0].keys())
-        hdr = "| " + " | ".join(headers) + " |"
-        sep = "| " + " | ".join(["---"] * len(headers)) + " |"
-        rows = [
-            "| " + " | ".join(str(r.get(h, "")) for h in headers) + " |"
-            for r in data
-        ]
-        return "\n".join([hdr, sep] + rows)
-    return "Invalid data"
+    if not isinstance(data, (list, dict, str)):
+        return "Invalid data"
+    # One streaming pass; output stays under the token cap however many rows there are
+    return render_table(
+        data, page=page, page_size=page_size, sort_by=sort_by, top=top, descending=descending, max_tokens=max_tokens,
+    )
@@ -7,29 +7,44 @@ Two modes:
 Usage:
     python -m cli                    # interactive chat
     python -m cli --query "..."      # single query
+    python -m cli --stream ...       # stream tokens and handoff events live
+    python -m cli --stats ...        # per-answer node/tool timings and token usage
+    python -m cli --deadline 20 ...  # per-request deadline (seconds); partial answer on expiry
+    python -m cli --metrics-out m.prom ...
+                                     # dump metrics on exit (.prom/.txt Prometheus, else JSON)
+    python -m cli --batch in.jsonl --out out.jsonl --concurrency 8
+                                     # offline batch (JSONL in/out)
+    python -m cli serve --host 0.0.0.0 --port 8000
+                                     # HTTP API (/invoke, /stream SSE, /metrics)
+    python -m cli bench --out bench.json --baseline old.json
+                                     # offline benchmark (scripted model, no API key)
+    python -m cli --startup-report   # import and build time breakdown (cold start)
+    python -m cli --profile[=cpu|alloc] ...
+                                     # per-node CPU samples or allocation sites → profile.collapsed/.txt
+    python -m cli submit "..."       # queue a durable job (or --file queries.jsonl)
+    python -m cli worker --processes 4 [--drain]
+                                     # run queued jobs; interrupted runs resume from checkpoints
+    python -m cli status [JOB_ID]    # job counts, latest jobs, or one job's result
 """
 from __future__ import annotations
 
+import asyncio
 import os
 import sys
 from pathlib import Path
 import uuid
-from typing import List
+from typing import TYPE_CHECKING, List
 
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage
-from rich.console import Console
-from rich.panel import Panel
-from rich.markdown import Markdown
-from rich.prompt import Prompt
-from rich.status import Status
-from rich.text import Text
-from rich.theme import Theme
 
-from agent import build_system
+if TYPE_CHECKING:
+    from rich.panel import Panel
+
+# LangChain, LangGraph, the provider SDKs and rich are imported inside the
+# functions that need them, so `--help` and short-lived runs skip what they don't use.
 
 # Custom theme for the CLI
-CUSTOM_THEME = Theme({
+CUSTOM_THEME = {
     "info": "cyan",
     "warning": "yellow",
     "error": "bold red",
@@ -38,9 +53,35 @@ CUSTOM_THEME = Theme({
     "assistant": "green",
     "user": "cyan",
     "header": "bold magenta",
-})
+}
+
+
+_shared_console = None
+
+
+def _console():
+    """The shared rich ``Console``, created on first use."""
+    global _shared_console
+    if _shared_console is None:
+        from rich.console import Console
+        from rich.theme import Theme
+
+        _shared_console = Console(theme=Theme(CUSTOM_THEME))
+    return _shared_console
+
+
+class _LazyConsole:
+    """Forwards ``console.print(...)`` and friends to ``_console()``.
+
+    Rich objects that take a console (``Live``, ``Status``, ``Progress``, ``Prompt``)
+    get ``_console()`` itself, since they also use it as a context manager.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(_console(), name)
+
 
-console = Console(theme=CUSTOM_THEME)
+console = _LazyConsole()
 
 # ASCII banner for visual appeal (optional)
 ASCII_BANNER = """
@@ -76,10 +117,21 @@ def _load_env() -> None:
 
 def _check_env() -> bool:
     """Validate required environment variables."""
+    from agent.models import providers_in_use
+
     missing: List[str] = []
-    openai_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not openai_key or openai_key.lower() in {"your-openai-api-key-here", "changeme", "paste-here"}:
-        missing.append("OPENAI_API_KEY")
+    try:
+        providers = providers_in_use()
+    except ValueError as e:
+        console.print(f"[error]✗ Invalid model configuration: {e}[/error]")
+        return False
+    # Only providers named in the model specs need a key; the fake provider needs none
+    for provider, var in (("openai", "OPENAI_API_KEY"), ("anthropic", "ANTHROPIC_API_KEY")):
+        key = os.getenv(var, "").strip()
+        if provider in providers and (
+            not key or key.lower() in {"your-openai-api-key-here", "changeme", "paste-here"}
+        ):
+            missing.append(var)
     if not os.getenv("LANGSMITH_API_KEY"):
         console.print("[warning]⚠️  LANGSMITH_API_KEY is not set. Tracing will be limited.[/warning]")
     if missing:
@@ -89,8 +141,169 @@ def _check_env() -> bool:
     return True
 
 
-def _run_single_query(query: str) -> int:
+def _pop_flag(argv: List[str], *names: str) -> bool:
+    """Remove boolean flags from argv in place; return True if any was present."""
+    found = False
+    for name in names:
+        while name in argv:
+            argv.remove(name)
+            found = True
+    return found
+
+
+def _pop_option(argv: List[str], name: str, default: str | None = None) -> str | None:
+    """Remove ``name VALUE`` (or ``name=VALUE``) from argv in place and return VALUE."""
+    for i, arg in enumerate(argv):
+        if arg == name and i + 1 < len(argv):
+            value = argv[i + 1]
+            del argv[i:i + 2]
+            return value
+        if arg.startswith(name + "="):
+            del argv[i]
+            return arg.split("=", 1)[1]
+    return default
+
+
+def _response_panel(response: str, title: str) -> Panel:
+    from rich.markdown import Markdown
+    from rich.panel import Panel
+
+    return Panel(
+        Markdown(response),
+        title=title,
+        border_style="green",
+        padding=(1, 2),
+    )
+
+
+def _with_run_stats(config: dict, enabled: bool):
+    """Add a per-answer metrics handler next to the shared one; returns (config, handler)."""
+    from agent.metrics import MetricsCallbackHandler, get_metrics, metrics_enabled
+    from agent.profiling import active_profiler
+
+    if not enabled:
+        return config, None
+    handler = MetricsCallbackHandler()
+    callbacks = [get_metrics(), handler] if metrics_enabled() else [handler]
+    if active_profiler() is not None:
+        callbacks.append(active_profiler())
+    return {**config, "callbacks": callbacks}, handler
+
+
+def _show_run_stats(handler) -> None:
+    """Per-answer timing, token and retry table (``--stats``)."""
+    from rich.table import Table
+
+    data = handler.as_dict()
+    table = Table(title="Run stats", border_style="blue", title_justify="left")
+    table.add_column("Span", style="info")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total ms", justify="right")
+    table.add_column("Self ms", justify="right")
+    for label, span in data["spans"].items():
+        table.add_row(label, str(span["count"]), f"{span['total_ms']:.1f}", f"{span['self_ms']:.1f}")
+    console.print(table)
+    for m in data["models"]:
+        console.print(
+            f"[dim]{m['agent']} · {m['model']}:[/dim] {m.get('calls', 0)} calls, "
+            f"{m.get('input_tokens', 0)} prompt + {m.get('output_tokens', 0)} completion tokens"
+        )
+    for name, enc in data["encoding"].items():
+        saved = enc["saved_tokens"] / enc["raw_tokens"] * 100 if enc["raw_tokens"] else 0.0
+        console.print(
+            f"[dim]{name} encoding:[/dim] {enc['calls']} calls, "
+            f"~{enc['raw_tokens']} → ~{enc['encoded_tokens']} tokens ({saved:.0f}% saved)"
+        )
+    if data["retries"]:
+        console.print(f"[warning]Retries: {data['retries']}[/warning]")
+    console.print()
+
+
+def _write_metrics(path: str) -> None:
+    """Dump the shared metrics: Prometheus text for .prom/.txt, JSON otherwise."""
+    import json
+
+    from agent.metrics import get_metrics
+
+    metrics = get_metrics()
+    if path.endswith((".prom", ".txt")):
+        text = metrics.to_prometheus()
+    else:
+        text = json.dumps(metrics.as_dict(), indent=2) + "\n"
+    Path(path).write_text(text, encoding="utf-8")
+    console.print(f"[dim]Metrics written to {path}[/dim]")
+
+
+def _write_profile(prefix: str, top: int | None = None) -> None:
+    """Stop the profiler, write its files and show the heaviest spans (``--profile``)."""
+    from rich.table import Table
+
+    from agent.profiling import stop_profiler
+
+    profiler = stop_profiler()
+    if profiler is None:
+        return
+    top = top or int(os.getenv("PROFILE_TOP", "20"))
+    collapsed, summary = profiler.write(prefix, top)
+    spans = profiler.spans()
+    total = sum(w for _, w in spans) or 1
+    table = Table(title=f"Profile ({profiler.mode})", border_style="blue", title_justify="left")
+    table.add_column("Span", style="info")
+    table.add_column("Self", justify="right")
+    table.add_column("Share", justify="right")
+    table.add_column("Hottest " + ("function" if profiler.mode == "cpu" else "allocation site"))
+    for label, weight in spans[:12]:
+        hot = profiler.hottest(label, 1)
+        table.add_row(label, profiler.format_weight(weight), f"{weight / total:.0%}", hot[0][0] if hot else "")
+    console.print(table)
+    console.print(f"[dim]Profile written to {summary} (top {top} per span) and {collapsed} (collapsed stacks)[/dim]")
+
+
+def _stream_response(graph, inputs: dict, config: dict, title: str) -> str:
+    """Render supervisor tokens live and print worker handoff/tool events as they happen."""
+    from rich.live import Live
+    from rich.text import Text
+
+    from agent.streaming import stream_events
+
+    buffer = ""
+    with Live(
+        Text("🤔 Thinking...", style="info"),
+        console=_console(),
+        refresh_per_second=12,
+        transient=False,
+    ) as live:
+        for event in stream_events(graph, inputs, config):
+            if event["type"] == "token":
+                buffer += event["text"]
+                live.update(_response_panel(buffer, title))
+            elif event["type"] == "reset":
+                # Text emitted alongside tool calls is not the final answer
+                buffer = ""
+            elif event["type"] == "handoff":
+                live.console.print(f"[dim]→ handoff to[/dim] [info]{event['agent']}[/info]")
+            elif event["type"] == "worker_done":
+                live.console.print(f"[success]✓[/success] [dim]{event['agent']} finished[/dim]")
+            elif event["type"] == "tool":
+                live.console.print(f"[dim]  · tool[/dim] {event['name']}")
+
+        state = graph.get_state(config)
+        response = state.values["messages"][-1].content
+        live.update(_response_panel(response, title))
+    return response
+
+
+def _run_single_query(query: str, stream: bool = False, stats: bool = False, deadline: float | None = None) -> int:
     """Single query mode: run one inference and exit."""
+    from rich.panel import Panel
+    from rich.status import Status
+    from rich.text import Text
+    from langchain_core.messages import HumanMessage
+
+    from agent import build_system
+    from agent.deadline import deadline_scope
+    from agent.profiling import span
+
     graph = build_system()
     
     # Display query
@@ -102,36 +315,307 @@ def _run_single_query(query: str) -> int:
         padding=(1, 2),
     ))
     
-    # Process with status indicator
-    with Status("[info]🤔 Processing...[/info]", console=console, spinner="dots"):
-        thread_id = f"single-{uuid.uuid4()}"
-        result = graph.invoke(
-            {"messages": [HumanMessage(content=query)]},
-            config={
-                "configurable": {"thread_id": thread_id},
-                "recursion_limit": 25,  # Allow full pipeline execution
-            },
-        )
-    
-    response = result['messages'][-1].content
-    
-    # Display response with markdown rendering
-    console.print()
-    console.print(Panel(
-        Markdown(response),
-        title="[assistant]✨ Response[/assistant]",
-        border_style="green",
-        padding=(1, 2),
-    ))
-    console.print()
-    
+    thread_id = f"single-{uuid.uuid4()}"
+    inputs = {"messages": [HumanMessage(content=query)]}
+    config = {
+        "configurable": {"thread_id": thread_id},
+        "recursion_limit": 25,  # Allow full pipeline execution
+    }
+    title = "[assistant]✨ Response[/assistant]"
+    config, run_stats = _with_run_stats(config, stats)
+
+    if stream:
+        console.print()
+        with deadline_scope(deadline):
+            _stream_response(graph, inputs, config, title)
+        console.print()
+    else:
+        # Process with status indicator
+        with Status("[info]🤔 Processing...[/info]", console=_console(), spinner="dots"), deadline_scope(deadline):
+            result = graph.invoke(inputs, config=config)
+
+        response = result['messages'][-1].content
+
+        # Display response with markdown rendering
+        console.print()
+        with span("cli:render"):
+            console.print(_response_panel(response, title))
+        console.print()
+
+    if run_stats is not None:
+        _show_run_stats(run_stats)
+    return 0
+
+
+def _run_batch(in_path: str, out_path: str, concurrency: int, deadline: float | None = None) -> int:
+    """Batch mode: build the graph once and run every JSONL query with bounded concurrency."""
+    from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn, TimeElapsedColumn
+    from rich.table import Table
+
+    from agent import build_system
+    from agent.batch import read_jsonl, run_batch
+
+    try:
+        items = read_jsonl(in_path)
+    except (OSError, ValueError) as e:
+        console.print(f"[error]✗ {e}[/error]")
+        return 2
+
+    graph = build_system(async_mode=True)
+    console.print(f"[info]📦 Running {len(items)} queries (concurrency {concurrency}) → {out_path}[/info]")
+
+    with Progress(
+        TextColumn("[info]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TextColumn("[error]{task.fields[errors]} errors"),
+        TimeElapsedColumn(),
+        console=_console(),
+    ) as progress:
+        task = progress.add_task("Batch", total=len(items), errors=0)
+        errors = 0
+
+        def _on_result(record: dict) -> None:
+            nonlocal errors
+            errors += record["error"] is not None
+            progress.update(task, advance=1, errors=errors)
+
+        summary = asyncio.run(run_batch(graph, items, out_path, concurrency=concurrency, deadline=deadline, on_result=_on_result))
+
+    stats = summary.as_dict()
+    table = Table(title="Batch summary", show_header=False, border_style="blue")
+    table.add_row("Queries", f"{stats['total']} ({stats['ok']} ok, {stats['errors']} errors)")
+    table.add_row("Wall time", f"{stats['wall_seconds']:.2f}s")
+    table.add_row("Throughput", f"{stats['throughput_qps']:.2f} queries/s")
+    for name, value in stats["latency_ms"].items():
+        table.add_row(f"Latency {name}", f"{value:.0f} ms")
+    console.print(table)
+    return 0 if summary.errors == 0 else 1
+
+
+def _run_bench(args: List[str]) -> int:
+    """Offline benchmark on the scripted model; exits 1 when the baseline check fails."""
+    import json
+
+    from rich.status import Status
+    from rich.table import Table
+
+    from agent.bench import compare, run
+
+    try:
+        options = {
+            "model_latency": float(_pop_option(args, "--latency", "0.05")),
+            "repeats": int(_pop_option(args, "--repeats", "5")),
+            "requests": int(_pop_option(args, "--requests", "48")),
+            "concurrency": [int(c) for c in _pop_option(args, "--concurrency", "1,4,16").split(",")],
+        }
+        threshold = float(_pop_option(args, "--threshold", "0.25"))
+    except ValueError:
+        console.print("[error]--latency/--repeats/--requests/--concurrency/--threshold must be numbers[/error]")
+        return 2
+    out_path = _pop_option(args, "--out", "bench_results.json")
+    baseline_path = _pop_option(args, "--baseline")
+
+    with Status("[info]⏱️  Benchmarking (scripted model)...[/info]", console=_console(), spinner="dots"):
+        result = run(**options)
+    Path(out_path).write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+
+    table = Table(title="Benchmark", show_header=False, border_style="blue")
+    for section in ("framework", "simulated"):
+        latency = result[section]["latency_ms"]
+        table.add_row(f"{section} latency", f"p50 {latency['p50']:.1f} ms · p95 {latency['p95']:.1f} ms")
+    for label, node in result["framework"]["nodes"].items():
+        if label.startswith("model:"):
+            table.add_row(f"  {label}", f"{node['ms_per_query']:.2f} ms/query scripted model ({node['calls_per_query']} calls)")
+        else:
+            table.add_row(f"  {label}", f"{node['self_ms_per_query']:.2f} ms/query overhead ({node['calls_per_query']} calls)")
+    for level, stats in result["throughput"].items():
+        table.add_row(f"concurrency {level}", f"{stats['throughput_qps']:.1f} q/s · p95 {stats['latency_ms']['p95']:.0f} ms")
+    table.add_row("peak memory", f"{result['memory']['tracemalloc_peak_mb']} MB traced · {result['memory']['max_rss_mb']} MB RSS")
+    console.print(table)
+    console.print(f"[info]Results written to {out_path}[/info]")
+
+    if baseline_path is None:
+        return 0
+    try:
+        baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        console.print(f"[error]✗ Cannot read baseline: {e}[/error]")
+        return 2
+    regressions = compare(result, baseline, threshold)
+    for line in regressions:
+        console.print(f"[error]✗ Regression: {line}[/error]")
+    if not regressions:
+        console.print(f"[success]✓ Within {threshold:.0%} of {baseline_path}[/success]")
+    return 1 if regressions else 0
+
+
+def _run_startup_report() -> int:
+    """Import-time and build-time breakdown (``--startup-report``)."""
+    from rich.status import Status
+    from rich.table import Table
+
+    from agent.startup import startup_report
+
+    with Status("[info]⏱️  Measuring startup...[/info]", console=_console(), spinner="dots"):
+        try:
+            report = startup_report()
+        except RuntimeError as e:
+            console.print(f"[error]✗ {e}[/error]")
+            return 1
+
+    for imports in report["imports"]:
+        table = Table(title=f"import {imports['module']} (cold)", border_style="blue", title_justify="left")
+        table.add_column("Package", style="info")
+        table.add_column("Self ms", justify="right")
+        for name, ms in imports["packages"].items():
+            table.add_row(name, f"{ms:.1f}")
+        table.add_row("[bold]all imports[/bold]", f"[bold]{imports['imports_ms']:.1f}[/bold]")
+        table.add_row("[dim]interpreter wall time[/dim]", f"[dim]{imports['interpreter_wall_ms']:.1f}[/dim]")
+        console.print(table)
+
+    table = Table(title="Build", border_style="blue", title_justify="left")
+    table.add_column("Phase", style="info")
+    table.add_column("ms", justify="right")
+    for phase, ms in report["build_ms"].items():
+        table.add_row(phase, f"{ms:.1f}")
+    console.print(table)
+    console.print("[dim]Workers are built on their first handoff, not at startup.[/dim]")
+    return 0
+
+
+def _run_server(args: List[str]) -> int:
+    """HTTP serving mode (requires uvicorn)."""
+    from agent.server import serve
+
+    host = _pop_option(args, "--host", os.getenv("SERVER_HOST", "127.0.0.1"))
+    try:
+        port = int(_pop_option(args, "--port", os.getenv("SERVER_PORT", "8000")))
+    except ValueError:
+        console.print("[error]--port must be an integer[/error]")
+        return 2
+    console.print(f"[info]Serving on http://{host}:{port} (POST /invoke, POST /stream, GET /metrics)[/info]")
+    try:
+        serve(host, port)
+    except ImportError as exc:
+        console.print(f"[error]{exc}[/error]")
+        return 1
     return 0
 
 
-def _run_interactive_chat() -> int:
+def _run_submit(args: List[str]) -> int:
+    """Queue jobs: one query from the arguments, or every line of a JSONL file."""
+    import sqlite3
+
+    from agent.batch import read_jsonl
+    from agent.jobs import JobQueue
+
+    path = _pop_option(args, "--file")
+    job_id = _pop_option(args, "--id")
+    thread_id = _pop_option(args, "--thread")
+    queue = JobQueue.from_env()
+    if path is not None:
+        try:
+            items = read_jsonl(path)
+        except (OSError, ValueError) as e:
+            console.print(f"[error]✗ {e}[/error]")
+            return 2
+        # Lines without an "id" get a generated one (the batch reader falls back to the line index)
+        jobs = [(item.query, None if item.id == str(item.index) else item.id, None) for item in items]
+    elif args:
+        jobs = [(" ".join(args), job_id, thread_id)]
+    else:
+        console.print("[error]Usage: python -m cli submit \"<query>\" | --file queries.jsonl[/error]")
+        return 2
+    try:
+        ids = [queue.submit(query, job_id=jid, thread_id=tid) for query, jid, tid in jobs]
+    except sqlite3.IntegrityError:
+        console.print("[error]✗ A job with that id already exists[/error]")
+        return 2
+    for job in ids:
+        console.print(job)
+    console.print(f"[info]📥 Queued {len(ids)} job(s) in {queue.path}[/info]", highlight=False)
+    return 0
+
+
+def _run_worker(args: List[str]) -> int:
+    """Run queued jobs in one or more worker processes until interrupted (or drained)."""
+    from agent.jobs import print_event, run_workers, worker_id, worker_loop
+
+    drain = _pop_flag(args, "--drain")
+    try:
+        processes = int(_pop_option(args, "--processes", os.getenv("JOB_PROCESSES", "1")))
+        poll = float(_pop_option(args, "--poll", "1.0"))
+    except ValueError:
+        console.print("[error]--processes must be an integer and --poll a number of seconds[/error]")
+        return 2
+    console.print(f"[info]⚙️  {processes} worker process(es){' (drain)' if drain else ''}; Ctrl-C to stop[/info]")
+    try:
+        if processes > 1:
+            run_workers(processes, drain=drain, poll=poll)
+        else:
+            worker_loop(worker_id(), drain=drain, poll=poll, on_event=print_event)
+    except KeyboardInterrupt:
+        console.print("\n[warning]Stopped; unfinished jobs were returned to the queue[/warning]")
+    return 0
+
+
+def _run_status(args: List[str]) -> int:
+    """Job counts and the latest jobs, or the details of one job."""
+    from rich.table import Table
+
+    from agent.jobs import JobQueue
+
+    try:
+        limit = int(_pop_option(args, "--limit", "20"))
+    except ValueError:
+        console.print("[error]--limit must be an integer[/error]")
+        return 2
+    queue = JobQueue.from_env()
+    if args:
+        job = queue.get(args[0])
+        if job is None:
+            console.print(f"[error]No job {args[0]}[/error]")
+            return 1
+        table = Table(title=f"Job {job.id}", show_header=False, border_style="blue", title_justify="left")
+        table.add_row("Status", job.status)
+        table.add_row("Attempts", f"{job.attempts} ({job.resumed} resumed)")
+        table.add_row("Thread", job.thread_id)
+        table.add_row("Query", job.query)
+        if job.error:
+            table.add_row("Error", job.error)
+        console.print(table)
+        if job.result:
+            console.print(_response_panel(job.result, "✨ Result"))
+        return 0
+    counts = queue.counts()
+    console.print("  ".join(f"[info]{status}[/info] {n}" for status, n in counts.items()))
+    table = Table(border_style="blue")
+    for column in ("Job", "Status", "Attempts", "Seconds", "Query"):
+        table.add_column(column)
+    for job in queue.jobs(limit=limit):
+        seconds = f"{job.finished - job.started:.1f}" if job.finished and job.started else ""
+        table.add_row(job.id, job.status, str(job.attempts), seconds, job.query[:60])
+    console.print(table)
+    return 0
+
+
+def _run_interactive_chat(stream: bool = False, stats: bool = False, deadline: float | None = None) -> int:
     """Interactive chat mode: conversational interface with context memory."""
-    graph = build_system()
-    conversation_history: List[str] = []
+    from rich.panel import Panel
+    from rich.prompt import Prompt
+    from rich.status import Status
+    from rich.text import Text
+    from langchain_core.messages import HumanMessage
+
+    from agent import build_system
+    from agent.deadline import deadline_scope
+    from agent.profiling import span
+    from agent.routing import prerouter_from_env
+
+    prerouter = prerouter_from_env()
+    graph = build_system(prerouter=prerouter)
+    # One checkpointed thread per session: the graph keeps (and trims) the history
     session_id = str(uuid.uuid4())
     message_count = 0
     
@@ -163,10 +647,10 @@ def _run_interactive_chat() -> int:
                 # Rich prompt with custom style
                 user_input = Prompt.ask(
                     "[prompt]You[/prompt]",
-                    console=console,
+                    console=_console(),
                 ).strip()
             except EOFError:
-                _show_goodbye(message_count)
+                _show_goodbye(message_count, prerouter, graph)
                 break
             
             if not user_input:
@@ -174,12 +658,12 @@ def _run_interactive_chat() -> int:
             
             # Handle special commands
             if user_input.lower() in {"exit", "quit", "bye"}:
-                _show_goodbye(message_count)
+                _show_goodbye(message_count, prerouter, graph)
                 break
             
             if user_input.lower() == "clear":
                 console.clear()
-                conversation_history.clear()
+                session_id = str(uuid.uuid4())
                 message_count = 0
                 console.print("[success]✓ Conversation history cleared.[/success]\n")
                 continue
@@ -188,53 +672,64 @@ def _run_interactive_chat() -> int:
                 _show_help()
                 continue
             
-            # Build context-aware query with conversation history
-            if conversation_history:
-                context = "\n".join(conversation_history[-20:])  # last 5 exchanges
-                full_query = f"[Conversation context:\n{context}\n]\n\nCurrent query: {user_input}"
-            else:
-                full_query = user_input
-            
-            # Invoke agent with elegant status
-            with Status("[info]🤔 Thinking...[/info]", console=console, spinner="dots"):
+            thread_id = f"chat-{session_id}"
+            inputs = {"messages": [HumanMessage(content=user_input)]}
+            config = {
+                "configurable": {"thread_id": thread_id},
+                "recursion_limit": 25,  # Allow full pipeline execution
+            }
+            title = f"[assistant]🤖 Assistant[/assistant] [dim]│ Message #{message_count + 1}[/dim]"
+            config, run_stats = _with_run_stats(config, stats)
+
+            if stream:
+                console.print()
                 try:
-                    thread_id = f"chat-{session_id}-{message_count+1}-{uuid.uuid4()}"
-                    result = graph.invoke(
-                        {"messages": [HumanMessage(content=full_query)]},
-                        config={
-                            "configurable": {"thread_id": thread_id},
-                            "recursion_limit": 25,  # Allow full pipeline execution
-                        },
-                    )
-                    response = result['messages'][-1].content
+                    with deadline_scope(deadline):
+                        _stream_response(graph, inputs, config, title)
                 except Exception as e:
                     console.print(f"\n[error]✗ Error: {str(e)}[/error]\n")
                     continue
-            
-            # Update conversation history
+                console.print()
+            else:
+                # Invoke agent with elegant status
+                with Status("[info]🤔 Thinking...[/info]", console=_console(), spinner="dots"):
+                    try:
+                        with deadline_scope(deadline):
+                            result = graph.invoke(inputs, config=config)
+                        response = result['messages'][-1].content
+                    except Exception as e:
+                        console.print(f"\n[error]✗ Error: {str(e)}[/error]\n")
+                        continue
+
+                # Display response with markdown rendering and message counter
+                console.print()
+                with span("cli:render"):
+                    console.print(_response_panel(response, title))
+                console.print()
+
+            if run_stats is not None:
+                _show_run_stats(run_stats)
             message_count += 1
-            conversation_history.append(f"User: {user_input}")
-            conversation_history.append(f"Assistant: {response}")
-            
-            # Display response with markdown rendering and message counter
-            console.print()
-            console.print(Panel(
-                Markdown(response),
-                title=f"[assistant]🤖 Assistant[/assistant] [dim]│ Message #{message_count}[/dim]",
-                border_style="green",
-                padding=(1, 2),
-            ))
-            console.print()
     
     except KeyboardInterrupt:
         console.print()
-        _show_goodbye(message_count)
+        _show_goodbye(message_count, prerouter, graph)
     
     return 0
 
 
-def _show_goodbye(message_count: int) -> None:
+def _show_goodbye(message_count: int, prerouter=None, graph=None) -> None:
     """Display goodbye message with session statistics."""
+    from rich.panel import Panel
+    from rich.text import Text
+
+    from agent.analytics import get_session_index
+    from agent.artifacts import get_artifact_store
+    from agent.cache import get_shared_cache
+    from agent.checkpoint import checkpointer_stats
+    from agent.metrics import get_metrics, metrics_enabled
+    from agent.streaming import HANDOFF_LABELS
+
     console.print()
     
     if message_count > 0:
@@ -243,6 +738,58 @@ def _show_goodbye(message_count: int) -> None:
             ("Messages exchanged: ", "dim"),
             (str(message_count), "success bold"),
         )
+        route_stats = prerouter.stats() if prerouter is not None and hasattr(prerouter, "stats") else None
+        if route_stats and route_stats["total"]:
+            routes = ", ".join(
+                f"{'supervisor' if name == 'llm' else HANDOFF_LABELS.get(name, name)} {info['hits']} ({info['rate']:.0%})"
+                for name, info in route_stats["routes"].items()
+            )
+            stats_text.append("\nPre-router hits: ", style="dim")
+            stats_text.append(routes)
+        cache = get_shared_cache()
+        if cache is not None:
+            cache_stats = cache.stats()
+            stats_text.append("\nLLM cache: ", style="dim")
+            stats_text.append(
+                f"{cache_stats['hits'] + cache_stats['normalized_hits']} hits, "
+                f"{cache_stats['misses']} misses, {cache_stats['evictions']} evictions"
+            )
+        cp_stats = checkpointer_stats(getattr(graph, "checkpointer", None))
+        if cp_stats:
+            stats_text.append("\nCheckpoints: ", style="dim")
+            stats_text.append(
+                f"{cp_stats['checkpoints']} resident across {cp_stats['threads']} threads "
+                f"({cp_stats['bytes'] / 1024:.1f} KiB, {cp_stats['backend']})"
+            )
+        index_stats = get_session_index().stats()
+        if index_stats["memo"]["hits"]:
+            stats_text.append("\nTool memo: ", style="dim")
+            stats_text.append(f"{index_stats['memo']['hits']} repeated analyses answered from memory")
+        artifact_stats = get_artifact_store().stats()
+        if artifact_stats["stored"]:
+            stats_text.append("\nArtifacts: ", style="dim")
+            stats_text.append(
+                f"{artifact_stats['stored']} large inputs passed by handle "
+                f"({artifact_stats['chars_saved']:,} chars kept out of prompts)"
+            )
+        if metrics_enabled():
+            metrics = get_metrics().as_dict()
+            calls = sum(m.get("calls", 0) for m in metrics["models"])
+            if calls:
+                tokens_in = sum(m.get("input_tokens", 0) for m in metrics["models"])
+                tokens_out = sum(m.get("output_tokens", 0) for m in metrics["models"])
+                stats_text.append("\nModel calls: ", style="dim")
+                stats_text.append(f"{calls} ({tokens_in} prompt + {tokens_out} completion tokens)")
+                if metrics["retries"]:
+                    stats_text.append(f", {metrics['retries']} retries")
+            slowest = sorted(
+                ((label, span) for label, span in metrics["spans"].items() if not label.startswith("model:")),
+                key=lambda item: item[1]["self_ms"],
+                reverse=True,
+            )[:3]
+            if slowest:
+                stats_text.append("\nTime outside model calls: ", style="dim")
+                stats_text.append(", ".join(f"{label} {span['self_ms'] / 1000:.2f}s" for label, span in slowest))
     else:
         stats_text = Text("👋 Goodbye!", style="info")
     
@@ -254,8 +801,24 @@ def _show_goodbye(message_count: int) -> None:
     console.print()
 
 
+def _show_usage() -> int:
+    """Print the module usage (``--help``)."""
+    from rich.markdown import Markdown
+    from rich.panel import Panel
+
+    console.print(Panel(
+        Markdown(__doc__ or "No documentation available."),
+        title="[header]Help[/header]",
+        border_style="blue",
+    ))
+    return 0
+
+
 def _show_help() -> None:
     """Display inline help information."""
+    from rich.markdown import Markdown
+    from rich.panel import Panel
+
     help_text = """
 ## 💡 Quick Help
 
@@ -272,7 +835,7 @@ def _show_help() -> None:
 - Example queries:
   - *"Extract entities from: Microsoft and Azure"*
   - *"Calculate stats for: 10, 20, 30, 40, 50"*
-  - *"What were the entities in my last query?"* (uses context)
+  - *"What were the entities in my last query?"* (answered from the session index, no agent re-run)
 """
     console.print()
     console.print(Panel(
@@ -286,11 +849,70 @@ def _show_help() -> None:
 
 def entrypoint(argv: list[str] | None = None) -> int:
     """Main entry point: interactive chat or single query mode."""
-    argv = argv if argv is not None else sys.argv
+    argv = list(argv if argv is not None else sys.argv)
+    if len(argv) > 1 and argv[1] in {"--help", "-h"}:
+        return _show_usage()
     _load_env()
+    if len(argv) > 1 and argv[1] == "bench":
+        return _run_bench(argv[2:])
+    if len(argv) > 1 and argv[1] in {"submit", "status"}:
+        # Queue bookkeeping only; no model is called
+        return (_run_submit if argv[1] == "submit" else _run_status)(argv[2:])
+    if _pop_flag(argv, "--startup-report"):
+        return _run_startup_report()
     if not _check_env():
         return 1
 
+    if len(argv) > 1 and argv[1] == "serve":
+        return _run_server(argv[2:])
+    if len(argv) > 1 and argv[1] == "worker":
+        return _run_worker(argv[2:])
+
+    from agent.deadline import request_deadline_from_env
+    from agent.metrics import metrics_enabled
+
+    stream = _pop_flag(argv, "--stream") or os.getenv("CLI_STREAM", "").lower() == "true"
+    stats = _pop_flag(argv, "--stats") or os.getenv("CLI_STATS", "").lower() == "true"
+    metrics_out = _pop_option(argv, "--metrics-out", os.getenv("METRICS_OUT") or None)
+    try:
+        deadline = float(_pop_option(argv, "--deadline", str(request_deadline_from_env() or 0))) or None
+    except ValueError:
+        console.print("[error]--deadline must be a number of seconds[/error]")
+        return 2
+
+    # Bare --profile means cpu; --profile=alloc picks the mode
+    profile = "cpu" if _pop_flag(argv, "--profile") else _pop_option(argv, "--profile", os.getenv("PROFILE") or None)
+    profile_out = _pop_option(argv, "--profile-out", os.getenv("PROFILE_OUT", "profile"))
+    if profile:
+        from agent.profiling import MODES, start_profiler
+
+        if profile not in MODES:
+            console.print(f"[error]--profile must be one of: {', '.join(MODES)}[/error]")
+            return 2
+        start_profiler(profile)
+
+    try:
+        code = _dispatch(argv, stream, stats, deadline)
+    finally:
+        if profile:
+            _write_profile(profile_out)
+    if metrics_out and metrics_enabled():
+        _write_metrics(metrics_out)
+    return code
+
+
+def _dispatch(argv: List[str], stream: bool, stats: bool, deadline: float | None) -> int:
+    """Run the mode selected by the remaining argv."""
+    batch_in = _pop_option(argv, "--batch")
+    if batch_in is not None:
+        out_path = _pop_option(argv, "--out", "batch_results.jsonl")
+        try:
+            concurrency = int(_pop_option(argv, "--concurrency", "4"))
+        except ValueError:
+            console.print("[error]--concurrency must be an integer[/error]")
+            return 2
+        return _run_batch(batch_in, out_path, concurrency, deadline=deadline)
+
     # Parse mode
     if len(argv) > 1 and argv[1] in {"--query", "-q"}:
         # Single query mode
@@ -298,21 +920,16 @@ def entrypoint(argv: list[str] | None = None) -> int:
             console.print("[error]Usage: python -m cli --query \"<your query>\"[/error]")
             return 2
         query = " ".join(argv[2:])
-        return _run_single_query(query)
+        return _run_single_query(query, stream=stream, stats=stats, deadline=deadline)
     elif len(argv) > 1 and argv[1] not in {"--help", "-h"}:
         # Legacy: treat any args as a single query
         query = " ".join(argv[1:])
-        return _run_single_query(query)
+        return _run_single_query(query, stream=stream, stats=stats, deadline=deadline)
     elif len(argv) > 1 and argv[1] in {"--help", "-h"}:
-        console.print(Panel(
-            Markdown(__doc__ or "No documentation available."),
-            title="[header]Help[/header]",
-            border_style="blue",
-        ))
-        return 0
+        return _show_usage()
     else:
         # Interactive chat mode (default)
-        return _run_interactive_chat()
+        return _run_interactive_chat(stream=stream, stats=stats, deadline=deadline)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,30 @@
+"""Large inputs in a query are replaced by handles that resolve to the original text."""
+from agent.artifacts import HANDLE, extract_artifacts, resolve_text
+
+PROSE = (
+    "It's the team's view that the vendor's plan won't hold: they'd said it'd ship by May, "
+    "but O'Brien's notes (and the auditors' memo) don't agree. "
+) * 4
+
+
+def test_apostrophes_do_not_split_prose():
+    query = f"Extract entities from this text: {PROSE}"
+    replaced = extract_artifacts(query, min_chars=100, min_numbers=50)
+    assert replaced.startswith("Extract entities from this text: ")
+    assert len(HANDLE.findall(replaced)) == 1
+    assert resolve_text(replaced) == query
+
+
+def test_double_quoted_span_becomes_handle():
+    query = f'Count keywords in "{PROSE}" and list the top 5'
+    replaced = extract_artifacts(query, min_chars=100, min_numbers=50)
+    assert replaced.endswith('" and list the top 5')
+    assert len(HANDLE.findall(replaced)) == 1
+    assert resolve_text(replaced) == query
+
+
+def test_number_runs_become_handles():
+    numbers = ", ".join(str(n) for n in range(60))
+    replaced = extract_artifacts(f"Calculate stats for: {numbers}", min_chars=10_000, min_numbers=50)
+    assert HANDLE.fullmatch(replaced.split(": ", 1)[1])
+    assert resolve_text(replaced).endswith(numbers)
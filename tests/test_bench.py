@@ -0,0 +1,24 @@
+"""The benchmark graph keeps its offline settings to itself."""
+import asyncio
+import os
+
+from langchain_core.messages import HumanMessage
+
+from agent.bench import build_bench_graph
+
+
+def test_bench_graph_leaves_environment_alone(monkeypatch):
+    monkeypatch.setenv("LANGSMITH_TRACING", "false")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("LLM_CACHE", "memory")
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    monkeypatch.delenv("TOOL_MEMO", raising=False)
+    before = dict(os.environ)
+
+    graph = build_bench_graph(0.0)
+    assert dict(os.environ) == before
+
+    # Workers were built with the scripted model, so this runs offline
+    config = {"configurable": {"thread_id": "bench-env"}}
+    result = asyncio.run(graph.ainvoke({"messages": [HumanMessage(content="Calculate stats for: 1, 2, 3")]}, config))
+    assert result["messages"][-1].content
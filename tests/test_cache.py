@@ -0,0 +1,28 @@
+"""LLM cache backends: lookups, normalized hits and the backend contract."""
+import pytest
+from langchain_core.outputs import Generation
+
+from agent.cache import LRUCache, SQLiteCache, _CountingCache
+
+
+def test_backend_must_implement_hooks():
+    class Partial(_CountingCache):
+        def _get(self, key):
+            return None
+
+        def clear(self, **kwargs):
+            pass
+
+    with pytest.raises(TypeError, match="_set"):
+        Partial()
+
+
+@pytest.mark.parametrize("make", [lambda tmp: LRUCache(maxsize=8), lambda tmp: SQLiteCache(str(tmp / "c.sqlite"))])
+def test_exact_then_normalized_hits(tmp_path, make):
+    cache = make(tmp_path)
+    cache.update('{"text": "hello   world"}', "model", [Generation(text="hi")])
+    assert cache.lookup('{"text": "hello   world"}', "model")[0].text == "hi"
+    assert cache.lookup('{"text":"hello world"}', "model")[0].text == "hi"
+    assert cache.lookup('{"text": "hello world"}', "other") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["normalized_hits"], stats["misses"]) == (1, 1, 1)
@@ -0,0 +1,69 @@
+"""Sync model calls abandoned on timeout are capped instead of filling the model pool."""
+import threading
+import time
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from agent.deadline import DeadlineChatModel, ModelBacklog, ModelTimeout, abandoned_calls
+
+_gate = threading.Event()
+
+
+class StuckModel(BaseChatModel):
+    """Blocks every call until the test opens the gate."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "stuck"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        _gate.wait(10)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        _gate.wait(10)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="ok"))
+
+
+def _wait_until_idle(timeout: float = 5.0) -> None:
+    end = time.monotonic() + timeout
+    while abandoned_calls() and time.monotonic() < end:
+        time.sleep(0.01)
+
+
+def test_abandoned_calls_are_capped():
+    _gate.clear()
+    model = DeadlineChatModel(inner=StuckModel(), call_timeout=0.05, max_abandoned=2)
+    for _ in range(2):
+        with pytest.raises(ModelTimeout) as exc:
+            model.invoke("hi")
+        assert not isinstance(exc.value, ModelBacklog)
+    assert abandoned_calls() == 2
+
+    # Fails at once rather than queueing behind the stuck calls
+    started = time.monotonic()
+    with pytest.raises(ModelBacklog, match="MODEL_MAX_ABANDONED=2"):
+        model.invoke("hi")
+    assert time.monotonic() - started < 0.05
+
+    # Once the stuck calls return, their threads are free again
+    _gate.set()
+    _wait_until_idle()
+    assert abandoned_calls() == 0
+    assert model.invoke("hi").content == "ok"
+
+
+def test_timed_out_stream_counts_as_abandoned():
+    _gate.clear()
+    model = DeadlineChatModel(inner=StuckModel(), call_timeout=0.05, max_abandoned=1)
+    with pytest.raises(ModelTimeout):
+        list(model.stream("hi"))
+    assert abandoned_calls() == 1
+    with pytest.raises(ModelBacklog):
+        list(model.stream("hi"))
+    _gate.set()
+    _wait_until_idle()
+    assert abandoned_calls() == 0
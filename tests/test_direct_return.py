@@ -0,0 +1,17 @@
+"""Direct-return policy: which single worker answers may end the turn."""
+from agent.direct import DirectReturnPolicy
+
+
+def test_complete_answers_end_the_turn():
+    policy = DirectReturnPolicy(min_chars=10)
+    table = "| stat | value |\n| --- | --- |\n| mean | 2 |\n\n\n"
+    assert policy.decide("data_agent", table) == table.strip()
+    assert policy.decide("text_agent", "- IBM (ORG)\n- NASA (ORG)") is not None
+
+
+def test_errors_and_questions_go_back_to_the_supervisor():
+    policy = DirectReturnPolicy(min_chars=10)
+    assert policy.decide("data_agent", "Sorry, I could not parse those numbers.") is None
+    assert policy.decide("text_agent", "Could you paste the text you want analyzed?") is None
+    assert policy.decide("data_agent", "The mean is 2. The median is 2.") is None
+    assert policy.stats() == {"data_agent": {"direct": 0, "supervisor": 2}, "text_agent": {"direct": 0, "supervisor": 1}}
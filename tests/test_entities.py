@@ -0,0 +1,43 @@
+"""Gazetteer builds for read-only lists are shared through the temp dir."""
+import os
+import subprocess
+import sys
+import tempfile
+
+from agent import entities
+
+
+def _read_only(monkeypatch, tmp_path):
+    monkeypatch.setattr(entities.os, "access", lambda path, mode: False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+    (tmp_path / "tmp").mkdir()
+
+
+def test_read_only_build_path_is_stable_across_processes(tmp_path, monkeypatch):
+    source = tmp_path / "names.txt"
+    source.write_text("Acme Corp\tORG\n", encoding="utf-8")
+    _read_only(monkeypatch, tmp_path)
+    here = entities._compiled_path(source, source.stat().st_mtime)
+    script = (
+        "import sys, tempfile; from pathlib import Path; from agent import entities; "
+        f"tempfile.tempdir = {str(tmp_path / 'tmp')!r}; entities.os.access = lambda *a: False; "
+        "p = Path(sys.argv[1]); print(entities._compiled_path(p, p.stat().st_mtime))"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path), PYTHONHASHSEED="random")
+    there = subprocess.run([sys.executable, "-c", script, str(source)], env=env, capture_output=True, text=True, check=True)
+    assert there.stdout.strip() == str(here)
+
+
+def test_read_only_rebuild_removes_stale_build(tmp_path, monkeypatch):
+    source = tmp_path / "names.txt"
+    source.write_text("Acme Corp\tORG\n", encoding="utf-8")
+    _read_only(monkeypatch, tmp_path)
+    entities._load.cache_clear()
+    first = entities.load_gazetteer(str(source))
+    assert entities.find_entities("We met Acme Corp today", first)[0]["label"] == "ORG"
+
+    source.write_text("Globex\tORG\n", encoding="utf-8")
+    os.utime(source, (source.stat().st_atime, source.stat().st_mtime + 10))
+    second = entities.load_gazetteer(str(source))
+    assert second.path != first.path
+    assert sorted(p.name for p in (tmp_path / "tmp").iterdir()) == [second.path.name]
@@ -0,0 +1,26 @@
+"""Handoff ToolMessages carry the worker's prose as artifact only when it differs from the content."""
+from langchain_core.messages import HumanMessage
+
+
+def _handoffs(monkeypatch, handoff_format: str):
+    for key, value in {
+        "LLM_PROVIDER": "fake", "OPENAI_API_KEY": "test", "LANGSMITH_TRACING": "false",
+        "HANDOFF_FORMAT": handoff_format, "PREROUTER": "off", "DIRECT_RETURN": "off",
+    }.items():
+        monkeypatch.setenv(key, value)
+    from agent import build_system
+
+    graph = build_system()
+    config = {"configurable": {"thread_id": f"handoff-{handoff_format}"}}
+    result = graph.invoke({"messages": [HumanMessage(content="Calculate stats for: 1, 2, 3, 4")]}, config)
+    return [m for m in result["messages"] if m.type == "tool" and m.name.startswith("transfer_to")]
+
+
+def test_prose_handoff_has_no_artifact(monkeypatch):
+    handoffs = _handoffs(monkeypatch, "prose")
+    assert handoffs and all(m.artifact is None for m in handoffs)
+
+
+def test_structured_handoff_keeps_prose_as_artifact(monkeypatch):
+    handoffs = _handoffs(monkeypatch, "structured")
+    assert handoffs and all(isinstance(m.artifact, str) and m.content.startswith("status=") for m in handoffs)
@@ -0,0 +1,95 @@
+"""A job whose worker dies mid-run is resumed by a fresh worker process."""
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+# Runs one worker; with "crash", the process exits as soon as the data worker is handed the task
+WORKER = """
+import os, sys
+import agent.graph as graph
+
+if sys.argv[1] == "crash":
+    real = graph.create_data_worker
+
+    class Killed:
+        def __init__(self, inner):
+            self.inner = inner
+
+        def invoke(self, *args, **kwargs):
+            os._exit(17)
+
+    graph.create_data_worker = lambda *a, **k: Killed(real(*a, **k))
+
+from agent.jobs import worker_loop
+print("finished", worker_loop("w-" + sys.argv[1], drain=True))
+"""
+
+
+def _env(tmp_path: Path) -> dict:
+    env = {k: v for k, v in os.environ.items() if k != "ARTIFACT_DIR"}
+    env.update(
+        PYTHONPATH=str(SRC),
+        LLM_PROVIDER="fake",
+        OPENAI_API_KEY="test",
+        LANGSMITH_TRACING="false",
+        JOBS_PATH=str(tmp_path / "jobs.sqlite"),
+        CHECKPOINT_PATH=str(tmp_path / "checkpoints.sqlite"),
+        JOB_LEASE="1",
+        ARTIFACT_MIN_NUMBERS="20",
+    )
+    return env
+
+
+def _worker(tmp_path: Path, mode: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", WORKER, mode],
+        env=_env(tmp_path), capture_output=True, text=True, timeout=120,
+    )
+
+
+def test_killed_job_resumes_in_fresh_process(tmp_path, monkeypatch):
+    for key, value in _env(tmp_path).items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.syspath_prepend(str(SRC))
+    from agent.jobs import JobQueue
+
+    queue = JobQueue.from_env()
+    numbers = ", ".join(str(n) for n in range(1, 101))
+    job_id = queue.submit(f"Calculate stats for: {numbers}")
+
+    crashed = _worker(tmp_path, "crash")
+    assert crashed.returncode == 17, crashed.stderr
+    assert queue.get(job_id).status == "running"
+    # The query was stored as an artifact on disk, next to the checkpoints
+    assert any((tmp_path / "artifacts").iterdir())
+
+    time.sleep(1.5)  # let the dead worker's lease run out
+    resumed = _worker(tmp_path, "resume")
+    assert resumed.returncode == 0, resumed.stderr
+    job = queue.get(job_id)
+    assert job.status == "done", job.error
+    assert job.attempts == 2 and job.resumed == 1
+    assert "Unknown artifact" not in job.result
+    assert "50.5" in job.result
+
+
+def test_expired_lease_fails_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(SRC))
+    from agent.jobs import JobQueue
+
+    queue = JobQueue(tmp_path / "jobs.sqlite", lease=0.05, max_attempts=2)
+    job_id = queue.submit("Calculate stats for: 1, 2, 3")
+    assert queue.claim("w1").attempts == 1
+    time.sleep(0.1)
+    assert queue.claim("w2").attempts == 2
+    time.sleep(0.1)
+    # The second worker died too: the job is failed instead of handed out a third time
+    assert queue.claim("w3") is None
+    job = queue.get(job_id)
+    assert job.status == "failed" and job.attempts == 2
+    # The first worker's late result no longer counts
+    assert not queue.complete(job_id, "w1", "answer")
@@ -0,0 +1,40 @@
+"""Statistics and percentile validation for calculate_stats."""
+import pytest
+
+from agent.numstats import describe, quantiles
+from agent.tools import calculate_stats
+
+
+def test_describe_percentiles():
+    stats = describe(list(range(1, 101)), [0, 90, 100])
+    assert stats["median"] == 50.5
+    assert (stats["p0"], stats["p90"], stats["p100"]) == (1, 90.1, 100)
+
+
+@pytest.mark.parametrize("bad", [-1, 101, float("nan")])
+def test_describe_rejects_out_of_range_percentiles(bad):
+    with pytest.raises(ValueError, match="between 0 and 100"):
+        describe([1.0, 2.0, 3.0], [50, bad])
+
+
+def test_quantiles_rejects_out_of_range():
+    with pytest.raises(ValueError):
+        quantiles([1.0, 2.0], [1.5])
+
+
+def test_tool_reports_bad_percentiles():
+    result = calculate_stats.invoke({"numbers": [1, 2, 3], "percentiles": [150]})
+    assert result == {"error": "percentiles must be between 0 and 100, got 150"}
+
+
+def test_blocked_moments_match_two_pass():
+    from agent import numstats
+
+    values = [1e9 + (i % 7) * 0.5 for i in range(3 * numstats._BLOCK + 11)]
+    acc = numstats.StatsAccumulator().update(values)
+    mean = sum(values) / len(values)
+    variance = sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+    assert acc.count == len(values)
+    assert acc.mean == pytest.approx(mean, rel=1e-15)
+    assert acc.stdev ** 2 == pytest.approx(variance, rel=1e-9)
+    assert (acc.min, acc.max) == (1e9, 1e9 + 3)
@@ -0,0 +1,39 @@
+"""Request validation in the ASGI server (no graph is built for rejected requests)."""
+import asyncio
+import json
+
+import pytest
+
+from agent.server import SupervisorServer
+
+
+def _post(app, body: dict, path: str = "/invoke"):
+    sent = []
+    payload = json.dumps(body).encode()
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": []}
+    asyncio.run(app(scope, receive, send))
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return status, json.loads(body)
+
+
+@pytest.mark.parametrize("deadline", [True, False, 0, -1, "5"])
+def test_invalid_deadline_is_rejected(deadline):
+    status, body = _post(SupervisorServer(), {"query": "hi", "deadline": deadline})
+    assert status == 400
+    assert "deadline" in body["error"]
+
+
+@pytest.mark.parametrize("path", ["/invoke", "/stream"])
+@pytest.mark.parametrize("thread_id", [7, 0, "", "  ", ["t"]])
+def test_invalid_thread_id_is_rejected(path, thread_id):
+    status, body = _post(SupervisorServer(), {"query": "hi", "thread_id": thread_id}, path)
+    assert status == 400
+    assert body == {"error": "'thread_id' must be a non-empty string"}
@@ -0,0 +1,38 @@
+"""Cells are flattened to one line so spooled rows and pages stay aligned."""
+import pytest
+
+from agent.tables import _cell, render_table
+from agent.tools import format_table
+
+
+def test_cell_flattens_control_characters():
+    assert _cell("a\rb") == "a b"
+    assert _cell("a\r\nb\tc|d") == "a  b c\\|d"
+
+
+def test_carriage_return_does_not_split_rows():
+    rows = [{"id": i, "note": f"line {i}\rcontinued"} for i in range(30)]
+    page = render_table(rows, page=2, page_size=10)
+    body = [line.split("|")[1:3] for line in page.splitlines()[2:12]]
+    assert [[a.strip(), b.strip()] for a, b in body] == [[str(i), f"line {i} continued"] for i in range(10, 20)]
+    assert "Page 2 of 3" in page
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        ({"page": 1, "page_size": -1}, "Invalid page_size: must be at least 1"),
+        ({"page": 1, "page_size": 0}, "Invalid page_size: must be at least 1"),
+        ({"sort_by": "a", "top": -1}, "Invalid top: must be at least 1"),
+        ({"sort_by": "a", "top": 0}, "Invalid top: must be at least 1"),
+    ],
+)
+def test_bad_paging_arguments_are_reported(args, message):
+    rows = [{"a": i} for i in range(5)]
+    assert format_table.invoke({"data": rows, **args}) == message
+
+
+def test_top_rows_by_column():
+    rows = [{"a": i} for i in range(5)]
+    table = format_table.invoke({"data": rows, "sort_by": "a", "top": 2})
+    assert [line.split("|")[1].strip() for line in table.splitlines()[2:4]] == ["4", "3"]